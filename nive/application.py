@@ -28,7 +28,7 @@ from nive.definitions import MetaTbl
 from nive.definitions import IAppConf
 from nive.definitions import ConfigurationError
 
-from nive.registration import Registration, AppConfigurationQuery
+from nive.registration import Registration, AppConfigurationQuery, FieldIndex, ClassCache
 from nive.events import Events
 from nive.helper import ResolveConfiguration, GetClassRef, ClassFactory
 from nive.utils.utils import SortConfigurationList
@@ -120,6 +120,10 @@ class Application(Events):
         # cache database structure
         self._structure = PoolStructure()
         self._dbpool = None
+        # type and field lookup tables. built after registration.
+        self._fieldIndex = None
+        # pre-built root and type classes. built after registration.
+        self._classCache = None
 
         self.log = logging.getLogger(self.id)
         self.log.debug("Initialize %s", repr(configuration))
@@ -297,6 +301,8 @@ class Application(Events):
                 self.log.error('Database test failure: (%s) %s', str(result), report)
 
         self._Lock()
+        self._fieldIndex = FieldIndex(self)
+        self._classCache = ClassCache(self)
 
     def Run(self):
         """
@@ -331,6 +337,8 @@ class Application(Events):
         """
         self.registry = None
         self._structure = None
+        self._fieldIndex = None
+        self._classCache = None
         self.configuration = None
         self.dbConfiguration = None
         self.__parent__ = None
@@ -525,6 +533,10 @@ class Application(Events):
         app = self.app
         if forceReload:
             app._structure = PoolStructure()
+            if app._fieldIndex is not None:
+                app._fieldIndex = FieldIndex(app)
+            if app._classCache is not None:
+                app._classCache = ClassCache(app)
         if not app._structure.IsEmpty():
             return app._structure
 
@@ -596,22 +608,28 @@ class AppFactory(object):
         elif poolTag.lower() in ("postgres", "postgresql"):
             poolTag = "nive.utils.dataPool2.postgres.postgreSqlPool.PostgreSql"
 
+        dbObj = GetClassRef(poolTag, app.reloadExtensions, True, None)
+
         # if a database connection other than the default is configured
+        cTag = app.dbConfiguration.connection
         if cachedDbConnection is not None:
             connObj = cachedDbConnection
-        elif app.dbConfiguration.connection:
-            connObj = GetClassRef(app.dbConfiguration.connection, app.reloadExtensions, True, None)
+        elif cTag == "pool":
+            # shared connection pool supplied by the database implementation
+            connObj = dbObj._PoolConnection(config=app.dbConfiguration, connectNow=False)
+        elif cTag:
+            connObj = GetClassRef(cTag, app.reloadExtensions, True, None)
             connObj = connObj(config=app.dbConfiguration, connectNow=False)
         else:
             connObj = None
 
-        dbObj = GetClassRef(poolTag, app.reloadExtensions, True, None)
         conn = app.dbConfiguration
         dbObj = dbObj(connection=connObj,
                       connParam=conn,  # use the default connection defined in db if connection is none
                       structure=app._structure,
                       root=conn.fileRoot,
                       useTrashcan=conn.useTrashcan,
+                      fileStorage=conn.get("fileStorage"),
                       dbCodePage=conn.dbCodePage,
                       timezone=app.pytimezone,
                       debug=conn.querylog[0],
@@ -631,7 +649,7 @@ class AppFactory(object):
 
         cTag = app.dbConfiguration.connection
         poolTag = app.dbConfiguration.context
-        if cTag:
+        if cTag and cTag != "pool":
             connObj = GetClassRef(cTag, app.reloadExtensions, True, None)
             connObj = connObj(config=app.dbConfiguration, connectNow=False)
             return connObj
@@ -650,6 +668,8 @@ class AppFactory(object):
         elif poolTag.lower() in ("postgres", "postgresql"):
             poolTag = "nive.utils.dataPool2.postgres.postgreSqlPool.PostgreSql"
         dbObj = GetClassRef(poolTag, app.reloadExtensions, True, None)
+        if cTag == "pool":
+            return dbObj._PoolConnection(config=app.dbConfiguration, connectNow=False)
         return dbObj._DefaultConnection(config=app.dbConfiguration, connectNow=False)
 
     def GetDBApi(self):
@@ -661,6 +681,31 @@ class AppFactory(object):
             return conn.PrivateConnection()
         return None
 
+    def GetObjectClass(self, configuration):
+        """
+        Returns the class for a root or type configuration including extensions.
+        Uses the pre-built classes once the registration is finished.
+        """
+        app = self.app
+        cache = app._classCache
+        if cache is not None:
+            entry = cache.Get(configuration)
+            if entry is not None:
+                return entry.cls
+        return ClassFactory(configuration, app.reloadExtensions, True, base=None)
+
+    def GetObjectListeners(self, configuration):
+        """
+        Returns the event listeners of a root or type configuration as dictionary
+        {signal: (callbacks)} or configuration.events.
+        """
+        cache = self.app._classCache
+        if cache is not None:
+            entry = cache.Get(configuration)
+            if entry is not None:
+                return entry.listeners
+        return configuration.events
+
     def GetRootObj(self, name):
         """
         creates the root object
@@ -688,7 +733,7 @@ class AppFactory(object):
             rootObj = getattr(app, cachename)
             rootObj.Signal("loadFromCache")
         else:
-            rootObj = ClassFactory(rootConf, app.reloadExtensions, True, base=None)
+            rootObj = self.GetObjectClass(rootConf)
             rootObj = rootObj(name, app, rootConf)
             if rootObj and useCache:
                 setattr(app, cachename, rootObj)
@@ -5,7 +5,7 @@
 from nive.i18n import _
 from nive.utils.utils import ConvertListToStr, ConvertToNumberList
 
-from nive.definitions import IContainer, IRoot, ISort
+from nive.definitions import IContainer, IRoot, ISort, ICache
 
 """
 Cut, copy and paste functionality for objects 
@@ -145,16 +145,15 @@ class CopyView:
         new = []
         msgs = []
         result = True
+        ids = [int(id) for id in ids if int(id) != context.id]
+        objs = self._LookupObjs(root, ids)
         for id in ids:
-            id = int(id)
-            if context.id == id:
-                continue
-            obj = root.LookupObj(id, preload="skip")
+            obj = objs.get(id)
             if not obj:
                 msgs.append(_("Object not found"))
                 result = False
                 continue
-            newobj = context.Duplicate(obj, user)
+            newobj = context.DuplicateTree(obj, user)
             if not newobj:
                 raise TypeError("Duplicate failed")
             if ISort.providedBy(context):
@@ -167,6 +166,23 @@ class CopyView:
             msgs.append(_("OK. Copied and pasted."))
         return result, msgs
 
+    def _LookupObjs(self, root, ids):
+        # loads the objects grouped by parent. returns a dictionary {id: obj}
+        if not ids:
+            return {}
+        recs = root.search.Select(parameter={"id": ids}, fields=["id", "pool_unitref"], operators={"id": "IN"}, max=len(ids))
+        parents = {}
+        for id, ref in recs:
+            parents.setdefault(ref, []).append(id)
+        objs = {}
+        for ref, refids in parents.items():
+            parent = root.LookupObj(ref, preload="skip")
+            if not parent:
+                continue
+            for obj in parent.GetObjsBatch(refids):
+                objs[obj.id] = obj
+        return objs
+
     def Move(self, ids, pos, user, context=None):
         """
         Move the object with id to this object
@@ -203,6 +219,8 @@ class CopyView:
             context.Signal("beforeAdd", data=obj.meta, type=type)
             if not oldParent or oldParent.id != obj.parent.id:
                 oldParent = obj.parent
+            if ICache.providedBy(oldParent):
+                oldParent.RemoveCache(obj.id)
             obj.__parent__ = context
             obj.meta["pool_unitref"] = context.id
             oldParent.Signal("afterDelete", id=obj.id)
@@ -408,6 +408,19 @@ class tWebapi_db(object):
         result = view.listItems()
         self.assertTrue(ids[0]==result["items"][3])
         self.assertTrue(ids[1]==result["items"][2])
+
+        # keyset pagination
+        self.request.POST = {"sort":"id", "order":"<", "size":3, "after":""}
+        result = view.listItems()
+        self.assertTrue(len(result["items"])==3)
+        self.assertTrue(result["after"])
+        self.request.POST = {"sort":"id", "order":"<", "size":3, "after":result["after"]}
+        result = view.listItems()
+        self.assertTrue(len(result["items"])==1)
+        self.assertTrue(result["after"]=="")
+        self.request.POST = {"sort":"id", "after":"invalid"}
+        result = view.listItems()
+        self.assertTrue(result.get("error"))
         
         
     def test_listingsContainer(self):
@@ -694,8 +694,11 @@ class APIv1(BaseView):
         - *order*: '<','>'. order the result list based on values ascending '<' or descending '>'
         - *size*: number of batched items. maximum is 100.
         - *start*: start number of batched result sets.
+        - *after*: keyset pagination. the continuation token returned by the previous call. Pass an 
+                   empty value to load the first page. `start` is ignored and a single sort field is required.
 
-        Returns json encoded result set: {"items":[[item values], [item values]], "start":number}
+        Returns json encoded result set: {"items":[[item values], [item values]], "start":number}.
+        If `after` is used the result includes the continuation token for the next page as `after`. 
 
         **Settings:**
 
@@ -763,14 +766,32 @@ class APIv1(BaseView):
             ascending = 0
 
         sort = values.get("sort", sort)
-        if not sort in [v["id"] for v in self.context.app.configurationQuery.GetAllMetaFlds(False)]:
+        query = self.context.app.configurationQuery
+        if query.GetMetaFld(sort) is None:
             if typename:
-                if self.context.app.configurationQuery.GetObjectConf(typename) is None:
+                if query.GetObjectConf(typename) is None:
                     raise TypeError("unknown type")
-                if not sort in [v["id"] for v in self.context.app.configurationQuery.GetAllObjectFlds(typename)]:
+                if query.GetObjectFld(sort, typename) is None:
                     sort = None
 
         parameter = {"pool_unitref": self.context.id}
+        if "after" in values:
+            try:
+                data, after = self.context.root.search.SelectPage(typename,
+                                                                  parameter=parameter,
+                                                                  fields=fields,
+                                                                  max=size,
+                                                                  ascending=ascending,
+                                                                  sort=sort,
+                                                                  after=values.get("after"))
+            except ValueError:
+                # set http response code (invalid request)
+                response.status = "400 Invalid parameter"
+                return {"error": "Invalid parameter: after", "items": []}
+            if isinstance(deserialize, collections.abc.Callable):
+                data = deserialize(data, self)
+            return {"items": data, "start": 0, "after": after}
+
         data = self.context.root.search.Select(typename,
                                               parameter=parameter,
                                               fields=fields,
@@ -805,6 +826,7 @@ class APIv1(BaseView):
         - *size*: maximum batch size
         - *total*: number of items in total
         - *fields*: (list) a list of data fields used in search
+        - *after*: keyset pagination only. continuation token for the next page
 
         The return value is based on the linked renderer. By default the result is returned as json
         encoded result set: ::
@@ -817,6 +839,10 @@ class APIv1(BaseView):
         - *order*: (string) either '<','>' or empty. Orders the result list based on values ascending '<' or descending '>'
         - *size*: (number) number of batched items.
         - *start*: (number) start number of batched result sets.
+        - *after*: (string) keyset pagination. Add `"after": ""` to `dynamic` to page with continuation
+                   tokens instead of start numbers. Requires a single sort field.
+        - *totals*: (string) how the total number is calculated. `exact` (default), `estimate`, `cached` or `none`.
+                    See `nive.search`.
         - *type*: (string) type id. If ``type`` is not empty this function uses `nive.search.SearchType`, if empty `nive.search.Search`.
                   The data fields to be included in the result have to be assigned respectively. In other words
                   if `type` is given the types data fields can be included in the result, otherwise not.
@@ -977,6 +1003,12 @@ class APIv1(BaseView):
         else:
             start = profile.get("start",0)
 
+        after = None
+        if "after" in dynamic:
+            after = web.get("after") or ""
+            if "after" in values:
+                del values["after"]
+
         if "size" in dynamic:
             try:
                 size = ExtractJSValue(values, "size", maxBatchItems, "int")
@@ -1007,9 +1039,10 @@ class APIv1(BaseView):
 
         if "sort" in dynamic:
             sort = values.get("sort",None)
-            if not sort in [v["id"] for v in self.context.app.configurationQuery.GetAllMetaFlds(False)]:
+            query = self.context.app.configurationQuery
+            if query.GetMetaFld(sort) is None:
                 if typename:
-                    if not sort in [v["id"] for v in self.context.app.configurationQuery.GetAllObjectFlds(typename)]:
+                    if query.GetObjectFld(sort, typename) is None:
                         sort = None
             del values["sort"]
         else:
@@ -1046,17 +1079,30 @@ class APIv1(BaseView):
             kws["ascending"] = ascending
         if sort is not None:
             kws["sort"] = sort
+        if after is not None:
+            kws["after"] = after
+        if profile.get("totals"):
+            kws["totals"] = profile.get("totals")
 
         # run the query and handle the result
-        if typename:
-            result = self.context.root.search.SearchType(typename, parameter=parameter, fields=fields, operators=operators, **kws)
-        else:
-            result = self.context.root.search.Search(parameter=parameter, fields=fields, operators=operators, **kws)
+        try:
+            if typename:
+                result = self.context.root.search.SearchType(typename, parameter=parameter, fields=fields, operators=operators, **kws)
+            else:
+                result = self.context.root.search.Search(parameter=parameter, fields=fields, operators=operators, **kws)
+        except ValueError:
+            if after is None:
+                raise
+            # set http response code (invalid request)
+            response.status = "400 Invalid parameter"
+            return {"error": "Invalid parameter: after", "items":[]}
         values = {"items": result["items"],
                   "start": result["start"]+1,
                   "size": result["count"],
                   "total": result["total"],
                   "fields": fields}
+        if "after" in result:
+            values["after"] = result["after"]
         if isinstance(deserialize, collections.abc.Callable):
             values["items"] = deserialize(result["items"], self)
         return values
@@ -18,7 +18,7 @@ from nive.definitions import ContainmentError, ConfigurationError, PermissionErr
 from nive.definitions import AllTypesAllowed
 from nive.security import SetupRuntimeAcls
 from nive.workflow import WorkflowNotAllowed, ObjectWorkflow, RootWorkflow
-from nive.helper import ResolveName, ClassFactory, GetVirtualObj
+from nive.helper import ResolveName, GetVirtualObj
 from nive.i18n import translate
 
 from nive.events import Events
@@ -26,6 +26,9 @@ from nive.search import Search
 from nive.objects import Object
 
 
+CreateChunkSize = 100
+
+
 class ContainerRead(Events):
     """
     Container implementation with read access for subobjects used for objects and roots.
@@ -289,7 +292,7 @@ class ContainerWrite:
             dbEntry = db.CreateEntry(pool_datatbl=typedef["dbparam"], user=user, **kw)
             obj = self.factory.DbObj(dbEntry.GetID(), dbEntry = dbEntry, parentObj = self, configuration = typedef, **kw)
             if typedef.events:
-                obj.SetupEventsFromConfiguration(typedef.events)
+                obj.SetupEventsFromConfiguration(app.factory.GetObjectListeners(typedef))
             obj.CreateSelf(data, user=user, **kw)
             wf.WfAction("add", user=user)
             obj.Signal("create", user=user, **kw)
@@ -302,6 +305,104 @@ class ContainerWrite:
         return obj
 
 
+    def CreateMany(self, type, datalist, user, chunkSize=None, batchEvents=False, **kw):
+        """
+        Creates multiple sub objects of the same type. ::
+        
+            type = object type id as string or object configuration
+            datalist = list of dictionaries containing data for the new objects
+            user = the currently active user
+            chunkSize = number of objects stored and committed at once
+            batchEvents = call container events once per chunk instead of once per object
+            **kw = version information
+            returns the list of new objects
+
+        Type and workflow permissions are checked once. Database ids are allocated in blocks
+        and the changes of each chunk are written with one statement per table. The default
+        chunk size is `app.configuration.createChunkSize` or 100. If a chunk fails, previous
+        chunks remain committed.
+
+        Keyword options:
+
+        - nocommit: pass `nocommit=True` to skip storing the object values and the database 
+          commit. Objects have to be committed separately.
+
+        Events
+        
+        - beforeAdd(data=data, type=type, user=user, kw) called for the container
+        - create(user=user, kw) called for each new object
+        - commit(user=user, batch=batch) called for each new object. Extensions can store
+          values in `batch` to process them once for all objects of the chunk (e.g. fulltext).
+        - afterAdd(obj=obj, user=user, kw) called for the container after the chunk has been committed
+        
+        If `batchEvents` is True beforeAdd and afterAdd are replaced by 
+        beforeAddMany(datalist=datalist, type=type, user=user, kw) and 
+        afterAddMany(objs=objs, user=user, kw) called once per chunk.
+        
+        Workflow actions
+        
+        - add (called in context of the container)
+        - create (called in context of the new object)
+        """
+        app = self.app
+        if not IObjectConf.providedBy(type):
+            typedef = app.configurationQuery.GetObjectConf(type)
+            if not typedef:
+                raise ConfigurationError("Type not found (%s)" % (str(type)))
+        else:
+            typedef = type
+
+        # allow subobject
+        if not self.IsTypeAllowed(typedef, user):
+            raise ContainmentError("Add type not allowed here (%s)" % (str(type)))
+
+        wf = self.workflow
+        if not wf.WfAllow("add", user=user):
+            raise WorkflowNotAllowed("Not allowed in current workflow state (add)")
+
+        chunkSize = chunkSize or app.configuration.get("createChunkSize") or CreateChunkSize
+        commit = not kw.get("nocommit") and app.configuration.autocommit
+        listeners = app.factory.GetObjectListeners(typedef)
+        db = app.db
+        objs = []
+        for pos in range(0, len(datalist), chunkSize):
+            chunk = datalist[pos:pos+chunkSize]
+            if batchEvents:
+                self.Signal("beforeAddMany", datalist=chunk, type=type, user=user, **kw)
+            else:
+                for data in chunk:
+                    self.Signal("beforeAdd", data=data, type=type, user=user, **kw)
+            created = []
+            try:
+                entries = db.CreateEntries(pool_datatbl=typedef["dbparam"], count=len(chunk), user=user, **kw)
+                for dbEntry, data in zip(entries, chunk):
+                    obj = self.factory.DbObj(dbEntry.GetID(), dbEntry = dbEntry, parentObj = self, configuration = typedef, **kw)
+                    if typedef.events:
+                        obj.SetupEventsFromConfiguration(listeners)
+                    obj.CreateSelf(data, user=user, **kw)
+                    wf.WfAction("add", user=user)
+                    obj.Signal("create", user=user, **kw)
+                    created.append(obj)
+                if commit:
+                    batch = {}
+                    for obj in created:
+                        obj.Signal("commit", user=user, batch=batch)
+                    db.CommitEntries(entries, user=user)
+                    if batch.get("fulltext"):
+                        db.WriteFulltexts(batch["fulltext"])
+                    db.Commit()
+            except Exception as e:
+                db.Undo()
+                raise
+            if batchEvents:
+                self.Signal("afterAddMany", objs=created, user=user, **kw)
+            else:
+                for obj in created:
+                    self.Signal("afterAdd", obj=obj, user=user, **kw)
+            objs.extend(created)
+        return objs
+
+
     def CreateWithoutEventsAndSecurity(self, typedef, data, user, **kw):
         """
         Creates a new sub object. Unlike `Create` this function does not trigger any events
@@ -438,6 +539,105 @@ class ContainerWrite:
         self.Signal("afterAdd", obj=newobj, **kw)
 
 
+    def DuplicateTree(self, obj, user, updateValues=None, events=None, **kw):
+        """
+        Duplicate the object and all contained objects with set based statements and store
+        the copy as new subobject. Contained objects are not loaded. ::
+
+            obj = the object to be duplicated
+            user = the currently active user
+            updateValues = dictionary containing meta, data, files of the new object
+            events = call events. Default is `app.configuration.duplicateTreeEvents`.
+            **kw = version information
+            returns new object
+
+        Meta and data records of the subtree are copied in chunks of `INSERT ... SELECT`
+        statements and the parent references are remapped to the copies. Files are copied
+        or shared by the storage backend. 
+
+        If events are enabled or the workflow is enabled, the copied contained objects are 
+        loaded in batches for each container. Their workflow is initialized and the 
+        `duplicate` and `commit` events are called for each copy. Otherwise contained objects 
+        are not loaded and the copies are stored without workflow state.
+
+        Events
+
+        - beforeAdd(data=data, type=type, user=user, kw) called for the container
+        - duplicate(kw) called for the new object and each contained copy
+        - commit(user) called for each contained copy
+        - afterAdd(obj=obj, user=user, kw) called for the parent of each contained copy
+        - duplicateMany(ids=ids, user=user) called for the container. `ids` is a dictionary
+          {id: new id} of all copied objects.
+        - afterAdd(obj=obj, user=user, kw) called for the container after obj has been committed
+
+        Workflow action
+
+        - add (called in context of the container)
+        - create (called in context of the new object and each contained copy)
+        """
+        if updateValues is None:
+            updateValues = dict()
+        app = self.app
+        type = obj.GetTypeID()
+        # allow subobject
+        if not self.IsTypeAllowed(type, user):
+            raise ContainmentError("Add type not allowed here (%s)" % (str(type)))
+
+        wf = ObjectWorkflow(self)
+        if not wf.WfAllow("add", user=user):
+            raise WorkflowNotAllowed("Workflow: Not allowed (add)")
+        if events is None:
+            events = app.configuration.duplicateTreeEvents
+
+        db = app.db
+        ids = [obj.id] + db.GetContainedIDs(base=obj.id, sort="id")
+        if self.id in ids:
+            raise ContainmentError("Object cannot be copied to itself (%s)" % (str(obj.id)))
+        if events:
+            self.Signal("beforeAdd", data=updateValues, type=type, user=user, **kw)
+        date = db.GetDBDate()
+        values = {"pool_wfa": "", "pool_create": date, "pool_change": date,
+                  "pool_createdby": str(user or ""), "pool_changedby": str(user or "")}
+        idmap, files = db.DuplicateEntries(ids, self.id, values)
+        try:
+            newobj = self.GetObj(idmap[obj.id], queryRestraints=False, **kw)
+            newobj.CreateSelf(updateValues, user=user)
+            if events:
+                newobj.Signal("duplicate", **kw)
+            if len(idmap) > 1 and (events or app.configuration.workflowEnabled):
+                newobj._InitDuplicates(user, events, **kw)
+            if events:
+                self.Signal("duplicateMany", ids=idmap, user=user)
+            wf.WfAction("add", user=user)
+            if app.configuration.autocommit:
+                newobj.CommitInternal(user=user)
+        except Exception as e:
+            db.Undo()
+            db.ReleaseFiles(files)
+            raise
+
+        if events:
+            self.Signal("afterAdd", obj=newobj, user=user, **kw)
+        return newobj
+
+
+    def _InitDuplicates(self, user, events, **kw):
+        """
+        Initializes the workflow and calls the events for the contained copies of 
+        `DuplicateTree()`. Changes are written without committing the transaction.
+        """
+        for o in self.GetObjs(queryRestraints=False):
+            o.CreateSelf({}, user=user)
+            if events:
+                o.Signal("duplicate", **kw)
+            if o.IsContainer():
+                o._InitDuplicates(user, events, **kw)
+            o.Signal("commit", user=user)
+            o.dbEntry.Commit(user=user, dbCommit=False)
+            if events:
+                self.Signal("afterAdd", obj=o, user=user, **kw)
+
+
     def Delete(self, id, user, obj=None, **kw):
         """
         Delete the subobject referenced by id. ::
@@ -519,6 +719,81 @@ class ContainerWrite:
         return 1
 
 
+    def DeleteTree(self, id, user, obj=None, events=None, files=None, **kw):
+        """
+        Delete the subobject referenced by id and all contained objects with set based
+        statements. Contained objects are not loaded. ::
+        
+            id = id of object to be deleted
+            user = the currently active user
+            obj = the object to be deleted. Will be loaded automatically if None
+            events = call events. Default is `app.configuration.deleteTreeEvents`.
+            files = list. The file records of the deleted entries are appended if 
+                    `autocommit` is disabled
+            **kw = version information
+            returns the number of deleted objects
+
+        The subtree ids are selected in one query and the records are deleted in chunks
+        of `IN (...)` statements. Workflow permissions are checked for the object only. 
+        Physical files are removed after the database commit. If `autocommit` is disabled
+        the files are not removed. Pass a list as `files` and the collected file records
+        to `app.db.ReleaseFiles()` after the transaction has been committed.
+        
+        Events
+        
+        - delete(user=user) called on object to be deleted
+        - deleteMany(ids=ids, user=user) called on container before the objects are deleted
+        - afterDeleteMany(ids=ids, user=user) called on container after the objects have 
+          been deleted
+        - afterDelete(id=id, user=user) called on container after the objects have been deleted
+
+        Workflow action
+
+        - remove (called in context of the container)
+        - delete (called in context of the object)
+        """
+        app = self.app
+        if IObject.providedBy(id):
+            obj = id
+        if obj is None:
+            obj = self.GetObj(id, queryRestraints=False, **kw)
+            if obj is None:
+                return 0
+        if obj.parent.id != self.id:
+            raise ContainmentError("Object is not a child (%s)" % (str(id)))
+        id = obj.id
+        if events is None:
+            events = app.configuration.deleteTreeEvents
+
+        # call workflow
+        wf = ObjectWorkflow(self)
+        if not wf.WfAllow("remove", user=user):
+            raise WorkflowNotAllowed("Workflow: Not allowed (remove)")
+        if not obj.workflow.WfAllow("delete", user=user):
+            raise WorkflowNotAllowed("Workflow: Not allowed (delete)")
+
+        db = app.db
+        ids = [id] + db.GetContainedIDs(base=id, sort="id")
+        if events:
+            obj.Signal("delete", user=user)
+            self.Signal("deleteMany", ids=ids, user=user)
+        obj.workflow.WfAction("delete", user=user)
+        obj.Close()
+        if ICache.providedBy(self):
+            self.RemoveCache(ids)
+        count, removed = db.DeleteEntries(ids)
+        if app.configuration.autocommit:
+            db.Commit()
+            db.ReleaseFiles(removed)
+        elif files is not None:
+            files.extend(removed)
+        wf.WfAction("remove", user=user)
+        if events:
+            self.Signal("afterDeleteMany", ids=ids, user=user)
+            self.Signal("afterDelete", id=id, user=user)
+        return count
+
+
     def _DeleteObj(self, obj, id=0):
         """
         Deletes the object and additional data from wfdata, wflog, fulltext,
@@ -528,6 +803,8 @@ class ContainerWrite:
             id = obj.id
         obj.Close()
         if id > 0:
+            if ICache.providedBy(self):
+                self.RemoveCache(id)
             self.db.DeleteEntry(id)
 
 
@@ -772,33 +1049,68 @@ class Root(ContainerRead, ContainerWrite):
                 raise ContainmentError("Proxy object not found")
             return obj
 
-        # load tree structure
-        path = self.app.db.GetParentPath(id)
-        if path is None:
-            return None
-            # raise Exception, "NotFound"
+        # load the entry and all parents in one query. the query is restrained by the
+        # root restraints, parents with different restraints are checked separately.
+        restraints = kw.get("queryRestraints") != False
+        db = self.app.db
+        version = kw.get("version")
+        if restraints:
+            p, o = self.ObjQueryRestraints(self)
+            entries = db.GetEntryChain(id, p, o, version=version, loadData=True)
+            passed = {self._RestraintsKey(p, o): set(entries)}
+        else:
+            entries = db.GetEntryChain(id, version=version, loadData=True)
 
-        # check and adjust root id
+        # build the path up to the root. stop at adjusted root ids.
+        stop = set([self.id])
         if hasattr(self, "rootID"):
-            if self.rootID in path:
-                path = path[path.index(self.rootID) + 1:]
+            stop.add(self.rootID)
         if hasattr(self.app, "rootID"):
-            if self.app.rootID in path:
-                path = path[path.index(self.app.rootID) + 1:]
+            stop.add(self.app.rootID)
+        path = self._ChainPath(id, entries, stop)
+        if path is None and restraints:
+            # an entry is restrained. load the chain without restraints and check each
+            # level with the restraints of its container.
+            entries = db.GetEntryChain(id, version=version, loadData=True)
+            path = self._ChainPath(id, entries, stop)
+        if path is None:
+            return None
+            # raise Exception, "NotFound"
 
-        # reverse lookup of object tree. loads all parent objs.
-        path.append(id)
-        # opt
+        # reverse lookup of object tree. creates all parent objs.
         obj = self
+        target = id
         for id in path:
-            if id == self.id:
-                continue
-            obj = obj.factory.DbObj(id, **kw)
+            if restraints:
+                p, o = self.ObjQueryRestraints(obj)
+                key = self._RestraintsKey(p, o)
+                if key not in passed:
+                    passed[key] = set(db.GetEntryChain(target, p, o, version=version))
+                if id not in passed[key]:
+                    return None
+            obj = obj.factory.DbObj(id, dbEntry=entries[id], **kw)
             if not obj:
                 return None
                 # raise Exception, "NotFound"
         return obj
 
+    def _ChainPath(self, id, entries, stop):
+        # returns the list of ids from the first level to id or None if incomplete
+        if id not in entries:
+            return None
+        path = [id]
+        ref = entries[id].meta["pool_unitref"]
+        while ref and ref > 0 and ref not in stop:
+            if ref not in entries or ref in path:
+                # parent not found or restrained
+                return None
+            path.insert(0, ref)
+            ref = entries[ref].meta["pool_unitref"]
+        return path
+
+    def _RestraintsKey(self, parameter, operators):
+        return repr((sorted(parameter.items()), sorted(operators.items())))
+
     def ObjQueryRestraints(self, containerObj=None, parameter=None, operators=None):
         """
         The functions returns two dictionaries (parameter, operators) used to restraint
@@ -850,10 +1162,11 @@ class Root(ContainerRead, ContainerWrite):
 
         returns FieldConf or None
         """
-        for f in self.configuration["data"]:
-            if f["id"] == fldId:
-                return f
-        return self.app.configurationQuery.GetMetaFld(fldId)
+        query = self.app.configurationQuery
+        f = query.GetObjectFld(fldId, self.configuration)
+        if f is not None:
+            return f
+        return query.GetMetaFld(fldId)
 
     def GetTitle(self):
         """ returns the root title from configuration. """
@@ -937,25 +1250,34 @@ class ContainerFactory(object):
 
         """
         obj = self.obj
-        useCache = ICache.providedBy(obj)
+        # cached records are only used for default lookups with query restraints
+        useCache = ICache.providedBy(obj) and not (parentObj or configuration or kw.get("version") or
+                                                   kw.get("queryRestraints", None) == False)
         if useCache:
             o = obj.GetFromCache(id)
             if o:
+                # check security if context passed in keywords
+                if kw.get("securityContext") is not None and kw.get("permission"):
+                    if not kw["securityContext"].has_permission(kw["permission"], o):
+                        raise PermissionError("Permission check failed (%s)" % (str(id)))
                 return o
         app = obj.app
-        if not dbEntry:
-            # check restraints
+        if dbEntry:
+            # restraints applied by the caller are unknown
+            useCache = False
+        else:
+            # load the entry and check restraints in one query
             qr = kw.get("queryRestraints", None)
             if qr != False:
-                root = obj.root
-                p, o = root.ObjQueryRestraints(obj)
-                p["id"] = id
+                p, o = obj.root.ObjQueryRestraints(obj)
                 p["pool_unitref"] = obj.id
-                e = root.search.Select(parameter=p, operators=o)
-                if len(e) == 0:
-                    return None
-
-            dbEntry = app.db.GetEntry(id, **kw)
+            else:
+                p, o = {}, {}
+            p["id"] = id
+            # join the data table if the type is known, otherwise load data in a second query
+            dataTable = kw.get("pool_datatbl") or (configuration and configuration.get("dbparam"))
+            entries = app.db.SelectEntries(p, o, dataTable=dataTable, version=kw.get("version"), loadData=True)
+            dbEntry = entries.get(id)
             if not dbEntry:
                 return None
                 # raise Exception, "NotFound"
@@ -975,7 +1297,7 @@ class ContainerFactory(object):
             configuration = app.configurationQuery.GetObjectConf(type)
             if not configuration:
                 raise ConfigurationError("Type not found (%s)" % (str(type)))
-        newobj = ClassFactory(configuration, app.reloadExtensions, True, base=None)
+        newobj = app.factory.GetObjectClass(configuration)
         newobj = newobj(id, dbEntry, parent=parentObj, configuration=configuration, **kw)
 
         # check security if context passed in keywords
@@ -994,7 +1316,8 @@ class ContainerFactory(object):
         if len(ids) == 0:
             return []
         obj = self.obj
-        useCache = ICache.providedBy(self.obj)
+        useCache = ICache.providedBy(obj) and not (parentObj or kw.get("version") or
+                                                   kw.get("queryRestraints", None) == False)
         objs = []
         if useCache:
             load = []
@@ -1016,15 +1339,18 @@ class ContainerFactory(object):
             parentObj = obj
         securityContext = kw.get("securityContext")
         permission = kw.get("permission")
+        classes = {}
         for dbEntry in entries:
             type = dbEntry.meta.get("pool_type")
             if not type:
                 continue
-            configuration = app.configurationQuery.GetObjectConf(type, skipRoot=1)
+            if type not in classes:
+                configuration = app.configurationQuery.GetObjectConf(type, skipRoot=1)
+                classes[type] = (configuration, app.factory.GetObjectClass(configuration) if configuration else None)
+            configuration, cls = classes[type]
             if not configuration:
                 continue
-            newobj = ClassFactory(configuration, app.reloadExtensions, True, base=None)
-            newobj = newobj(dbEntry.id, dbEntry, parent=parentObj, configuration=configuration, **kw)
+            newobj = cls(dbEntry.id, dbEntry, parent=parentObj, configuration=configuration, **kw)
 
             # check security if context passed in keywords
             if securityContext is not None and permission:
@@ -1044,7 +1370,7 @@ class ContainerFactory(object):
         if configuration is None:
             raise ConfigurationError("Type not found")
         app = self.obj.app
-        obj = ClassFactory(configuration, app.reloadExtensions, True, base=None)
+        obj = app.factory.GetObjectClass(configuration)
         dbEntry = app.db.GetEntry(0, virtual=1)
         obj = obj(0, dbEntry, parent=None, configuration=configuration)
         return obj
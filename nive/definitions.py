@@ -326,6 +326,7 @@ class FieldConf(baseConf):
         settings :  Extended settings for fields. Possible values depend on datatype.
         unique   :  The field value has to be unique on database level.
         fulltext :  Use this field in fulltext index.
+        index :     Create a database index for the column. Applied by `dbStructureUpdater`.
         
     Extended values (optional and used as default for forms) ::
 
@@ -387,6 +388,7 @@ class FieldConf(baseConf):
         self.settings = {}
         self.unique = False
         self.fulltext = False
+        self.index = False
         # used as default for forms
         self.name = ""
         self.description = ""
@@ -450,8 +452,17 @@ class AppConf(baseConf):
             
         # options
         fulltextIndex :    Enable fulltext index based on FieldConf.fulltext setting.
+        fulltextQueue :    Queue fulltext updates and write them in batches after the request
+                           has finished. See `nive.extensions.fulltext`.
+        fulltextBatchSize : Number of queued fulltext entries written with one statement.
+        indexes :          List of additional meta table indexes. Each index is a tuple of
+                           column names. The default indexes are defined in `definitions.Indexes`.
         autocommit :       Enable autocommit for object write and delete operations.
+        deleteTreeEvents : Call events in `Container.DeleteTree()`. Default is True.
+        duplicateTreeEvents : Call events in `Container.DuplicateTree()`. Default is True.
         useCache :         Cache database on application level.
+        entryCacheSize :   Maximum number of records in the container cache. See `nive.extensions.cache`.
+        nameCacheSize :    Maximum number of names in the traversal name cache.
         frontendCodepage : Default=utf-8. The codepage used to render the html frontend.
         workflowEnabled :  Enable or disable the workflow engine.
         events  : Register for one or multiple Application events. 
@@ -480,9 +491,16 @@ class AppConf(baseConf):
         
         # data pool
         self.autocommit = True
+        self.deleteTreeEvents = True
+        self.duplicateTreeEvents = True
         self.useCache = True
+        self.entryCacheSize = 1000
+        self.nameCacheSize = 1000
         self.frontendCodepage = "utf-8"
         self.fulltextIndex = False
+        self.fulltextQueue = False
+        self.fulltextBatchSize = 100
+        self.indexes = []
         self.workflowEnabled = False
         self.timezone = None
         
@@ -580,11 +598,23 @@ class DatabaseConf(baseConf):
         user     : database server user.
         password : database server password.
         useTrashcan : Move files to fileRoot.__traschcan directory on delete.
+        fileStorage : File storage backend. "local" (default) stores one file for each entry
+                      and file key. "blob" stores content addressed files shared by entries 
+                      with the same file contents. Or a dotted python name of a storage class.
         unicode  : Database is using unicode mode.
         dbCodePage : If not in unicode mode, the database codepage used (default "utf-8").
         connection : Specifies the database connection management class. Default None.
+                     Use "pool" to share a bounded pool of connections across requests.
         verifyConnection : Verify connection is still alive each time a connection is requested.
                            Automatically reconnects if the connection is closed.
+        revalidate : Skip verification if the connection has been verified within the last 
+                     `revalidate` seconds. 0 verifies each time.
+        poolSize : Pooled connections only. Maximum number of open connections (default 10).
+        poolMinSize : Pooled connections only. Number of connections kept open (default 0).
+        poolTimeout : Pooled connections only. Seconds to wait for a free connection before
+                      raising an OperationalError (default 10).
+        poolIdleTime : Pooled connections only. Close idle connections after `poolIdleTime`
+                       seconds (default 300). 0 disables eviction.
         timeout  : Timeout in seconds for database requests, if supported.
         querylog : Enable database query log. "querylog" is used as filename the application 
                    will use for the query log and the number of traceback lines. 
@@ -606,10 +636,16 @@ class DatabaseConf(baseConf):
         self.user = ""
         self.password = ""
         self.useTrashcan = False
+        self.fileStorage = None
         self.unicode = True # [3] deprecated
         self.timeout = 3
         self.verifyConnection = False
+        self.revalidate = 0
         self.connection = None
+        self.poolSize = 10
+        self.poolMinSize = 0
+        self.poolTimeout = 10
+        self.poolIdleTime = 300
         self.dbCodePage = "utf-8"
         self.querylog=(0,None)
         baseConf.__init__(self, copyFrom, **values)
@@ -651,6 +687,8 @@ class ObjectConf(baseConf):
                    additional functionality. Used in object factory.
         data :     List of nive.definitions.FieldConf classes. Are mapped to the data table
                    except for "file" data types. 
+        indexes :  List of additional data table indexes. Each index is a tuple of column
+                   names, e.g. [("email",), ("lastname","firstname")].
         template : Template file name to render the default view. If file name is a
                    relative path ('text.pt') the template is looked up in the active 
                    design or view module templatePath. The file name can also be a 
@@ -705,6 +743,7 @@ class ObjectConf(baseConf):
         self.translations = None
         self.description = ""
         self.version = "1"
+        self.indexes = []
         baseConf.__init__(self, copyFrom, **values)
         from . import helper
         d=[]
@@ -1487,6 +1526,12 @@ FieldConf(id="pool_wfp",       datatype="list",      size=35,    default="",   r
 FieldConf(id="pool_wfa",       datatype="list",      size=35,    default="",   required=0,   readonly=0, name=_("Workflow Activity")),
 )
 
+# optional materialized path of parent ids. Add to `AppConf.meta` to enable the path index 
+# and run `nive.tools.rebuildPathIndex` for existing databases.
+PathIndexFlds=(
+FieldConf(id="pool_path",      datatype="text",      size=65535, default="",   required=0,   readonly=1, index=True, name=_("Path index")),
+)
+
 dc = copy.deepcopy
 AllMetaFlds = dc(list(SystemFlds)) + dc(list(UtilityFlds)) + dc(list(UserFlds)) + dc(list(WorkflowFlds)) 
 
@@ -1533,6 +1578,17 @@ LocalGroupsTbl: {"identity": None,
 )}
 }
 
+"""
+``Indexes`` defines the default secondary indexes of the meta table and the additional tables. 
+Each index is a tuple of column names. Indexes are created by `nive.tools.dbStructureUpdater`.
+"""
+Indexes={
+MetaTbl:        (("pool_unitref",), ("pool_filename",), ("pool_type",), ("pool_datatbl", "pool_dataref")),
+FileTbl:        (("id", "filekey"), ("path",)),
+FulltextTbl:    (("id",),),
+LocalGroupsTbl: (("id", "userid"), ("userid",)),
+}
+
 # select tags (pool_stag) ----------------------------------------------------------------------------
 
 StagContainer = 0        # 0-9
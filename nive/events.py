@@ -43,10 +43,158 @@ to the __init__ function: ::
 
     def __init__(self):
         self.Signal("init")
+
+Handlers registered by name are resolved once per class and signature checks for callables
+once per function. To find expensive handlers enable the signal statistics: ::
+
+    stats = EnableSignalStats()
+    ...
+    stats.GetStats()
+    DisableSignalStats()
     
 """
 
 import inspect
+import threading
+import weakref
+from time import perf_counter
+from collections.abc import Mapping
+
+
+def InitChain(cls):
+    """
+    Returns the `Init()` functions of the class and all super classes in method resolution
+    order. The list is resolved once and stored as `_c_inits` in the class itself.
+    """
+    try:
+        return cls.__dict__["_c_inits"]
+    except KeyError:
+        pass
+    inits = []
+    for c in cls.__mro__:
+        f = c.__dict__.get("Init")
+        if f is not None:
+            inits.append(f)
+    inits = tuple(inits)
+    setattr(cls, "_c_inits", inits)
+    return inits
+
+
+def Handlers(cls, name):
+    """
+    Returns the functions named `name` of the class and all super classes in method
+    resolution order as tuple of (function, str(class)). The table is stored as
+    `_c_handlers` in the class itself.
+    """
+    try:
+        table = cls.__dict__["_c_handlers"]
+    except KeyError:
+        table = {}
+        setattr(cls, "_c_handlers", table)
+    try:
+        return table[name]
+    except KeyError:
+        pass
+    handlers = []
+    for c in cls.__mro__:
+        f = c.__dict__.get(name)
+        if f is not None:
+            handlers.append((f, str(c)))
+    handlers = tuple(handlers)
+    table[name] = handlers
+    return handlers
+
+
+_contextArgs = weakref.WeakKeyDictionary()
+
+def PassContext(fnc):
+    """
+    Returns True if the callback takes a `context` argument. The result is cached
+    for each function.
+    """
+    key = getattr(fnc, "__func__", fnc)
+    try:
+        return _contextArgs[key]
+    except (KeyError, TypeError):
+        pass
+    flag = "context" in inspect.getfullargspec(fnc).args
+    try:
+        _contextArgs[key] = flag
+    except TypeError:
+        # not weak referenceable
+        pass
+    return flag
+
+
+class SignalStats(object):
+    """
+    Counts fired signals and handler calls and sums up the time spent in handlers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.signals = {}
+        self.handlers = {}
+
+    def Count(self, signal):
+        with self._lock:
+            self.signals[signal] = self.signals.get(signal, 0) + 1
+
+    def Add(self, signal, handler, seconds):
+        key = (signal, handler)
+        with self._lock:
+            calls, time = self.handlers.get(key, (0, 0.0))
+            self.handlers[key] = (calls+1, time+seconds)
+
+    def Clear(self):
+        with self._lock:
+            self.signals.clear()
+            self.handlers.clear()
+
+    def GetStats(self):
+        """
+        returns a dictionary {signal: {"calls": n, "time": seconds, "handlers": [(handler, calls, seconds)]}}.
+        Handlers are sorted by time spent, the most expensive first.
+        """
+        with self._lock:
+            stats = {}
+            for signal, calls in self.signals.items():
+                stats[signal] = {"calls": calls, "time": 0.0, "handlers": []}
+            for (signal, handler), (calls, seconds) in self.handlers.items():
+                s = stats.setdefault(signal, {"calls": 0, "time": 0.0, "handlers": []})
+                s["time"] += seconds
+                s["handlers"].append((handler, calls, seconds))
+            for s in stats.values():
+                s["handlers"].sort(key=lambda h: h[2], reverse=True)
+            return stats
+
+
+_stats = None
+
+def EnableSignalStats():
+    """
+    Starts collecting signal statistics for all event objects. Returns the `SignalStats` object.
+    """
+    global _stats
+    if _stats is None:
+        _stats = SignalStats()
+    return _stats
+
+def DisableSignalStats():
+    """
+    Stops collecting signal statistics and returns the collected `SignalStats` or None.
+    """
+    global _stats
+    stats = _stats
+    _stats = None
+    return stats
+
+def GetSignalStats():
+    """
+    Returns the active `SignalStats` or None.
+    """
+    return _stats
+
 
 class Events(object):
     """
@@ -59,19 +207,24 @@ class Events(object):
         """
         if not hasattr(self, "_eventdispatch"):
             self._eventdispatch = {}
-        for cls in self.__class__.__mro__:
-            f = cls.__dict__.get("Init")
-            if f is not None:
-                f(self)
+        for f in InitChain(self.__class__):
+            f(self)
 
 
     def SetupEventsFromConfiguration(self, events):
         """
         Calls ListenEvent for each event registered in a configuration.events slot.
 
-        :param events: list of events to listen to
+        :param events: list of events to listen to or a dictionary {signal: (callbacks)}
         :return: nothing
         """
+        if isinstance(events, Mapping):
+            for signal, callbacks in events.items():
+                if signal not in self._eventdispatch:
+                    self._eventdispatch[signal] = list(callbacks)
+                else:
+                    self._eventdispatch[signal].extend(callbacks)
+            return
         for e in events:
             self.ListenEvent(e.event, e.callback)
                 
@@ -124,25 +277,39 @@ class Events(object):
         if signal=="init":
             self.InitEvents()
             #return
-        if not self._eventdispatch or not signal in self._eventdispatch:
+        stats = _stats
+        if stats is not None:
+            stats.Count(signal)
+        dispatch = self._eventdispatch
+        if not dispatch:
+            return None
+        fncs = dispatch.get(signal)
+        if fncs is None:
             return None
         result = []
-        for fnc in self._eventdispatch[signal]:
+        for fnc in fncs:
             try:
                 if isinstance(fnc, str):
-                    for cls in self.__class__.__mro__:
-                        f = cls.__dict__.get(fnc)
-                        if f is not None:
+                    for f, cls in Handlers(self.__class__, fnc):
+                        if stats is not None:
+                            t = perf_counter()
+                            r = f(self, **kw)
+                            stats.Add(signal, getattr(f, "__qualname__", fnc), perf_counter()-t)
+                        else:
                             r = f(self, **kw)
-                            if r is not None:
-                                # store result if not None as tuple
-                                # (result, str(fnc), str(cls))
-                                result.append((r, str(fnc), str(cls)))
+                        if r is not None:
+                            # store result if not None as tuple
+                            # (result, str(fnc), str(cls))
+                            result.append((r, fnc, cls))
                 else:
-                    if "context" in inspect.getfullargspec(fnc).args:
+                    if stats is not None:
+                        t = perf_counter()
+                    if PassContext(fnc):
                         r = fnc(context=self, **kw)
                     else:
                         r = fnc(**kw)
+                    if stats is not None:
+                        stats.Add(signal, getattr(fnc, "__qualname__", str(fnc)), perf_counter()-t)
                     if r is not None:
                         # store result if not None as tuple
                         # (result)
@@ -0,0 +1,266 @@
+# Copyright 2012, 2013 Arndt Droullier, Nive GmbH. All rights reserved.
+# Released under GPL3. See license.txt
+#
+
+__doc__ = """
+Container cache extension module
+--------------------------------
+Caches loaded meta and data records of objects for roots and containers. Objects
+are not shared between requests. Each cache hit creates a new object based on the
+cached records without querying the database.
+
+The records are stored in a bounded LRU cache shared by all roots and containers of
+the application. Records are cached together with the root and the query restraints
+used to load them and are only returned for the same root and restraints. Lookups with
+`version`, `parentObj`, `configuration` or `queryRestraints=False` skip the cache. 
+Use `app.configuration.entryCacheSize` to set the maximum number of cached records 
+(default 1000).
+
+Cached records are removed if an entry is committed (`Entry.Commit()`, 
+`CommitEntries()`), deleted, moved or its workflow state changes. The cache is local 
+to the process. Changes written by other processes or by direct sql statements are not
+noticed, so use the cache only if the application is the single writer.
+
+Usage ::
+
+    app.modules.append("nive.extensions.cache")
+
+The cache statistics (hits, misses, evictions, invalidations) are returned by
+`GetCacheStats()`.
+
+`GetNameCache(app)` returns the traversal name cache used by the path extensions. It maps
+(parent id, url path filename) to object ids. Use `app.configuration.nameCacheSize` to set
+the maximum number of names (default 1000).
+"""
+
+import copy
+import threading
+from collections import OrderedDict
+
+from nive.definitions import ModuleConf, Conf
+from nive.definitions import implementer, ICache
+
+
+CacheSize = 1000
+
+
+class EntryCache(object):
+    """
+    Thread safe LRU cache for object records. Keys are tuples of (id, version).
+    Keys are indexed by object id to remove all records of an object without 
+    scanning the cache.
+    """
+
+    def __init__(self, maxsize=CacheSize):
+        self.maxsize = maxsize
+        self._records = OrderedDict()
+        self._ids = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._records)
+
+    def Get(self, key):
+        with self._lock:
+            try:
+                record = self._records.pop(key)
+            except KeyError:
+                self.misses += 1
+                return None
+            self._records[key] = record
+            self.hits += 1
+            return record
+
+    def Set(self, key, record):
+        with self._lock:
+            if key in self._records:
+                self._Unindex(key, self._records.pop(key))
+            self._records[key] = record
+            self._ids.setdefault(self._ID(key, record), set()).add(key)
+            while len(self._records) > self.maxsize:
+                key, record = self._records.popitem(last=False)
+                self._Unindex(key, record)
+                self.evictions += 1
+
+    def Remove(self, id):
+        """
+        Removes all versions of the record
+        """
+        with self._lock:
+            self._Remove(id)
+
+    def RemoveMany(self, ids):
+        """
+        Removes all versions of the records
+        """
+        with self._lock:
+            for id in ids:
+                self._Remove(id)
+
+    def Clear(self):
+        with self._lock:
+            self._records.clear()
+            self._ids.clear()
+
+    def GetStats(self):
+        with self._lock:
+            return dict(size=len(self._records), maxsize=self.maxsize, hits=self.hits, misses=self.misses,
+                        evictions=self.evictions, invalidations=self.invalidations)
+
+    def _ID(self, key, record):
+        # the object id the key is indexed with
+        return key[0]
+
+    def _Remove(self, id):
+        for key in self._ids.pop(id, ()):
+            del self._records[key]
+            self.invalidations += 1
+
+    def _Unindex(self, key, record):
+        id = self._ID(key, record)
+        keys = self._ids.get(id)
+        if keys is None:
+            return
+        keys.discard(key)
+        if not keys:
+            del self._ids[id]
+
+
+def GetEntryCache(app):
+    """
+    Returns the application wide record cache
+    """
+    cache = getattr(app, "_c_entrycache", None)
+    if cache is None:
+        cache = EntryCache(app.configuration.entryCacheSize or CacheSize)
+        app._c_entrycache = cache
+    db = app.db
+    if db is not None:
+        # invalidate records of entries committed without objects
+        db.AddCommitListener(cache.Remove)
+    return cache
+
+
+class NameCache(EntryCache):
+    """
+    Thread safe LRU cache for traversal names. Keys are tuples of (parent id, name),
+    values are object ids. Keys are indexed by the object id.
+    """
+
+    def _ID(self, key, record):
+        return record
+
+
+def GetNameCache(app):
+    """
+    Returns the application wide traversal name cache
+    """
+    cache = getattr(app, "_c_namecache", None)
+    if cache is None:
+        cache = NameCache(app.configuration.nameCacheSize or CacheSize)
+        app._c_namecache = cache
+    return cache
+
+
+@implementer(ICache)
+class ContainerCache(object):
+    """
+    Caches meta and data records of contained objects.
+    """
+
+    def Cache(self, obj, id):
+        """
+        Store the records of the loaded object. Objects with uncommitted changes or without
+        meta records are skipped. Data is loaded if not preloaded.
+        """
+        entry = obj.dbEntry
+        if entry is None or entry.virtual:
+            return
+        if entry.meta.IsEmpty() or entry.meta.HasTemp() or entry.data.HasTemp():
+            return
+        record = (copy.deepcopy(entry.meta.copy()), copy.deepcopy(entry.data.copy()))
+        GetEntryCache(self.app).Set(self._CacheKey(id, entry.version), record)
+
+    def GetFromCache(self, id, version=None):
+        """
+        Returns a new object created from the cached records or None. Only records 
+        loaded with the current root and query restraints are returned.
+        """
+        record = GetEntryCache(self.app).Get(self._CacheKey(id, version))
+        if record is None:
+            return None
+        meta, data = record
+        if meta.get("pool_unitref") != self.id:
+            return None
+        app = self.app
+        configuration = app.configurationQuery.GetObjectConf(meta.get("pool_type"))
+        if not configuration:
+            return None
+        entry = app.db.GetEntry(id, preload="skip", version=version,
+                               pool_datatbl=meta.get("pool_datatbl"), pool_dataref=meta.get("pool_dataref"))
+        entry.meta.SetContent(copy.deepcopy(meta))
+        entry.data.SetContent(copy.deepcopy(data))
+        obj = app.factory.GetObjectClass(configuration)
+        return obj(id, entry, parent=self, configuration=configuration)
+
+    def _CacheKey(self, id, version):
+        # records are cached for the root and the query restraints used to load them
+        root = self.root
+        p, o = root.ObjQueryRestraints(self)
+        restraints = repr((sorted(p.items()), sorted(o.items())))
+        return (id, version, root.__name__, restraints)
+
+    def GetAllFromCache(self):
+        """
+        Objects are not kept in memory.
+        """
+        return []
+
+    def RemoveCache(self, id):
+        """
+        Remove the records of the object or a list of objects from the cache
+        """
+        if isinstance(id, (list, tuple, set)):
+            GetEntryCache(self.app).RemoveMany(id)
+            return
+        GetEntryCache(self.app).Remove(id)
+
+    def GetCacheStats(self):
+        """
+        returns cache hits, misses, evictions, invalidations, size and maxsize as dictionary
+        """
+        return GetEntryCache(self.app).GetStats()
+
+
+
+def SetupContainerCache(app, pyramidConfig):
+    # get all roots and objects and add extension
+    extension = "nive.extensions.cache.ContainerCache"
+    def add(confs):
+        for c in confs:
+            e = c.extensions
+            if e and extension in e:
+                continue
+            if e is None:
+                e = []
+            if isinstance(e, tuple):
+                e = list(e)
+            e.append(extension)
+            c.unlock()
+            c.extensions = tuple(e)
+            c.lock()
+
+    add(app.configurationQuery.GetAllRootConfs())
+    add(app.configurationQuery.GetAllObjectConfs())
+
+
+configuration = ModuleConf(
+    id = "containerCache",
+    name = "Object record cache for roots and containers",
+    context = "nive.extensions.cache",
+    events = (Conf(event="startRegistration", callback=SetupContainerCache),),
+)
@@ -3,6 +3,8 @@
 #
 
 from nive.definitions import ModuleConf, Conf
+from nive.extensions.cache import GetNameCache
+from nive.extensions.path import LookupFilename, LookupPath
 
 
 class FilenameLookup(object):
@@ -15,6 +17,9 @@ class FilenameLookup(object):
     """
     def Init(self):
         self.__name__ = self.meta.pool_filename or str(self.id)
+        self.ListenEvent("pathupdate", "RemoveNameCache")
+        self.ListenEvent("moved", "RemoveNameCache")
+        self.ListenEvent("delete", "RemoveNameCache")
 
     def __getitem__(self, id):
         """
@@ -32,17 +37,30 @@ class FilenameLookup(object):
         try:
             id = int(id)
         except:
-            name = id
-            id = 0
-            if name:
-                id = self.root.search.FilenameToID(name, self.id)
-            if not id:
+            o = None
+            if id:
+                o = LookupFilename(self, id)
+            if o is None:
                 raise KeyError(id)
+            return o
         o = self.GetObj(id)
         if not o:
             raise KeyError(id)
         return o
 
+    def LookupPath(self, path):
+        """
+        Resolves the url path (list of names or string) below this object with a single 
+        query. See `nive.extensions.path.LookupPath()`.
+        """
+        return LookupPath(self, path)
+
+    def RemoveNameCache(self, **kw):
+        """
+        Removes the object from the traversal name cache
+        """
+        GetNameCache(self.app).Remove(self.id)
+
 
 
 def SetupFilenameLookup(app, pyramidConfig):
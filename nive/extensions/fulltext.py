@@ -1,66 +1,117 @@
+__doc__ = """
+Fulltext extension
+------------------
+Updates the fulltext index of objects on commit. The index is only written if one of the
+fields marked as `fulltext` has changed. Objects customizing `GetTexts()` are always updated
+because their texts may depend on other objects.
+
+If `app.configuration.fulltextQueue` is set, commits store the changed field values in an
+application wide queue instead of writing the index. After the request has finished the
+queue is written in its own transactions in batches of `fulltextBatchSize` (default 100)
+entries. The queue is never written as part of a request transaction. Call 
+`FlushFulltext(app)` to write the queue outside of requests. Objects customizing `GetTexts()`
+do not use the queue.
+
+The queue is kept in process memory and is not durable. Queued entries are lost if the
+process ends before the queue has been written. Run `updatefulltext` to rebuild the index
+after a crash.
+
+The tool `updatefulltext` rewrites the index for all objects. Texts are extracted in
+parallel processes, objects customizing `GetTexts()` are processed in the tool process. 
+The progress is stored in a checkpoint file. An interrupted rebuild can be resumed.
+"""
+
+import os
+import threading
+import concurrent.futures
 
 from bs4 import BeautifulSoup
+from pyramid.threadlocal import get_current_request
 
 from nive.tool import Tool, ToolView
 
 from nive.definitions import ModuleConf, ToolConf, Conf, ViewConf, FieldConf, IApplication
 
 
+BatchSize = 100
 
 
 class Fulltext:
     """
-    Fulltext support for cms pages. Automatically updates fulltext on commit. 
+    Fulltext support for cms pages. Automatically updates fulltext on commit.
     """
 
     def Init(self):
-        self.ListenEvent("commit", "UpdateFulltext")
+        self.ListenEvent("commit", "CommitFulltext")
+
+
+    def CommitFulltext(self, **kw):
+        """
+        Updates the fulltext on commit if one of the fulltext fields has changed.
+        Changes are queued if `fulltextQueue` is enabled. Objects customizing `GetTexts()`
+        are updated on every commit.
+        """
+        if not self.app.configuration.fulltextIndex:
+            return
+        if not _DefaultTexts(self):
+            self.UpdateFulltext(**kw)
+            return
+        if not self.FulltextChanged():
+            return
+        if kw.get("batch") is None and self.app.configuration.fulltextQueue:
+            GetFulltextQueue(self.app).Add(self.id, self.GetFulltextValues())
+            return
+        self.UpdateFulltext(**kw)
 
 
     def UpdateFulltext(self, **kw):
         """
         Update fulltext for entry. Text is generated automatically.
+        If called with `batch` the text is stored for `db.WriteFulltexts()`.
         """
         if not self.app.configuration.fulltextIndex:
             return
         # get text from contained elements
         text = self.GetTexts()
+        batch = kw.get("batch")
+        if batch is not None:
+            batch.setdefault("fulltext", {})[self.id] = self.FormatFulltext(text)
+            return
         self.dbEntry.WriteFulltext(self.FormatFulltext(text))
 
 
+    def FulltextChanged(self):
+        """
+        Returns True if one of the fulltext fields has been changed
+        """
+        entry = self.dbEntry
+        for fld, meta in FulltextFields(self.app, self.configuration):
+            wrapper = entry.meta if meta else entry.data
+            if wrapper.HasChanged(fld["id"]):
+                return True
+        return False
+
+
     def FormatFulltext(self, textlist):
         # formats the raw text better display
-        return "\r\n\r\n".join(textlist)
+        return FormatTexts(textlist)
 
     def GetTexts(self):
         # loop all fulltext fields and make one string
-        text = []
-        for fld in self.app.configurationQuery.GetAllMetaFlds(ignoreSystem=False):
-            if not fld.get("fulltext"):
-                continue
-            value = self.meta.get(fld["id"], "")
-            if not value:
-                continue
-            if fld.datatype=="htext":
-                soup = BeautifulSoup(value, "html.parser")
-                text.append(soup.get_text())
-            else:
-                text.append(str(value))
-
-        # data
-        for fld in self.configuration.data:
-            if not fld.get("fulltext"):
-                continue
-            value = self.data.get(fld["id"], "")
+        return ExtractTexts(self.GetFulltextValues())
+
+    def GetFulltextValues(self):
+        """
+        Returns the values of all fulltext fields as list of (datatype, value)
+        """
+        values = []
+        for fld, meta in FulltextFields(self.app, self.configuration):
+            wrapper = self.meta if meta else self.data
+            value = wrapper.get(fld["id"], "")
             if not value:
                 continue
-            if fld.datatype=="htext":
-                soup = BeautifulSoup(value, "html.parser")
-                text.append(soup.get_text())
-            else:
-                text.append(str(value))
-
-        return text
+            values.append((fld.datatype, value))
+        return values
 
     def GetFulltext(self):
         """
@@ -79,7 +130,144 @@ class Fulltext:
         self.dbEntry.DeleteFulltext()
 
 
+def FulltextFields(app, configuration):
+    """
+    Returns the meta and data fields marked as fulltext as list of (field, is meta field)
+    """
+    fields = []
+    for fld in app.configurationQuery.GetAllMetaFlds(ignoreSystem=False):
+        if fld.get("fulltext"):
+            fields.append((fld, True))
+    for fld in configuration.data:
+        if fld.get("fulltext"):
+            fields.append((fld, False))
+    return fields
+
+
+def ExtractTexts(values):
+    """
+    Converts the list of (datatype, value) to texts. Html is converted to plain text.
+    Can be used in process pools.
+    """
+    text = []
+    for datatype, value in values:
+        if datatype=="htext":
+            soup = BeautifulSoup(value, "html.parser")
+            text.append(soup.get_text())
+        else:
+            text.append(str(value))
+    return text
+
+
+def FormatTexts(textlist):
+    return "\r\n\r\n".join(textlist)
+
+
+class FulltextQueue(object):
+    """
+    Thread safe queue of changed fulltext values. Keys are object ids, later changes
+    replace queued values. The queue is written after the current request has finished.
+    """
+
+    def __init__(self, batchSize=BatchSize):
+        self.batchSize = batchSize
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._values)
+
+    def Add(self, id, values):
+        with self._lock:
+            self._values[id] = values
+        self._FlushAfterRequest()
+
+    def Pop(self, max=0):
+        """
+        Removes and returns up to `max` queued entries as dictionary
+        """
+        with self._lock:
+            if not max or max >= len(self._values):
+                values = self._values
+                self._values = {}
+                return values
+            values = {}
+            for id in list(self._values.keys())[:max]:
+                values[id] = self._values.pop(id)
+            return values
+
+    def Requeue(self, values):
+        """
+        Adds popped entries again, e.g. if writing failed. Entries changed in the 
+        meantime are not replaced.
+        """
+        with self._lock:
+            for id, v in values.items():
+                if id not in self._values:
+                    self._values[id] = v
+
+    def Clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def _FlushAfterRequest(self):
+        request = get_current_request()
+        if request is None or getattr(request, "__nive_fulltext__", None) is self:
+            return
+        request.__nive_fulltext__ = self
+        request.add_finished_callback(self._Flush)
+
+    def _Flush(self, request):
+        try:
+            FlushFulltext(self.app)
+        except Exception as e:
+            self.app.log.error("Fulltext: Failed to write queued texts: %s" % str(e))
+
+
+def GetFulltextQueue(app):
+    """
+    Returns the application wide fulltext queue
+    """
+    queue = getattr(app, "_c_fulltextqueue", None)
+    if queue is None:
+        queue = FulltextQueue(app.configuration.fulltextBatchSize or BatchSize)
+        queue.app = app
+        app._c_fulltextqueue = queue
+    return queue
+
+
+def FlushFulltext(app):
+    """
+    Writes all queued fulltext values in batches. Each batch is written and committed in
+    its own transaction, so do not call it with pending changes. If writing fails the 
+    batch is rolled back and queued again and the exception is raised.
+
+    returns the number of written entries
+    """
+    queue = GetFulltextQueue(app)
+    count = 0
+    db = app.db
+    while len(queue):
+        values = queue.Pop(queue.batchSize)
+        try:
+            texts = dict([(id, FormatTexts(ExtractTexts(v))) for id, v in values.items()])
+            db.WriteFulltexts(texts)
+            db.Commit()
+        except:
+            db.Undo()
+            queue.Requeue(values)
+            raise
+        count += len(texts)
+    return count
+
+
 class RewriteFulltext(Tool):
+    """
+    Rewrites the fulltext index of all published objects in batches. Texts are extracted
+    in `workers` processes. The last written id is stored in a checkpoint file after each
+    batch. If `resume` is set the rebuild continues after the checkpoint.
+    """
+    batchSize = 200
 
     def _Run(self, **values):
 
@@ -87,42 +275,123 @@ class RewriteFulltext(Tool):
         app = self.app
         root = app.root
         datapool = app.db
-        conn = datapool.connection
-        c = conn.cursor()
+        checkpoint = self.CheckpointPath()
 
-        # delete
-        sql = "delete from pool_fulltext"
-        c.execute(sql)
-        c.close()
-        conn.commit()
-        self.stream.write("Deleted previous fulltext index.<br>")
+        start = 0
+        if values.get("resume"):
+            start = self.ReadCheckpoint()
+            if start:
+                self.stream.write("Resuming after %(id)d.<br>" % {"id": start})
 
-        pages = root.search.Select(parameter={"pool_state": 1})
+        pages = [page[0] for page in root.search.Select(parameter={"pool_state": 1}, sort="id", ascending=1)]
+        if not start:
+            # delete entries not rewritten
+            ph = datapool.placeholder
+            sql = "DELETE FROM %s WHERE id NOT IN (SELECT id FROM %s WHERE pool_state=%s)" % (datapool.FulltextTable, datapool.MetaTable, ph)
+            datapool.Execute(sql, [1]).close()
+            datapool.Commit()
+            self.stream.write("Deleted previous fulltext index.<br>")
+        pages = [id for id in pages if id > start]
+
+        workers = int(values.get("workers") or 0) or None
+        executor = None
+        if workers != 1:
+            executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
         cnt = len(pages)
         err = 0
-        for page in pages:
-            page = page[0]
+        try:
+            for pos in range(0, cnt, self.batchSize):
+                chunk = pages[pos:pos+self.batchSize]
+                err += self._Batch(chunk, executor)
+                self.WriteCheckpoint(chunk[-1])
+                self.stream.write("%(pos)d of %(cnt)d pages.<br>" % {"pos": pos+len(chunk), "cnt": cnt})
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stream.write("Updated fulltext index. Finished.<br>")
+        self.stream.write("%(cnt)d pages. %(err)d failed.<br>" % {"cnt": cnt, "err": err})
+        return self.stream, 1
+
+
+    def _Batch(self, ids, executor):
+        # loads the objects, extracts the texts and writes the batch with one statement
+        root = self.app.root
+        err = 0
+        objs = []
+        for id in ids:
             try:
-                obj = root.LookupObj(page)
+                obj = root.LookupObj(id)
             except TypeError:
                 err += 1
-                self.stream.write("Error: Invalid obj (%(id)d).<br>" % {"id": page})
+                self.stream.write("Error: Invalid obj (%(id)d).<br>" % {"id": id})
                 continue
             if not obj:
                 err += 1
-                self.stream.write("Error: Unable to open page (%(id)d).<br>" % {"id": page})
-            else:
-                try:
-                    obj.UpdateFulltext()
-                except Exception as e:
-                    err += 1
-                    self.stream.write("Error: Unable to update page (%(id)d).<br>" % {"id": page})
-                    self.stream.write(str(e))
-                    self.stream.write("<br><br>")
-        conn.commit()
-        self.stream.write("Updated fulltext index. Finished.<br>")
-        self.stream.write("%(cnt)d pages. %(err)d failed.<br>" % {"cnt": cnt, "err": err})
-        return self.stream, 1
+                self.stream.write("Error: Unable to open page (%(id)d).<br>" % {"id": id})
+                continue
+            if not hasattr(obj, "GetTexts"):
+                continue
+            objs.append(obj)
+
+        # texts of objects with default GetTexts() are extracted in the process pool
+        jobs = []
+        for obj in objs:
+            try:
+                if executor is not None and _DefaultTexts(obj):
+                    text = executor.submit(ExtractTexts, obj.GetFulltextValues())
+                else:
+                    text = obj.GetTexts()
+            except Exception as e:
+                err += 1
+                self._TextError(obj, e)
+                continue
+            jobs.append((obj, text))
+        fulltexts = {}
+        for obj, text in jobs:
+            try:
+                if isinstance(text, concurrent.futures.Future):
+                    text = text.result()
+                fulltexts[obj.id] = obj.FormatFulltext(text)
+            except Exception as e:
+                err += 1
+                self._TextError(obj, e)
+        db = self.app.db
+        try:
+            db.WriteFulltexts(fulltexts)
+            db.Commit()
+        except Exception as e:
+            db.Undo()
+            err += len(fulltexts)
+            self.stream.write("Error: Unable to update pages (%(ids)s).<br>" % {"ids": ", ".join([str(id) for id in fulltexts])})
+            self.stream.write(str(e))
+            self.stream.write("<br><br>")
+        return err
+
+
+    def _TextError(self, obj, e):
+        self.stream.write("Error: Unable to extract text (%(id)d). %(error)s<br>" % {"id": obj.id, "error": str(e)})
+
+
+    def CheckpointPath(self):
+        return os.path.join(str(self.app.db.root), "_fulltext-%s.checkpoint" % self.app.configuration.id)
+
+    def ReadCheckpoint(self):
+        try:
+            with open(self.CheckpointPath()) as f:
+                return int(f.read().strip() or 0)
+        except (IOError, ValueError):
+            return 0
+
+    def WriteCheckpoint(self, id):
+        with open(self.CheckpointPath(), "w") as f:
+            f.write(str(id))
+
+
+def _DefaultTexts(obj):
+    # True if the object uses the field values based GetTexts() of the extension
+    return getattr(type(obj), "GetTexts", None) is Fulltext.GetTexts
 
 
 def SetupFulltext(app, pyramidConfig):
@@ -154,6 +423,8 @@ toolconf = ToolConf(
     apply=(IApplication,),
     mimetype="text/html",
     data=[
+        FieldConf(id="resume", datatype="bool", default=0, name="Resume", description="Continue an interrupted rewrite at the last checkpoint."),
+        FieldConf(id="workers", datatype="number", default=0, name="Parallel processes", description="Number of processes extracting texts. 0 uses the number of CPUs, 1 extracts in this process."),
         FieldConf(id="tag", datatype="string", default="updatefulltext", hidden=1)
     ],
     views=[
@@ -168,4 +439,3 @@ configuration = ModuleConf(
     events=(Conf(event="startRegistration", callback=SetupFulltext),),
     modules=[toolconf]
 )
-
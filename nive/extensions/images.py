@@ -34,10 +34,21 @@ Fill ::
     
 If either width or height is 0 the new image is scaled proportionally.
 See PIL documentation for possible format and quality values.
+
+Profiles can use the destination of another profile as source. These profiles are
+converted after the source image has been created (see `ProfileStages()`).
+
+The source image is decoded once and all versions are derived from the in memory image.
+Large JPEGs are decoded in reduced size (`Image.draft()`) and other formats reduced
+(`Image.reduce()`) if all profiles are much smaller than the source. Conversion is done by
+the module function `ConvertImage()` which can be used in process pools. The tool
+`processImages` converts the images of many objects in parallel.
  
 """
 import logging
 import io
+import math
+import concurrent.futures
 
 from nive.utils.path import DvPath
 from nive import File
@@ -134,6 +145,12 @@ class ImageExtension:
                     continue
                 convert.append(p)
         else:
+            # include profiles derived from converted images
+            images = set(images)
+            size = 0
+            while len(images) != size:
+                size = len(images)
+                images.update([p.dest for p in profiles if p.source in images])
             for p in profiles:
                 if not self._CheckCondition(p):
                     continue
@@ -141,15 +158,75 @@ class ImageExtension:
                     convert.append(p)
         if not convert:
             return 0, ["No match"]
-        msgs = []
         result = 0
-        for profile in convert:
-            r = self._Convert(profile, force)
-            result += r
-            if r:
-                self.Signal("updateImage", profile=profile)
+        for stage in ProfileStages(convert):
+            result += self._Convert(stage, force)
         self.Signal("imageprocessed")
         return result, []
+
+
+    def PrepareImages(self, profiles, force=False):
+        """
+        Collects the conversions for the profiles grouped by source image. Profiles
+        copying the source file are processed directly. ::
+
+            profiles = list of profiles to process
+            force = convert non temp files
+            returns count copied, list of (source file, profiles, source data)
+
+        Pass the jobs to `ConvertImage()` and the results to `ApplyImages()`. Source
+        data is read before converting. Call once for each list returned by
+        `ProfileStages()` if profiles use other profiles destinations as source.
+        """
+        result = 0
+        jobs = []
+        sources = {}
+        for profile in profiles:
+            source = self.files.get(profile.source)
+            if source is None:
+                continue
+            if not source.tempfile and not force and self.files.get(profile.dest):
+                # convert only if tempfile or dest does not exist or force=True
+                continue
+            if profile.get("copy") and source.extension in profile.get("copy"):
+                result += self._Copy(source, profile)
+                continue
+            if profile.source not in sources:
+                sources[profile.source] = (source, [])
+                jobs.append(sources[profile.source])
+            sources[profile.source][1].append(profile)
+        return result, [(source, plist, self._ReadSource(source)) for source, plist in jobs]
+
+
+    def ApplyImages(self, source, profiles, results):
+        """
+        Stores the converted images returned by `ConvertImage()` as temp files.
+
+        Events: 
+        updateImage(profile)
+
+        returns count converted
+        """
+        count = 0
+        fn = source.filename
+        if fn.startswith(source.filekey+"_"):
+            fn = fn[len(source.filekey)+1:]
+        for profile, (dest, data, destExtension) in zip(profiles, results):
+            if data is None:
+                continue
+            filename = DvPath(dest+"_"+fn)
+            filename.SetExtension(destExtension)
+            file = File(filekey=dest,
+                        filename=str(filename),
+                        file=io.BytesIO(data),
+                        size=len(data),
+                        path=None,
+                        extension=destExtension,
+                        tempfile=True)
+            self.files.set(dest, file)
+            self.Signal("updateImage", profile=profile)
+            count += 1
+        return count
         
         
     def _CheckCondition(self, profile):
@@ -159,210 +236,271 @@ class ImageExtension:
         return c(self)
       
         
-    def _Convert(self, profile, force):
-        source = self.files.get(profile.source)
-        dest = self.files.get(profile.dest)
-        if source is None:
-            return 0
-        if not source.tempfile and not force and dest:
-            # convert only if tempfile or dest does not exist or force=True
-            return 0
+    def _Convert(self, profiles, force):
+        result, jobs = self.PrepareImages(profiles, force)
+        for source, profiles, data in jobs:
+            results = ConvertImage(data, source.extension, [ProfileSettings(p) for p in profiles])
+            result += self.ApplyImages(source, profiles, results)
+        return result
 
+
+    def _Copy(self, source, profile):
+        # skip conversion and copy file
+        data = self._ReadSource(source)
+        file = File(filekey=profile.dest,
+                    filename=str(profile.dest + "_" + source.filename),
+                    file=io.BytesIO(data),
+                    size=len(data),
+                    path=None,
+                    extension=source.extension,
+                    tempfile=True)
+        self.files.set(profile.dest, file)
+        self.Signal("updateImage", profile=profile)
+        return 1
+
+
+    def _ReadSource(self, source):
         try:
             source.file.seek(0)
         except:
             pass
-
-        # skip conversion and copy file
-        if profile.get("copy"):
-            if source.extension in profile.get("copy"):
-                # copy file
-                data = source.read()
-                file = File(filekey=profile.dest,
-                            filename=str(profile.dest + "_" + source.filename),
-                            file=io.BytesIO(data),
-                            size=len(data),
-                            path=None,
-                            extension=source.extension,
-                            tempfile=True)
-                self.files.set(profile.dest, file)
-                return 1
-
-        destFormat = profile.get("format")
-        destExtension = profile.get("extension")
-
+        data = source.read()
         try:
-            # svg
-            if source.extension != "svg":
-                # iObj = Image.open(source) ? PIL bug closes source if used multiple times
-                iObj = Image.open(io.BytesIO(source.read()))
+            if source.file.closed:
+                source.file = None
             else:
-                # set dest format to png
-                if not "format" in profile:
-                    destFormat = "png"
-                    destExtension = "png"
-                image = pyvips.Image.thumbnail_buffer(source.read(), profile.width)
-                iObj = Image.open(io.BytesIO(image.write_to_buffer("." + destExtension)))
-                del image
-
-        except IOError as e:
-            try:
                 source.file.seek(0)
-            except:
-                pass
-            # no file converted
-            logging.warning("IOError: Failed to convert image: %s -> %s" % (source.filename, str(e)))
-            return 0
+        except:
+            pass
+        return data
 
-        temp = None
-        try:
-            iObj = iObj.convert("RGB")
 
-            if profile.get("fill"):
-                iObj = self._ScaleAndFill(iObj, profile)
-            else:
-                iObj = self._Scale(iObj, profile)
+    def _Scale(self, img, settings):
+        return Scale(img, settings)
 
-            if not destFormat:
-                destFormat = self._NormalizeFmt(source.extension)
-                destExtension = source.extension
 
-            temp = DvPath()
-            temp.SetUniqueTempFileName()
-            temp.SetExtension(destExtension)
-            destPath = str(temp)
-            iObj.save(destPath, destFormat)
-            try:
-                if source.file.closed:
-                    source.file = None
-                else:
-                    source.file.seek(0)
-            except:
-                pass
-            
-            # file meta data
-            imgFile = open(destPath, 'rb')
-            fn = source.filename
-            if fn.startswith(source.filekey+"_"):
-                fn = fn[len(source.filekey)+1:]
-            filename = DvPath(profile.dest+"_"+fn)
-            filename.SetExtension(destExtension)
-            file = File(filekey=profile.dest, 
-                        filename=str(filename), 
-                        file=imgFile,
-                        size=temp.GetSize(),
-                        path=destPath, 
-                        extension=destExtension,
-                        tempfile=True)
-            self.files.set(profile.dest, file)
-        finally:
-            try:
-                source.file.seek(0)
-            except:
-                pass
-            # clean temp file
-            if temp is not None:
-                temp.Delete()
-        return 1
+    def _ScaleAndFill(self, img, settings):
+        return ScaleAndFill(img, settings)
 
 
-    def _Scale(self, img, settings):
-        # resize
-        size = [settings.width, settings.height]
-        if size[0] != 0 or size[1] != 0:
-            # if size[0] == 0:
-            #    size[0] = size[1]
-            # elif size[1] == 0:
-            #    size[1] = size[0]
-            resize = True
-            x, y = img.size
-            if size[0] and x > size[0]:
-                y = y * size[0] / x
-                x = size[0]
-            elif size[1] and y > size[1]:
-                x = x * size[1] / y
-                y = size[1]
-            else:
-                # original is smaller
-                resize = False
-                if settings.source == settings.dest:
-                    # same image -> skip
-                    return img
+    def _Crop(self, img, box):
+        return Crop(img, box)
 
-            size = int(x), int(y)
-            if resize:
-                img = img.resize(size, Image.Resampling.LANCZOS)
 
+    def _NormalizeFmt(self, fmt):
+        return NormalizeFmt(fmt)
+
+
+
+def ProfileSettings(profile):
+    """
+    Returns the profile settings as dictionary without the condition callback.
+    Dictionaries can be passed to other processes.
+    """
+    if isinstance(profile, dict):
+        values = dict(profile)
+    else:
+        values = ProfileSettings(profile.parent) if profile.parent is not None else {}
+        for key in profile.keys():
+            values[key] = profile.get(key)
+    values.pop("condition", None)
+    return values
+
+
+def ProfileStages(profiles):
+    """
+    Splits the profiles in lists to be converted one after another. Profiles using the
+    destination of another profile as source are converted after this profile. 
+
+    returns list of profile lists
+    """
+    stages = []
+    remaining = list(profiles)
+    while remaining:
+        stage = []
+        for p in remaining:
+            dests = [o.dest for o in remaining if o is not p]
+            if p.source not in dests:
+                stage.append(p)
+        if not stage:
+            # circular references. convert in configuration order.
+            stage = remaining
+        stages.append(stage)
+        remaining = [p for p in remaining if not any(p is o for o in stage)]
+    return stages
+
+
+def ConvertImage(data, extension, profiles):
+    """
+    Creates all image versions for the profiles from the source image data. The source
+    is decoded once. ::
+
+        data = source image data
+        extension = source file extension
+        profiles = list of profile settings as dictionaries (see `ProfileSettings()`)
+        returns list of (dest, data, extension) in profile order. data is None if
+                the conversion failed.
+    """
+    if extension == "svg":
+        return [_ConvertSvg(data, profile) for profile in profiles]
+    try:
+        img = Image.open(io.BytesIO(data))
+        img = _Reduce(img, profiles)
+        img = img.convert("RGB")
+    except IOError as e:
+        # no file converted
+        logging.warning("IOError: Failed to convert image: %s" % (str(e)))
+        return [(profile["dest"], None, None) for profile in profiles]
+    return [_Derive(img, profile, extension) for profile in profiles]
+
+
+def _ConvertSvg(data, profile):
+    destFormat = profile.get("format")
+    destExtension = profile.get("extension")
+    if not destFormat:
+        # set dest format to png
+        destFormat = destExtension = "png"
+    try:
+        image = pyvips.Image.thumbnail_buffer(data, profile.get("width"))
+        img = Image.open(io.BytesIO(image.write_to_buffer("." + destExtension)))
+        del image
+        img = img.convert("RGB")
+    except IOError as e:
+        logging.warning("IOError: Failed to convert image: %s" % (str(e)))
+        return profile["dest"], None, None
+    return _Derive(img, dict(profile, format=destFormat, extension=destExtension), "svg")
+
+
+def _Derive(img, profile, extension):
+    destFormat = profile.get("format")
+    destExtension = profile.get("extension")
+    if profile.get("fill"):
+        img = ScaleAndFill(img, profile)
+    else:
+        img = Scale(img, profile)
+    if not destFormat:
+        destFormat = NormalizeFmt(extension)
+        destExtension = extension
+    out = io.BytesIO()
+    img.save(out, destFormat)
+    return profile["dest"], out.getvalue(), destExtension
+
+
+def _Reduce(img, profiles):
+    # Decodes or reduces the image to the smallest size still twice as large as
+    # required by all profiles. Scaling is then done on the smaller image.
+    x, y = img.size
+    scale = 0
+    for profile in profiles:
+        width, height = profile.get("width") or 0, profile.get("height") or 0
+        fill = profile.get("fill") or (0, 0)
+        if not (width or height or fill[0] or fill[1]):
+            # original size required
+            return img
+        scale = max(scale, 2 * max(width/float(x), height/float(y), fill[0]/float(x), fill[1]/float(y)))
+    if scale >= 1 or scale <= 0:
+        return img
+    size = int(math.ceil(x*scale)), int(math.ceil(y*scale))
+    if img.format == "JPEG":
+        img.draft("RGB", size)
         return img
+    factor = int(min(x/float(size[0]), y/float(size[1])))
+    if factor >= 2:
+        img = img.reduce(factor)
+    return img
 
 
-    def _ScaleAndFill(self, img, settings):
-        newx = settings.get("width", 0)
-        newy = settings.get("heigth", 0)
-        fill = settings.get("fill", None)
-        crop = settings.get("crop", False)
-        enlarge = settings.get("enlarge", True)
+def Scale(img, settings):
+    # resize
+    size = [settings.get("width") or 0, settings.get("height") or 0]
+    if size[0] != 0 or size[1] != 0:
+        resize = True
         x, y = img.size
+        if size[0] and x > size[0]:
+            y = y * size[0] / x
+            x = size[0]
+        elif size[1] and y > size[1]:
+            x = x * size[1] / y
+            y = size[1]
+        else:
+            # original is smaller
+            resize = False
+            if settings.get("source") == settings.get("dest"):
+                # same image -> skip
+                return img
 
-        # enlarge
-        if not enlarge and (newx>x or newy>y):
-            return img
+        size = int(x), int(y)
+        if resize:
+            img = img.resize(size, Image.Resampling.LANCZOS)
 
-        if x<fill[0]:
-            # width smaller dest
-            newx = 0
-            newy = fill[1]
+    return img
 
-        # constraint dimension and fit in box
-        if settings.get("constraint", True) or newx==0 or newy==0:
-            ratio = settings.get("ratio", "").split(":")
-            if newx == 0 and newy != 0:
-                newx = newy / float(y) * x
-                if len(ratio)==2 and newx > newy / float(ratio[1]) * float(ratio[0]):
-                    # too width for box
-                    newx = newy / float(ratio[1]) * float(ratio[0])
-                    newy = newx / float(x) * y
 
-            elif newy == 0 and newx != 0:
-                newy = newx / float(x) * y
-                if len(ratio)==2 and newy > newx / float(ratio[0]) * float(ratio[1]):
-                    # too width for box
-                    newy = newx / float(ratio[0]) * float(ratio[1])
-                    newx = newy / float(y) * x
+def ScaleAndFill(img, settings):
+    newx = settings.get("width", 0)
+    newy = settings.get("heigth", 0)
+    fill = settings.get("fill", None)
+    crop = settings.get("crop", False)
+    enlarge = settings.get("enlarge", True)
+    x, y = img.size
 
-        # valid?
-        if newx==0 and newy==0:
-            return img
+    # enlarge
+    if not enlarge and (newx>x or newy>y):
+        return img
 
-        size = int(newx), int(newy)
-        img = img.resize(size, Image.Resampling.LANCZOS)
+    if x<fill[0]:
+        # width smaller dest
+        newx = 0
+        newy = fill[1]
+
+    # constraint dimension and fit in box
+    if settings.get("constraint", True) or newx==0 or newy==0:
+        ratio = settings.get("ratio", "").split(":")
+        if newx == 0 and newy != 0:
+            newx = newy / float(y) * x
+            if len(ratio)==2 and newx > newy / float(ratio[1]) * float(ratio[0]):
+                # too width for box
+                newx = newy / float(ratio[1]) * float(ratio[0])
+                newy = newx / float(x) * y
 
-        if newx<fill[0]:
-            # fill sides with bgcolor
-            color = settings.get("bg", (242,242,242))
-            newImage = Image.new("RGB", fill, color)
-            newImage.paste(img, (int((fill[0]-newx)/2), 0))
-            img = newImage
-        elif newy>fill[1] and crop:
-            # crop
-            top = int((newy-fill[1])/2)
-            img = self._Crop(img, (0, top, fill[0], fill[1]+top))
+        elif newy == 0 and newx != 0:
+            newy = newx / float(x) * y
+            if len(ratio)==2 and newy > newx / float(ratio[0]) * float(ratio[1]):
+                # too width for box
+                newy = newx / float(ratio[0]) * float(ratio[1])
+                newx = newy / float(y) * x
 
+    # valid?
+    if newx==0 and newy==0:
         return img
 
+    size = int(newx), int(newy)
+    img = img.resize(size, Image.Resampling.LANCZOS)
 
-    def _Crop(self, img, box):
-        img = img.crop(box=box)
-        img.load()
-        return img
+    if newx<fill[0]:
+        # fill sides with bgcolor
+        color = settings.get("bg", (242,242,242))
+        newImage = Image.new("RGB", fill, color)
+        newImage.paste(img, (int((fill[0]-newx)/2), 0))
+        img = newImage
+    elif newy>fill[1] and crop:
+        # crop
+        top = int((newy-fill[1])/2)
+        img = Crop(img, (0, top, fill[0], fill[1]+top))
 
+    return img
 
-    def _NormalizeFmt(self, fmt):
-        if fmt.lower() in ("jpg", "jpeg"):
-            return "JPEG"
-        return fmt
+
+def Crop(img, box):
+    img = img.crop(box=box)
+    img.load()
+    return img
 
 
+def NormalizeFmt(fmt):
+    if fmt.lower() in ("jpg", "jpeg"):
+        return "JPEG"
+    return fmt
 
 
 
@@ -381,6 +519,7 @@ tool_configuration = ToolConf(
         FieldConf(id="types", datatype="checkbox", default="", required=1, settings=dict(codelist="types"), name="Object types", description=""),
         FieldConf(id="emptyonly", datatype="bool", default=1, name="Rewrite only empty images", description=""),
         FieldConf(id="testrun", datatype="bool", default=1, name="Testrun, no commits", description=""),
+        FieldConf(id="workers", datatype="number", default=0, name="Parallel processes", description="Number of processes converting images. 0 uses the number of CPUs, 1 converts in this process."),
 
         FieldConf(id="tag", datatype="string", default="processImages", hidden=1)
     ],
@@ -391,6 +530,11 @@ tool_configuration = ToolConf(
 )
 
 class ProcessImagesTool(Tool):
+    """
+    Converts the images of all objects of the selected types. Images are converted in parallel
+    processes, objects are loaded and committed in batches of `batchSize` in this process.
+    """
+    batchSize = 50
 
     def _Run(self, **values):
 
@@ -412,39 +556,89 @@ class ProcessImagesTool(Tool):
 
         user = values["original"]["user"]
         testrun = values["testrun"]
-        emptyonly = values["emptyonly"]
-        result = []
-        cnt = 0
-        rcnt = 0
+        force = not values["emptyonly"]
+        workers = int(values.get("workers") or 0) or None
         log = logging.getLogger("converter")
-        for rec in recs["items"]:
-            rcnt +=1
-            if rcnt%1000==0:
-                log.info("Processing Images: %d of %d ... %d processed."%(rcnt, recs["total"], cnt))
+        self.cnt = 0
+        self.rcnt = 0
+        executor = None
+        if not testrun and workers != 1:
+            executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        try:
+            items = recs["items"]
+            for pos in range(0, len(items), self.batchSize):
+                self._Batch(root, items[pos:pos+self.batchSize], executor, user, testrun, force, log)
+                msg = "Processing Images: %d of %d ... %d processed." % (self.rcnt, len(items), self.cnt)
+                log.info(msg)
+                self.stream.write(msg+"<br>")
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        if testrun:
+            self.stream.write("Done. %d images found to be processed!<br>" % (self.cnt))
+            return self.stream, ""
+        self.stream.write("OK. %d images processed!<br>" % (self.cnt))
+        return self.stream, ""
+
+
+    def _Batch(self, root, recs, executor, user, testrun, force, log):
+        # converts images of all objects in the batch in parallel and commits the objects.
+        # profiles derived from other profiles are converted after the first stage.
+        pending = []
+        for rec in recs:
+            self.rcnt += 1
             obj = root.LookupObj(rec["id"])
             if obj is None or not hasattr(obj, "ProcessImages"):
                 continue
             if testrun:
-                cnt += 1
+                self.cnt += 1
                 continue
             try:
-                if emptyonly:
-                    cnt += obj.ProcessImages(user=user)
-                else:
-                    cnt += obj.ProcessImages(user=user, force=True)
+                profiles = [p for p in obj.configuration.imageProfiles if obj._CheckCondition(p)]
+                stages = ProfileStages(profiles) or [[]]
+                count, converted = self._Submit(obj, stages[0], executor, force)
+                pending.append((rec, obj, count, converted, stages[1:]))
+            except Exception as e:
+                self._Error(rec, e, log)
+
+        for rec, obj, count, converted, stages in pending:
+            try:
+                count += self._Apply(obj, converted)
+                for stage in stages:
+                    c, converted = self._Submit(obj, stage, executor, force)
+                    count += c + self._Apply(obj, converted)
+                obj.Signal("imageprocessed")
                 obj.dbEntry.Commit(user=user)
+                self.cnt += count
             except Exception as e:
-                err = str(rec["id"])+" "+str(rec["pool_type"])+" Error: "+str(e)
-                log.error(err)
-                self.stream.write(err+"<br>")
-        if testrun:
-            self.stream.write("Done. %d images found to be processed!<br>%s" % (cnt, "<br>".join(result)))
-            return self.stream, ""
-        self.stream.write("OK. %d images processed!<br>" % (cnt))
-        return self.stream, ""
+                self._Error(rec, e, log)
 
 
+    def _Submit(self, obj, profiles, executor, force):
+        count, jobs = obj.PrepareImages(profiles, force)
+        converted = []
+        for source, plist, data in jobs:
+            settings = [ProfileSettings(p) for p in plist]
+            if executor is None:
+                result = ConvertImage(data, source.extension, settings)
+            else:
+                result = executor.submit(ConvertImage, data, source.extension, settings)
+            converted.append((source, plist, result))
+        return count, converted
 
 
+    def _Apply(self, obj, converted):
+        count = 0
+        for source, plist, result in converted:
+            if not isinstance(result, list):
+                result = result.result()
+            count += obj.ApplyImages(source, plist, result)
+        return count
+
+
+    def _Error(self, rec, e, log):
+        err = str(rec["id"])+" "+str(rec["pool_type"])+" Error: "+str(e)
+        log.error(err)
+        self.stream.write(err+"<br>")
+
 
-      
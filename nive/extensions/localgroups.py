@@ -8,8 +8,14 @@ LocalGroups extension module
 Security extension to handle local group assginments for users.
 Can be used for Roots and Objects or any other python class supporting events
 and id attribute (number). Uses idhash for root objects.
+
+Local groups of an object and all parents are loaded with a single query. Loaded groups
+are cached for the current request. To preload the groups of listed objects before
+checking permissions use `LoadLocalGroups(objects, username)`.
 """
 
+from pyramid.threadlocal import get_current_request
+
 from nive.definitions import ModuleConf, Conf
 from nive.definitions import implementer, ILocalGroups
 
@@ -38,11 +44,11 @@ class LocalGroups(object):
         """
         if self.id <= 0:
             return self._LocalGroups(username)
+        chain = _Parents(self)
+        LoadLocalGroups(chain, username, parents=False)
         g = []
-        o = self
-        while o:
-            g += o._LocalGroups(username)
-            o = o.parent
+        for o in chain:
+            g += o._localRoles[username]
         return g 
 
 
@@ -75,6 +81,7 @@ class LocalGroups(object):
             return
         self._AddLocalGroupsCache(username, group)
         self.db.AddGroup(self._secid, userid=username, group=group)
+        _RemoveRequestCache(self, username)
 
         
     def RemoveLocalGroups(self, username, group=None):
@@ -84,6 +91,7 @@ class LocalGroups(object):
         """
         self._DelLocalGroupsCache(username, group)
         self.db.RemoveGroups(self._secid, userid=username, group=group)
+        _RemoveRequestCache(self, username)
 
 
     def RemoveGroups(self, **kw):
@@ -92,14 +100,13 @@ class LocalGroups(object):
         """
         self.db.RemoveGroups(self._secid)
         self._localRoles = {}
+        _RemoveRequestCache(self, None)
         
 
     def _LocalGroups(self, username):
-        if username in self._localRoles:
-            return list(self._localRoles[username])
-        g = [r[1] for r in self.db.GetGroups(self._secid, userid=username)]
-        self._localRoles[username] = tuple(g)
-        return g
+        if username not in self._localRoles:
+            LoadLocalGroups((self,), username, parents=False)
+        return list(self._localRoles[username])
     
     def _AddLocalGroupsCache(self, username, group):
         if username in self._localRoles:
@@ -125,6 +132,80 @@ class LocalGroups(object):
 
 
 
+def LoadLocalGroups(objects, username, parents=True):
+    """
+    Loads the local groups of `username` for all objects (and their parents if `parents`
+    is true) in a single query. Objects with cached groups are skipped. Use this function
+    to preload groups for listings before checking permissions.
+    """
+    load = {}
+    cache = None
+    seen = set()
+    for obj in objects:
+        for o in (_Parents(obj) if parents else (obj,)):
+            if id(o) in seen or not isinstance(o, LocalGroups):
+                continue
+            seen.add(id(o))
+            if username in o._localRoles:
+                continue
+            if cache is None:
+                cache = _RequestCache(o.app)
+            g = cache.get((o._secid, username)) if cache is not False else None
+            if g is not None:
+                o._localRoles[username] = g
+                continue
+            load.setdefault(o._secid, []).append(o)
+    if not load:
+        return
+    db = load[next(iter(load))][0].db
+    groups = dict((secid, []) for secid in load)
+    for r in db.GetGroups(tuple(load), userid=username):
+        if r[2] in groups:
+            groups[r[2]].append(r[1])
+    for secid, objs in load.items():
+        g = tuple(groups[secid])
+        for o in objs:
+            o._localRoles[username] = g
+        if cache is not False:
+            cache[(secid, username)] = g
+
+
+def _Parents(obj):
+    # the object and all parents with local groups
+    chain = []
+    o = obj
+    while o:
+        if isinstance(o, LocalGroups):
+            chain.append(o)
+        o = o.parent
+    return chain
+
+
+def _RequestCache(app):
+    # groups cache for the current request and application.
+    # returns False if no request is active.
+    req = get_current_request()
+    if req is None:
+        return False
+    try:
+        caches = req.__nive_localgroups__
+    except AttributeError:
+        caches = req.__nive_localgroups__ = {}
+    return caches.setdefault(app.id, {})
+
+
+def _RemoveRequestCache(obj, username):
+    cache = _RequestCache(obj.app)
+    if not cache:
+        return
+    secid = obj._secid
+    if username is not None:
+        cache.pop((secid, username), None)
+        return
+    for key in [k for k in cache if k[0] == secid]:
+        del cache[key]
+
+
 def SetupLocalGroups(app, pyramidConfig):
     # get all roots and add extension
     extension = "nive.extensions.localgroups.LocalGroups"
@@ -3,6 +3,8 @@
 import unicodedata
 import re
 
+from nive.extensions.cache import GetNameCache
+
 
 
 
@@ -26,6 +28,9 @@ class PathExtension:
             # skip roots
             return
         self.ListenEvent("commit", "TitleToFilename")
+        self.ListenEvent("pathupdate", "RemoveNameCache")
+        self.ListenEvent("moved", "RemoveNameCache")
+        self.ListenEvent("delete", "RemoveNameCache")
         self._SetName()
 
     
@@ -41,6 +46,13 @@ class PathExtension:
         filename = self.EscapeFilename(self.meta.title)
         # make unique filename
         filename = self.UniqueFilename(filename)
+        self.SetFilename(filename)
+
+
+    def SetFilename(self, filename):
+        """
+        Stores the unique filename and calls `pathupdate` if changed
+        """
         if self.AddExtension(filename) == self.meta.pool_filename:
             # no change
             return
@@ -56,23 +68,14 @@ class PathExtension:
         
     def UniqueFilename(self, name):
         """
-        Converts name to valid path/url
+        Converts name to valid path/url. Existing filenames are loaded with a single
+        query and the first free name of `name`, `name-1`, `name-2` ... is returned.
         """
-        if name == "file":
-            name = "file_"
         if self.containerNamespace:
             unitref = self.parent.id
         else:
             unitref = None
-        cnt = 1
-        root = self.root
-        while root.search.FilenameToID(self.AddExtension(name), unitref, parameter=dict(id=self.id), operators=dict(id="!=")) != 0:
-            if cnt>1:
-                name = name.rstrip("1234567890-")
-
-            name = name+"-"+str(cnt)
-            cnt += 1
-        return name
+        return UniqueFilenames(self.root.search, [(unitref, name)], self.extension, exclude=(self.id,))[0]
 
 
     def EscapeFilename(self, path):
@@ -140,12 +143,12 @@ class PathExtension:
         try:
             id = int(id)
         except ValueError:
-            name = id
-            id = 0
-            if name:
-                id = self.root.search.FilenameToID(name, self.id)
-            if not id:
+            obj = None
+            if id:
+                obj = LookupFilename(self, id)
+            if obj is None:
                 raise KeyError(id)
+            return obj
 
         obj = self.GetObj(id)
         if obj is None:
@@ -153,6 +156,20 @@ class PathExtension:
         return obj
 
 
+    def LookupPath(self, path):
+        """
+        Resolves the url path (list of names or string) below this object with a single 
+        query. See `LookupPath()`.
+        """
+        return LookupPath(self, path)
+
+    def RemoveNameCache(self, **kw):
+        """
+        Removes the object from the traversal name cache
+        """
+        GetNameCache(self.app).Remove(self.id)
+
+
     def _SetName(self):
         self.__name__ = self.meta["pool_filename"]
         if not self.__name__:
@@ -161,6 +178,132 @@ class PathExtension:
 
 
 
+def UniqueFilenames(search, names, extension=None, exclude=()):
+    """
+    Allocates unique filenames for a list of (unitref, name). `unitref` is the container id
+    or None for names unique in the whole application. The existing filenames of all 
+    names are selected in one query. Names allocated in the same call do not collide and
+    the stored filenames of ids in `exclude` are ignored.
+
+    returns the list of filenames without extension
+    """
+    def ext(name):
+        if not extension:
+            return name
+        return "%s.%s" % (name, extension)
+
+    names = [(ref, "file_" if name == "file" else name) for ref, name in names]
+    stems = set([_Stem(name) for ref, name in names if name])
+    refs = set([ref for ref, name in names])
+    unitrefs = None if None in refs else refs
+    exclude = set(exclude or ())
+    used = {}
+    for id, ref, filename in search.FilenamesStartingWith(stems, unitrefs):
+        if id in exclude:
+            continue
+        used.setdefault(None, set()).add(filename)
+        used.setdefault(ref, set()).add(filename)
+
+    unique = []
+    for ref, name in names:
+        if not name:
+            unique.append(name)
+            continue
+        taken = used.setdefault(ref, set())
+        candidate = name
+        cnt = 1
+        while ext(candidate) in taken:
+            candidate = "%s-%d" % (name if cnt == 1 else _Stem(name), cnt)
+            cnt += 1
+        taken.add(ext(candidate))
+        if ref is not None:
+            used.setdefault(None, set()).add(ext(candidate))
+        unique.append(candidate)
+    return unique
+
+
+def _Stem(name):
+    # name without numbered suffix
+    return name.rstrip("1234567890-") or name
+
+
+def LookupFilename(context, name):
+    """
+    Returns the child object of `context` with the url path filename `name` or None. 
+    Resolved names are stored in the application wide name cache. Cached ids are checked
+    against the loaded object. On cache misses entry and query restraints are loaded in 
+    one query.
+    """
+    cache = GetNameCache(context.app)
+    key = (context.id, name)
+    id = cache.Get(key)
+    if id:
+        obj = context.GetObj(id)
+        if obj is not None and obj.meta.get("pool_filename") == name:
+            return obj
+        cache.Remove(id)
+    p, o = context.root.ObjQueryRestraints(context)
+    p["pool_unitref"] = context.id
+    p["pool_filename"] = name
+    entries = context.app.db.SelectEntries(p, o)
+    if not entries:
+        return None
+    id = min(entries.keys())
+    obj = context.GetObj(id, dbEntry=entries[id])
+    if obj is not None:
+        cache.Set(key, id)
+    return obj
+
+
+def LookupPath(context, names):
+    """
+    Resolves a multi level path below `context`. `names` is a list of url path filenames
+    or ids (numbers) or a string separated by `/`. The ids are selected with one query 
+    and the entries of all levels including query restraints with a second one.
+    If a selected id is restricted the remaining levels are resolved one by one.
+
+    returns the object or None
+    """
+    if isinstance(names, str):
+        names = [n for n in names.split("/") if n]
+    names = [int(n) if isinstance(n, str) and n.isdigit() else n for n in names]
+    if not names:
+        return context
+    app = context.app
+    ids = app.db.GetPathIDs(context.id, names)
+    if not ids:
+        return None
+    p, o = context.root.ObjQueryRestraints(context)
+    entries = app.db.GetEntryChain(ids[-1], p, o)
+    cache = GetNameCache(app)
+    obj = context
+    for level, (id, name) in enumerate(zip(ids, names)):
+        if id not in entries:
+            # the first match is restricted. a visible object with the same name may
+            # exist, so the remaining levels are resolved one by one.
+            return _LookupLevels(obj, names[level:])
+        parent = obj
+        obj = parent.GetObj(id, dbEntry=entries[id])
+        if obj is None:
+            return None
+        if not isinstance(name, int):
+            cache.Set((parent.id, name), id)
+    return obj
+
+
+def _LookupLevels(context, names):
+    # resolves each level with restraints applied
+    obj = context
+    for name in names:
+        if isinstance(name, int):
+            obj = obj.GetObj(name)
+        else:
+            obj = LookupFilename(obj, name)
+        if obj is None:
+            return None
+    return obj
+
+
 class RootPathExtension(object):
     """
     Extension for nive root objects to handle alternative url names
@@ -188,12 +331,12 @@ class RootPathExtension(object):
         try:
             id = int(id)
         except:
-            name = id
-            id = 0
-            if name:
-                id = self.search.FilenameToID(name, self.id)
-            if not id:
+            obj = None
+            if id:
+                obj = LookupFilename(self, id)
+            if obj is None:
                 raise KeyError(id)
+            return obj
 
         obj = self.GetObj(id)
         if not obj:
@@ -202,6 +345,14 @@ class RootPathExtension(object):
         return obj
 
 
+    def LookupPath(self, path):
+        """
+        Resolves the url path (list of names or string) below the root with a single 
+        query. See `LookupPath()`.
+        """
+        return LookupPath(self, path)
+
+
 class PersistentRootPath(object):
     """
     Extension for nive root objects to handle alternative url names
@@ -272,15 +423,35 @@ class RewriteFilenamesTool(Tool):
 
         user = values["original"]["user"]
         testrun = values["testrun"]
-        result = []
-        cnt = 0
+        objs = []
         for rec in recs["items"]:
             obj = root.LookupObj(rec["id"])
             if obj is None or not hasattr(obj, "TitleToFilename"):
                 continue
+            objs.append(obj)
 
+        # allocate the filenames of all objects in one pass for each extension
+        groups = {}
+        exclude = []
+        for obj in objs:
+            if obj.data.get("customfilename", None):
+                continue
+            groups.setdefault(obj.extension, []).append(obj)
+            exclude.append(obj.id)
+        filenames = {}
+        for extension, group in groups.items():
+            names = [(obj.parent.id if obj.containerNamespace else None, obj.EscapeFilename(obj.meta.title)) for obj in group]
+            for obj, filename in zip(group, UniqueFilenames(root.search, names, extension, exclude)):
+                filenames[obj.id] = filename
+
+        result = []
+        cnt = 0
+        for obj in objs:
             filename = obj.meta["pool_filename"]
-            obj.TitleToFilename()
+            if obj.id in filenames:
+                obj.SetFilename(filenames[obj.id])
+            else:
+                obj.TitleToFilename()
             if filename!=obj.meta["pool_filename"]:
                 result.append(filename+" <> "+obj.meta["pool_filename"])
             if testrun==False:
@@ -290,4 +461,3 @@ class RewriteFilenamesTool(Tool):
             cnt += 1
 
         return "OK. %d filenames updated, %d different!<br>%s" % (cnt, len(result), "<br>".join(result)), True
-
@@ -0,0 +1,173 @@
+# -*-coding:utf-8 -*-
+
+import unittest
+
+from nive.extensions.cache import *
+from nive.definitions import ICache
+from nive.helper import FormatConfTestFailure
+from nive.security import User
+
+from nive.tests import db_app
+from nive.tests import __local
+
+
+
+class EntryCacheTest(unittest.TestCase):
+
+    def test_conf(self):
+        r=configuration.test()
+        if not r:
+            return
+        self.fail(FormatConfTestFailure(r))
+
+    def test_lru(self):
+        cache = EntryCache(maxsize=2)
+        cache.Set((1,None), "a")
+        cache.Set((2,None), "b")
+        self.assertEqual(cache.Get((1,None)), "a")
+        cache.Set((3,None), "c")
+        # 2 is least recently used
+        self.assertEqual(cache.Get((2,None)), None)
+        self.assertEqual(cache.Get((3,None)), "c")
+        stats = cache.GetStats()
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual(stats["size"], 2)
+
+    def test_remove(self):
+        cache = EntryCache()
+        cache.Set((1,None), "a")
+        cache.Set((1,"v1"), "b")
+        cache.Set((2,None), "c")
+        cache.Remove(1)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.GetStats()["invalidations"], 2)
+        cache.Set((3,None), "d")
+        cache.Set((4,None), "e")
+        cache.RemoveMany([2,3])
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.Get((4,None)), "e")
+        cache.Clear()
+        self.assertEqual(len(cache), 0)
+
+
+
+    def test_names(self):
+        cache = NameCache()
+        cache.Set((1,"a"), 10)
+        cache.Set((2,"a"), 11)
+        cache.Set((2,"b"), 10)
+        cache.Remove(10)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.Get((2,"a")), 11)
+        # renamed keys are indexed with the new id
+        cache.Set((2,"a"), 12)
+        cache.Remove(11)
+        self.assertEqual(cache.Get((2,"a")), 12)
+        cache.Remove(12)
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache._ids, {})
+
+    def test_index(self):
+        cache = EntryCache(maxsize=2)
+        cache.Set((1,None), "a")
+        cache.Set((1,"v1"), "b")
+        cache.Set((2,None), "c")
+        # evicted keys are removed from the index
+        self.assertEqual(cache._ids, {1: set([(1,"v1")]), 2: set([(2,None)])})
+        cache.Set((2,None), "d")
+        self.assertEqual(cache._ids[2], set([(2,None)]))
+        cache.Remove(3)
+        cache.RemoveMany([1,2])
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache._ids, {})
+        self.assertEqual(cache.GetStats()["invalidations"], 2)
+
+
+
+class ContainerCacheTest(__local.DefaultTestCase):
+
+    def setUp(self):
+        # register copies. the extension is added to the registered configurations.
+        self._loadApp([db_app.appconf.copy(), configuration])
+        self.root = self.app.root
+        self.user = User("test")
+
+    def tearDown(self):
+        self._closeApp()
+
+    def test_cache(self):
+        root = self.root
+        self.assertTrue(ICache.providedBy(root))
+        o1 = root.Create("type1", data=db_app.data1_1, user=self.user)
+        o2 = o1.Create("type2", data=db_app.data2_1, user=self.user)
+        try:
+            id = o1.id
+            root.GetObj(id)
+            stats = root.GetCacheStats()
+            obj = root.GetObj(id)
+            self.assertEqual(root.GetCacheStats()["hits"], stats["hits"]+1)
+            self.assertEqual(obj.data.fnumber, db_app.data1_1["fnumber"])
+            self.assertTrue(obj is not root.GetObj(id))
+
+            # commit invalidates
+            obj.data["fnumber"] = 99
+            obj.CommitInternal(user=self.user)
+            obj = root.GetObj(id)
+            self.assertEqual(obj.data.fnumber, 99)
+            obj = root.GetObj(id)
+            self.assertEqual(obj.data.fnumber, 99)
+
+            # child loaded from container cache
+            o1.GetObj(o2.id)
+            self.assertTrue(o1.GetObj(o2.id))
+            # wrong parent
+            self.assertEqual(root.GetObj(o2.id), None)
+
+            # delete invalidates
+            o1.Delete(o2.id, user=self.user)
+            self.assertEqual(o1.GetObj(o2.id), None)
+        finally:
+            root.Delete(o1.id, user=self.user)
+        self.assertEqual(root.GetObj(id), None)
+
+
+    def test_restraints(self):
+        root = self.root
+        o1 = root.Create("type1", data=db_app.data1_1, user=self.user)
+        restraints = root.queryRestraints
+        try:
+            id = o1.id
+            root.GetObj(id)
+            self.assertTrue(root.GetFromCache(id))
+            # records loaded with different restraints are not used
+            root.queryRestraints = {"pool_state": 99}, {}
+            self.assertEqual(root.GetFromCache(id), None)
+            self.assertEqual(root.GetObj(id), None)
+            root.queryRestraints = restraints
+            self.assertTrue(root.GetFromCache(id))
+            # lookups without restraints skip the cache
+            stats = root.GetCacheStats()
+            self.assertTrue(root.GetObj(id, queryRestraints=False))
+            self.assertEqual(root.GetCacheStats()["hits"], stats["hits"])
+        finally:
+            root.queryRestraints = restraints
+            root.Delete(o1.id, user=self.user)
+
+    def test_poolcommit(self):
+        root = self.root
+        o1 = root.Create("type1", data=db_app.data1_1, user=self.user)
+        try:
+            id = o1.id
+            root.GetObj(id)
+            self.assertTrue(root.GetFromCache(id))
+            # entries committed without objects invalidate the cache
+            entry = self.app.db.GetEntry(id)
+            entry.data["fnumber"] = 98
+            entry.Commit()
+            self.assertEqual(root.GetFromCache(id), None)
+            obj = root.GetObj(id)
+            self.assertEqual(obj.data.fnumber, 98)
+        finally:
+            root.Delete(o1.id, user=self.user)
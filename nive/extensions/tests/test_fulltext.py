@@ -0,0 +1,148 @@
+# -*-coding:utf-8 -*-
+
+import os
+import unittest
+
+from nive.extensions.fulltext import *
+from nive.extensions.fulltext import _DefaultTexts
+from nive.helper import FormatConfTestFailure
+from nive.security import User
+
+from nive.tests import db_app
+from nive.tests import __local
+
+
+
+class FulltextTest(unittest.TestCase):
+
+    def test_conf(self):
+        r=configuration.test()
+        if not r:
+            return
+        self.fail(FormatConfTestFailure(r))
+
+    def test_extract(self):
+        texts = ExtractTexts([("htext", "<p>html <b>text</b></p>"), ("number", 123)])
+        self.assertEqual(texts, ["html text", "123"])
+        self.assertEqual(FormatTexts(texts), "html text\r\n\r\n123")
+
+    def test_queue(self):
+        queue = FulltextQueue(batchSize=10)
+        queue.Add(1, [("text", "a")])
+        queue.Add(2, [("text", "b")])
+        queue.Add(1, [("text", "c")])
+        self.assertEqual(len(queue), 2)
+        self.assertEqual(queue.Pop(1), {1: [("text", "c")]})
+        self.assertEqual(queue.Pop(), {2: [("text", "b")]})
+        self.assertEqual(len(queue), 0)
+        # requeued entries do not replace newer values
+        queue.Add(1, [("text", "d")])
+        queue.Requeue({1: [("text", "c")], 2: [("text", "b")]})
+        self.assertEqual(queue.Pop(), {1: [("text", "d")], 2: [("text", "b")]})
+        # full queues are not written outside of finished requests
+        queue = FulltextQueue(batchSize=1)
+        queue.Add(1, [("text", "a")])
+        queue.Add(2, [("text", "b")])
+        self.assertEqual(len(queue), 2)
+
+    def test_defaulttexts(self):
+        class Custom(Fulltext):
+            def GetTexts(self):
+                return ["custom"]
+        self.assertTrue(_DefaultTexts(Fulltext()))
+        self.assertFalse(_DefaultTexts(Custom()))
+
+
+
+class FulltextTest_db(__local.DefaultTestCase):
+
+    def setUp(self):
+        self._loadApp([db_app.appconf.copy(), configuration])
+        self.root = self.app.root
+        self.user = User("test")
+
+    def tearDown(self):
+        self._closeApp()
+
+    def test_changed(self):
+        o = db_app.createObj1(self.root)
+        try:
+            self.assertIn("this is text!", o.GetFulltext())
+            o.dbEntry.WriteFulltext("unchanged")
+            o.dbEntry.Commit()
+            # no fulltext field changed
+            o.Update({"fnumber": 99}, user=self.user)
+            self.assertEqual(o.GetFulltext(), "unchanged")
+            o.Update({"ftext": "new text"}, user=self.user)
+            self.assertIn("new text", o.GetFulltext())
+        finally:
+            self.root.Delete(o.id, user=self.user)
+
+    def test_customtexts(self):
+        conf = self.app.configuration
+        conf.unlock()
+        conf.fulltextQueue = True
+        conf.lock()
+        o = db_app.createObj1(self.root)
+        try:
+            GetFulltextQueue(self.app).Clear()
+            o.__class__ = type("CustomTexts", (o.__class__,), {"GetTexts": lambda self: ["custom text"]})
+            # custom texts are written on every commit and not queued
+            o.Update({"fnumber": 99}, user=self.user)
+            self.assertEqual(o.GetFulltext(), "custom text")
+            self.assertEqual(len(GetFulltextQueue(self.app)), 0)
+        finally:
+            conf.unlock()
+            conf.fulltextQueue = False
+            conf.lock()
+            GetFulltextQueue(self.app).Clear()
+            self.root.Delete(o.id, user=self.user)
+
+    def test_queued(self):
+        conf = self.app.configuration
+        conf.unlock()
+        conf.fulltextQueue = True
+        conf.lock()
+        o = None
+        try:
+            o = db_app.createObj1(self.root)
+            self.assertEqual(o.GetFulltext(), "")
+            self.assertEqual(len(GetFulltextQueue(self.app)), 1)
+            # failed flushes keep the queued values
+            db = self.app.db
+            def fail(texts):
+                raise ValueError("failed")
+            db.WriteFulltexts = fail
+            try:
+                self.assertRaises(ValueError, FlushFulltext, self.app)
+            finally:
+                del db.WriteFulltexts
+            self.assertEqual(len(GetFulltextQueue(self.app)), 1)
+            self.assertEqual(FlushFulltext(self.app), 1)
+            self.assertEqual(len(GetFulltextQueue(self.app)), 0)
+            self.assertIn("this is text!", o.GetFulltext())
+        finally:
+            conf.unlock()
+            conf.fulltextQueue = False
+            conf.lock()
+            GetFulltextQueue(self.app).Clear()
+            if o is not None:
+                self.root.Delete(o.id, user=self.user)
+
+    def test_rewrite(self):
+        o = db_app.createObj1(self.root)
+        try:
+            o.dbEntry.WriteFulltext("")
+            o.dbEntry.Commit()
+            tool = self.app.GetTool("updatefulltext", self.app)
+            # resume after the object. the object is skipped.
+            tool.WriteCheckpoint(o.id)
+            r, v = tool(resume=1, workers=1)
+            self.assertTrue(v)
+            self.assertEqual(o.GetFulltext(), "")
+            self.assertFalse(os.path.exists(tool.CheckpointPath()))
+            r, v = tool(workers=2)
+            self.assertTrue(v)
+            self.assertIn("this is text!", o.GetFulltext())
+        finally:
+            self.root.Delete(o.id, user=self.user)
@@ -0,0 +1,153 @@
+# -*-coding:utf-8 -*-
+
+import io
+import unittest
+
+from nive.extensions.images import *
+from nive.extensions.images import _Reduce
+from nive.definitions import ObjectConf, FieldConf, Conf, INonContainer
+from nive.helper import FormatConfTestFailure
+from nive.security import User
+from nive.utils.dataPool2.files import File
+
+from nive.tests import db_app
+from nive.tests import __local
+
+
+def imagedata(size, format="JPEG"):
+    img = Image.new("RGB", size, (200, 100, 50))
+    out = io.BytesIO()
+    img.save(out, format)
+    return out.getvalue()
+
+def imagesize(data):
+    return Image.open(io.BytesIO(data)).size
+
+
+ProfileImage = Conf(source="imagefull", dest="image", format="JPEG", quality="80", width=400, height=0, extension="jpg")
+ProfileIcon = Conf(source="image", dest="icon", format="JPEG", quality="70", width=100, height=0, extension="jpg")
+
+typeimg = ObjectConf(
+    id = "typeimg",
+    name = "Image object",
+    dbparam = "dataimg",
+    context = "nive.objects.Object",
+    subtypes = [INonContainer],
+    extensions = ("nive.extensions.images.ImageExtension",),
+    imageProfiles = [ProfileImage, ProfileIcon]
+)
+typeimg.data = [
+    FieldConf(id="fstr", datatype="string", size=100, name="fstr"),
+    FieldConf(id="imagefull", datatype="file", size=5*1024*1024, name="imagefull"),
+    FieldConf(id="image", datatype="file", size=5*1024*1024, name="image"),
+    FieldConf(id="icon", datatype="file", size=5*1024*1024, name="icon"),
+]
+
+
+class ImagesTest(unittest.TestCase):
+
+    def test_conf(self):
+        r=tool_configuration.test()
+        if not r:
+            return
+        self.fail(FormatConfTestFailure(r))
+
+    def test_stages(self):
+        p1 = Conf(source="a", dest="b")
+        p2 = Conf(source="b", dest="c")
+        p3 = Conf(source="a", dest="d")
+        p4 = Conf(source="a", dest="a")
+        stages = ProfileStages([p2, p1, p3])
+        self.assertEqual(len(stages), 2)
+        self.assertTrue(stages[0][0] is p1 and stages[0][1] is p3)
+        self.assertTrue(stages[1][0] is p2)
+        # resize in place first
+        stages = ProfileStages([p3, p4])
+        self.assertTrue(stages[0][0] is p4 and stages[1][0] is p3)
+        self.assertEqual(ProfileStages([]), [])
+
+
+@unittest.skipUnless(PILloaded, "PIL not installed")
+class ConvertTest(unittest.TestCase):
+
+    profiles = [dict(dest="image", width=400, height=0, format="JPEG", extension="jpg"),
+                dict(dest="icon", width=100, height=0, format="PNG", extension="png")]
+
+    def test_convert(self):
+        for format in ("JPEG", "PNG"):
+            results = ConvertImage(imagedata((1600, 800), format), format.lower(), self.profiles)
+            self.assertEqual([r[0] for r in results], ["image", "icon"])
+            self.assertEqual(imagesize(results[0][1]), (400, 200))
+            self.assertEqual(imagesize(results[1][1]), (100, 50))
+            self.assertEqual(results[1][2], "png")
+
+    def test_draft(self):
+        # jpegs are decoded in reduced size
+        img = Image.open(io.BytesIO(imagedata((1600, 800))))
+        img = _Reduce(img, self.profiles[1:])
+        img.load()
+        self.assertTrue(200 <= img.size[0] < 1600)
+        # original size required
+        img = Image.open(io.BytesIO(imagedata((1600, 800))))
+        img = _Reduce(img, [dict(dest="image", width=0, height=0)])
+        self.assertEqual(img.size, (1600, 800))
+        # profiles larger than half the source
+        img = Image.open(io.BytesIO(imagedata((1600, 800))))
+        img = _Reduce(img, [dict(dest="image", width=1000, height=0)])
+        img.load()
+        self.assertEqual(img.size, (1600, 800))
+
+    def test_reduce(self):
+        img = Image.open(io.BytesIO(imagedata((1600, 800), "PNG")))
+        img = _Reduce(img, self.profiles[1:])
+        self.assertEqual(img.size, (200, 100))
+        results = ConvertImage(imagedata((1600, 800), "PNG"), "png", [dict(dest="image", width=0, height=0)])
+        self.assertEqual(imagesize(results[0][1]), (1600, 800))
+
+    def test_error(self):
+        results = ConvertImage(b"no image", "jpg", self.profiles)
+        self.assertEqual(results, [("image", None, None), ("icon", None, None)])
+
+
+@unittest.skipUnless(PILloaded, "PIL not installed")
+class ImagesTest_db(__local.DefaultTestCase):
+
+    def setUp(self):
+        self._loadApp([typeimg, tool_configuration])
+        self.root = self.app.root
+        self.user = User("test")
+
+    def tearDown(self):
+        self._closeApp()
+
+    def _create(self):
+        data = {"fstr": "image", "imagefull": File(filename="full.jpg", file=io.BytesIO(imagedata((1600, 800))))}
+        return self.root.Create("typeimg", data=data, user=self.user)
+
+    def test_chained(self):
+        o = self._create()
+        try:
+            # icon is derived from the converted image
+            obj = self.root.GetObj(o.id)
+            self.assertEqual(imagesize(obj.files.get("image").read()), (400, 200))
+            self.assertEqual(imagesize(obj.files.get("icon").read()), (100, 50))
+            obj.files.set("imagefull", File(filename="full.jpg", file=io.BytesIO(imagedata((800, 800))), tempfile=True))
+            result, msgs = obj.Process(images=["imagefull"])
+            self.assertEqual(result, 2)
+            self.assertEqual(imagesize(obj.files.get("image").read()), (400, 400))
+            self.assertEqual(imagesize(obj.files.get("icon").read()), (100, 100))
+        finally:
+            self.root.Delete(o.id, user=self.user)
+
+    def test_tool(self):
+        o = self._create()
+        try:
+            o.dbEntry.DeleteFile("icon")
+            o.dbEntry.Commit()
+            tool = self.app.GetTool("processImages", self.app)
+            r, v = tool(types=["typeimg"], emptyonly=True, testrun=False, workers=1, user=self.user)
+            self.assertTrue(tool.cnt >= 1)
+            obj = self.root.GetObj(o.id)
+            self.assertEqual(imagesize(obj.files.get("icon").read()), (100, 50))
+        finally:
+            self.root.Delete(o.id, user=self.user)
@@ -3,9 +3,22 @@
 import unittest
 
 
-from nive.extensions.path import PathExtension
+from nive.extensions.path import PathExtension, UniqueFilenames, LookupFilename, LookupPath
+from nive.extensions.cache import GetNameCache
+from nive.extensions import filename
 from nive.utils import language_data
+from nive.security import User
 
+from nive.tests import db_app
+from nive.tests import __local
+
+
+
+class FakeSearch(object):
+    def __init__(self, recs):
+        self.recs = recs
+    def FilenamesStartingWith(self, names, unitrefs=None):
+        return [r for r in self.recs if unitrefs is None or r[1] in unitrefs]
 
 
 class TestPath(unittest.TestCase):
@@ -51,6 +64,18 @@ class TestPath(unittest.TestCase):
         self.assertTrue(fn == "this_is_a_filename", fn)
         
         
+    def test_unique(self):
+        search = FakeSearch([(1, 10, "news"), (2, 10, "news-1"), (3, 11, "news"), (4, 10, "file_")])
+        self.assertEqual(UniqueFilenames(search, [(10, "news")]), ["news-2"])
+        self.assertEqual(UniqueFilenames(search, [(12, "news")]), ["news"])
+        self.assertEqual(UniqueFilenames(search, [(10, "news")], exclude=(2,)), ["news-1"])
+        self.assertEqual(UniqueFilenames(search, [(10, "news"), (10, "news"), (11, "news")]), ["news-2", "news-3", "news-1"])
+        self.assertEqual(UniqueFilenames(search, [(None, "news")]), ["news-2"])
+        self.assertEqual(UniqueFilenames(search, [(10, "file"), (10, "")]), ["file_-1", ""])
+        search = FakeSearch([(1, 10, "news.html")])
+        self.assertEqual(UniqueFilenames(search, [(10, "news")], extension="html"), ["news-1"])
+
+
     def test_special_chars(self):
         p = PathExtension()
 
@@ -63,3 +88,64 @@ class TestPath(unittest.TestCase):
             self.assertTrue(fn.startswith("test"), fn)
             
         
+
+
+
+class TestPath_db(__local.DefaultTestCase):
+
+    def setUp(self):
+        self._loadApp([db_app.appconf.copy(), filename.configuration])
+        self.root = self.app.root
+        self.user = User("test")
+
+    def tearDown(self):
+        self._closeApp()
+
+    def test_lookup(self):
+        r = self.root
+        o1 = r.Create("type1", data={"title": "lookup", "pool_filename": "lookup_path_1"}, user=self.user)
+        o2 = o1.Create("type1", data={"title": "lookup", "pool_filename": "lookup_path_2"}, user=self.user)
+        o3 = o2.Create("type2", data={"title": "lookup", "pool_filename": "lookup_path_3"}, user=self.user)
+        try:
+            db = self.app.db
+            self.assertEqual(db.GetPathIDs(r.id, ["lookup_path_1", "lookup_path_2", o3.id]), [o1.id, o2.id, o3.id])
+            self.assertEqual(db.GetPathIDs(r.id, ["lookup_path_1", "lookup_path_3"]), [])
+            obj = LookupPath(r, "lookup_path_1/lookup_path_2/lookup_path_3")
+            self.assertEqual(obj.id, o3.id)
+            self.assertEqual(obj.parent.parent.id, o1.id)
+            self.assertEqual(r.LookupPath(["lookup_path_1", str(o2.id)]).id, o2.id)
+            self.assertEqual(LookupPath(r, "lookup_path_1/unknown"), None)
+
+            cache = GetNameCache(self.app)
+            self.assertEqual(cache.Get((o1.id, "lookup_path_2")), o2.id)
+            self.assertEqual(r["lookup_path_1"].id, o1.id)
+            self.assertEqual(cache.Get((r.id, "lookup_path_1")), o1.id)
+            # renamed. cached name is checked against the object.
+            o1.Update({"pool_filename": "lookup_path_1b"}, user=self.user)
+            self.assertRaises(KeyError, r.__getitem__, "lookup_path_1")
+            self.assertEqual(r["lookup_path_1b"]["lookup_path_2"].id, o2.id)
+            o2.Signal("pathupdate", path="")
+            self.assertEqual(cache.Get((o1.id, "lookup_path_2")), None)
+            self.assertEqual(LookupFilename(o2, "lookup_path_3").id, o3.id)
+        finally:
+            r.DeleteTree(o1.id, user=self.user)
+
+    def test_lookup_restraints(self):
+        r = self.root
+        o1 = r.Create("type1", data={"title": "lookup", "pool_filename": "lookup_same", "pool_state": 0}, user=self.user)
+        o2 = r.Create("type1", data={"title": "lookup", "pool_filename": "lookup_other", "pool_state": 1}, user=self.user)
+        o3 = o2.Create("type1", data={"title": "lookup", "pool_filename": "lookup_child"}, user=self.user)
+        # same name on one level. the first match is restricted, the sibling visible.
+        o2.dbEntry.meta.set("pool_filename", "lookup_same")
+        o2.dbEntry.Commit()
+        restraints = r.queryRestraints
+        r.queryRestraints = {"pool_state": 1}, {"pool_state": "="}
+        try:
+            self.assertEqual(self.app.db.GetPathIDs(r.id, ["lookup_same"]), [o1.id])
+            self.assertEqual(LookupPath(r, "lookup_same").id, o2.id)
+            self.assertEqual(LookupPath(r, "lookup_same/lookup_child").id, o3.id)
+            self.assertEqual(LookupPath(r, "lookup_same/unknown"), None)
+        finally:
+            r.queryRestraints = restraints
+            r.DeleteTree(o2.id, user=self.user)
+            r.Delete(o1.id, user=self.user)
@@ -326,7 +326,7 @@ def GetVirtualObj(configuration, app):
     """
     if not configuration:
         raise ConfigurationError("Type not found")
-    obj = ClassFactory(configuration, app.reloadExtensions, True, base=None)
+    obj = app.factory.GetObjectClass(configuration)
     dbEntry = app.db.GetEntry(0, virtual=1)
     obj = obj(0, dbEntry, parent=None, configuration=configuration)
     return obj
@@ -397,11 +397,21 @@ def ClassFactory(configuration, reloadClass=False, raiseError=True, base=None, s
     return cls
 
 
+_classRefs = {}
+
 def GetClassRef(tag, reloadClass=False, raiseError=True, base=None):
     """
     Resolve class reference from python dotted string.
+
+    Resolved references are cached by dotted name. If reloadClass = True the cache
+    is skipped and the name resolved again.
     """
     if isinstance(tag, str):
+        key = (tag, base)
+        if not reloadClass:
+            classRef = _classRefs.get(key)
+            if classRef is not None:
+                return classRef
         if raiseError:
             classRef = ResolveName(tag, base=base)
         else:
@@ -413,6 +423,7 @@ def GetClassRef(tag, reloadClass=False, raiseError=True, base=None):
             return None
         #if reloadClass:
         #    reload(classRef)
+        _classRefs[key] = classRef
         return classRef
     # tag is class ref
     return tag
@@ -186,15 +186,11 @@ class ObjectRead(Events):
 
         returns FieldConf or None
         """
-        if IFieldConf.providedBy(fldId):
-            f = [d for d in self.configuration.data if d["id"] == fldId.id]
-            if f:
-                return fldId
-        else:
-            f = [d for d in self.configuration.data if d["id"] == fldId]
-            if f:
-                return f[0]
-        return self.app.configurationQuery.GetMetaFld(fldId)
+        query = self.app.configurationQuery
+        f = query.GetObjectFld(fldId, self.configuration)
+        if f is not None:
+            return f
+        return query.GetMetaFld(fldId)
 
     def GetTitle(self):
         """ returns the objects meta.title as string """
@@ -515,6 +511,10 @@ class ObjectWrite:
         """
         self.Signal("commit", user=user)
         self.dbEntry.Commit(user=user)
+        # remove cached records
+        p = self.parent
+        if ICache.providedBy(p):
+            p.RemoveCache(self.id)
 
 
     def CreateSelf(self, data, user, **kw):
@@ -6,6 +6,7 @@ Application.modules stores configuration objects registered by calling `Register
 """
 
 import uuid
+from types import MappingProxyType
 from zope.interface import providedBy
 
 from nive.definitions import IViewModuleConf, IViewConf, IRootConf, IObjectConf, IToolConf
@@ -14,22 +15,133 @@ from nive.definitions import ReadonlySystemFlds
 from nive.definitions import ConfigurationError
 
 from nive.utils.utils import SortConfigurationList
-from nive.helper import ResolveName, ResolveConfiguration, FormatConfTestFailure
+from nive.helper import ResolveName, ResolveConfiguration, FormatConfTestFailure, ClassFactory
 from nive.helper import DecorateViewClassWithViewModuleConf
 from nive.tool import _IGlobal, _GlobalObject
+from nive.events import InitChain
 from nive.workflow import IWfProcessConf
 
 
+class FieldIndex(object):
+    """
+    Read only lookup tables for root, type, type field and meta field configurations.
+    Built by the application after the registration is finished and all configurations
+    are locked. ::
+
+        roots = {rootID: configuration}
+        types = {typeID: configuration}
+        fields = {typeID: {fieldID: configuration}} for types and roots
+        meta = {fieldID: configuration}
+
+    """
+
+    def __init__(self, app):
+        registry = app.registry
+        self.roots = MappingProxyType(dict(registry.getUtilitiesFor(IRootConf)))
+        self.types = MappingProxyType(dict(registry.getUtilitiesFor(IObjectConf)))
+        fields = {}
+        for typeID, conf in list(self.roots.items())+list(self.types.items()):
+            fields[typeID] = self._Index(conf.data or ())
+        self.fields = MappingProxyType(fields)
+        self.meta = self._Index(app.configuration.meta)
+
+    def Fields(self, conf):
+        """
+        returns the field index for the type configuration or None if the configuration
+        is not registered
+        """
+        if self.types.get(conf.id) is conf or self.roots.get(conf.id) is conf:
+            return self.fields.get(conf.id)
+        return None
+
+    def _Index(self, fields):
+        # the first field definition wins like the list lookups
+        index = {}
+        for f in fields:
+            index.setdefault(f["id"], f)
+        return MappingProxyType(index)
+
+
+class ClassEntry(object):
+    """
+    Pre-built class of a root or type configuration ::
+
+        cls = the composed class including extensions
+        inits = the resolved Init() chain of the class
+        listeners = {signal: (callbacks)} from configuration.events
+
+    """
+    __slots__ = ("cls", "inits", "listeners")
+
+    def __init__(self, cls, inits, listeners):
+        self.cls = cls
+        self.inits = inits
+        self.listeners = listeners
+
+
+class ClassCache(object):
+    """
+    Read only lookup table of pre-built classes for root and type configurations.
+    Built by the application after the registration is finished and all configurations
+    are locked. Object factories only need to instantiate the cached class. ::
+
+        classes = {configuration.id: ClassEntry} for types and roots
+
+    Configurations with class references that cannot be resolved are skipped.
+    """
+
+    def __init__(self, app):
+        registry = app.registry
+        reloadClass = app.reloadExtensions
+        roots = {}
+        for rootID, conf in registry.getUtilitiesFor(IRootConf):
+            roots[rootID] = self._Entry(conf, reloadClass)
+        types = {}
+        for typeID, conf in registry.getUtilitiesFor(IObjectConf):
+            types[typeID] = self._Entry(conf, reloadClass)
+        self._roots = roots
+        self._types = types
+
+    def Get(self, conf):
+        """
+        returns the class entry for the configuration or None if the configuration
+        is not registered
+        """
+        entry = self._types.get(conf.id)
+        if entry is None or entry[0] is not conf:
+            entry = self._roots.get(conf.id)
+            if entry is None or entry[0] is not conf:
+                return None
+        return entry[1]
+
+    def _Entry(self, conf, reloadClass):
+        cls = ClassFactory(conf, reloadClass, False, base=None)
+        if cls is None:
+            return None
+        listeners = {}
+        for e in conf.get("events") or ():
+            listeners.setdefault(e.event, []).append(e.callback)
+        listeners = MappingProxyType(dict((k, tuple(v)) for k, v in listeners.items()))
+        return conf, ClassEntry(cls, InitChain(cls), listeners)
+
+
 class AppConfigurationQuery(object):
     """
     Read access functions for root, type, type field, meta field and category configurations.
 
+    Root, type and field lookups use the application's `FieldIndex` once the registration
+    is finished.
+
     Requires:
     - nive.nive
     """
     def __init__(self, app):
         self.app = app
 
+    @property
+    def _index(self):
+        return getattr(self.app, "_fieldIndex", None)
+
     def QueryConf(self, queryFor, context=None):
         """
         Returns a list of configurations or empty list
@@ -67,6 +179,9 @@ class AppConfigurationQuery(object):
         """
         if name == "":
             name = self.app.rootname
+        index = self._index
+        if index is not None and isinstance(name, str):
+            return index.roots.get(name)
         return self.app.registry.queryUtility(IRootConf, name=name)
 
     def GetAllRootConfs(self):
@@ -87,7 +202,11 @@ class AppConfigurationQuery(object):
 
         returns configuration or none
         """
-        c = self.app.registry.queryUtility(IObjectConf, name=typeID)
+        index = self._index
+        if index is not None and isinstance(typeID, str):
+            c = index.types.get(typeID)
+        else:
+            c = self.app.registry.queryUtility(IObjectConf, name=typeID)
         if c or skipRoot:
             return c
         return self.GetRootConf(typeID)
@@ -144,11 +263,30 @@ class AppConfigurationQuery(object):
 
     def GetObjectFld(self, fldID, typeID):
         """
-        Returns object field configuration.
+        Returns object field configuration. `typeID` can be the type id or type configuration.
 
         returns configuration or None
         """
-        fields = self.GetAllObjectFlds(typeID)
+        index = self._index
+        if index is not None:
+            if IObjectConf.providedBy(typeID) or IRootConf.providedBy(typeID):
+                fields = index.Fields(typeID)
+            elif isinstance(typeID, str):
+                fields = index.fields.get(typeID)
+                if fields is None and self.GetObjectConf(typeID) is None:
+                    return None
+            else:
+                fields = None
+            if fields is not None:
+                if IFieldConf.providedBy(fldID):
+                    return fldID if fldID.id in fields else None
+                if isinstance(fldID, str):
+                    return fields.get(fldID)
+                return None
+        if IObjectConf.providedBy(typeID) or IRootConf.providedBy(typeID):
+            fields = typeID.data
+        else:
+            fields = self.GetAllObjectFlds(typeID)
         if not fields:
             return None
         if IFieldConf.providedBy(fldID):
@@ -180,6 +318,13 @@ class AppConfigurationQuery(object):
 
         returns configuration or None
         """
+        index = self._index
+        if index is not None:
+            if IFieldConf.providedBy(fldID):
+                return fldID if fldID.id in index.meta else None
+            if isinstance(fldID, str):
+                return index.meta.get(fldID)
+            return None
         if IFieldConf.providedBy(fldID):
             f = [d for d in self.app.configuration.meta if d["id"] == fldID.id]
             if f:
@@ -206,10 +351,12 @@ class AppConfigurationQuery(object):
 
         returns string
         """
-        m = [d for d in self.app.configuration.meta if d["id"] == fldID]
-        if not m:
+        if not isinstance(fldID, str):
+            return ""
+        m = self.GetMetaFld(fldID)
+        if m is None:
             return ""
-        return m[0]["name"]
+        return m["name"]
 
     # Tool -------------------------------------------------------------
 
@@ -44,6 +44,15 @@ skipRender        render result flds as html element.
                   default: ``pool_type, pool_wfa, pool_wfp`` 
                   to skip all: *True*, or a list of fields  ("pool_wfa","pool_type")
 skipCount         enable or disable second query to get the number of all records.
+batchSize         number of records fetched at once by iterator functions e.g. ``SearchIter()``
+rowType           ``dict`` (default) or ``record``. Records are returned as `SearchRecord`
+                  tuples sharing one field name index instead of dictionaries.
+after             keyset pagination. continuation token returned as `after` in the previous 
+                  result. Pass an empty string to load the first page. *start* is ignored.
+                  The result is sorted by *sort* and id. *sort* has to be a single field.
+totals            how to calculate *total*: ``exact`` (default), ``estimate`` (query planner 
+                  estimate if supported by the database), ``cached`` (exact count cached for
+                  `searchCountCacheTime` seconds) or ``none``.
 relation          Resolve a relation and load the related entry as object. For example
                   you load the user object by settings `relation=pool_createdby`. The
                   result set will include the user object instead of the user name.
@@ -72,11 +81,15 @@ nextend        end number of next record set
 prev           start number of previous record set
 prevend        end number of previous record set
 sql            the sql statement used
+after          keyset pagination: continuation token for the next page. empty if no more
+               records
 =============  ========================================================================
 
 """
 
 import time
+import json
+import base64
 
 from nive.utils.utils import ConvertToNumberList
 from nive.views import FieldRenderer
@@ -85,6 +98,76 @@ from nive.definitions import FieldConf
 from nive.definitions import ConfigurationError, ConnectionError
 
 
+CountCacheTime = 60
+
+
+def _EmptyNone(value):
+    return "" if value is None else value
+
+
+class SearchRecord(tuple):
+    """
+    Lightweight result row returned for ``rowType="record"``. Values are accessed by 
+    position, by field name ``rec["title"]`` or ``rec.get("title")``. The field names
+    are stored once in the record type of a result.
+    """
+    __slots__ = ()
+    fields = ()
+    _index = {}
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return tuple.__getitem__(self, self._index[key])
+        return tuple.__getitem__(self, key)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def get(self, key, default=None):
+        p = self._index.get(key)
+        if p is None:
+            return default
+        return tuple.__getitem__(self, p)
+
+    def keys(self):
+        return self.fields
+
+    def items(self):
+        return list(zip(self.fields, self))
+
+    def asdict(self):
+        return dict(zip(self.fields, self))
+
+    @classmethod
+    def Type(cls, fields):
+        """
+        Creates a record type for the field names
+        """
+        fields = tuple(fields)
+        index = dict([(f, p) for p, f in enumerate(fields)])
+        return type("SearchRecord", (cls,), {"__slots__": (), "fields": fields, "_index": index})
+
+
+def EncodeKeyset(value, id):
+    """
+    Encodes the sort value and id of the last record as continuation token for keyset 
+    pagination.
+    """
+    data = json.dumps([value, id], default=str)
+    return base64.urlsafe_b64encode(data.encode("utf-8")).decode("ascii")
+
+
+def DecodeKeyset(token):
+    """
+    Decodes a continuation token. Returns sort value and id or raises a ValueError.
+    """
+    try:
+        value, id = json.loads(base64.urlsafe_b64decode(str(token).encode("ascii")).decode("utf-8"))
+        return value, int(id)
+    except Exception:
+        raise ValueError("Invalid continuation token")
+
+
 class Search(object):
     """ Provides search functionality  """
 
@@ -122,6 +205,57 @@ class Search(object):
         
         returns records as list
         """
+        db, sql, values = self._FmtSelect(pool_type, parameter, fields, operators, sort, ascending, start, max, kw)
+        recs = db.Query(sql, values)
+        return recs
+
+
+    def SelectIter(self, pool_type=None, parameter=None, fields=None, operators=None, sort=None, ascending=1, start=0, max=0, **kw):
+        """
+        Iterator version of `Select()`. Records are fetched from the database in batches while 
+        iterating. Use for large results e.g. exports. MySql reads committed records only.
+        
+        Supported keywords: ``groupby, logicalOperator, condition, dontAddType, dataTable, db, batchSize``
+        
+        returns a records generator
+        """
+        db, sql, values = self._FmtSelect(pool_type, parameter, fields, operators, sort, ascending, start, max, kw)
+        return db.QueryIter(sql, values, batchSize=kw.get("batchSize"))
+
+
+    def SelectPage(self, pool_type=None, parameter=None, fields=None, operators=None, sort=None, ascending=1, max=100, after="", **kw):
+        """
+        Keyset paginated version of `Select()`. Instead of a start number the continuation 
+        token `after` returned by the previous call is passed to load the next page. Pages are
+        selected with a constant cost. Records are sorted by *sort* and id. *sort* has to be
+        a single field.
+        
+        Supported keywords: ``logicalOperator, condition, dontAddType, dataTable, db``
+        
+        returns records as list, continuation token for the next page or an empty string
+        """
+        fields = list(fields or ["id"])
+        kw["sort"] = sort
+        kw["ascending"] = ascending
+        kw["after"] = after
+        dataTable = None
+        if pool_type is not None:
+            typeInf = self.app.configurationQuery.GetObjectConf(pool_type)
+            if not typeInf:
+                raise ConfigurationError(pool_type + " type not found")
+            dataTable = typeInf["dbparam"]
+        keyflds = self._PrepareKeyset(kw, dataTable, singleTable=pool_type is None)
+        db, sql, values = self._FmtSelect(pool_type, parameter, fields+keyflds, operators, kw["sort"], ascending, 0, max, kw)
+        recs = db.Query(sql, values)
+        token = ""
+        if max and len(recs) == max:
+            token = EncodeKeyset(recs[-1][-2], recs[-1][-1])
+        n = len(fields)
+        return [r[:n] for r in recs], token
+
+
+    def _FmtSelect(self, pool_type, parameter, fields, operators, sort, ascending, start, max, kw):
+        # returns db, sql statement and values for Select() 
         parameter = parameter or {}
         operators = operators or {}
         fields = fields or ["id"]
@@ -139,7 +273,8 @@ class Search(object):
                                           max=max, 
                                           groupby=kw.get("groupby"), 
                                           logicalOperator=kw.get("logicalOperator"), 
-                                          condition=kw.get("condition"))
+                                          condition=kw.get("condition"),
+                                          extraValues=kw.get("extraValues"))
         else:
             if "pool_type" not in parameter and not kw.get("dontAddType"):
                 parameter["pool_type"] = pool_type
@@ -158,9 +293,9 @@ class Search(object):
                                           max=max, 
                                           groupby=kw.get("groupby"), 
                                           logicalOperator=kw.get("logicalOperator"), 
-                                          condition=kw.get("condition"))
-        recs = db.Query(sql, values)
-        return recs
+                                          condition=kw.get("condition"),
+                                          extraValues=kw.get("extraValues"))
+        return db, sql, values
 
 
     def SelectDict(self, pool_type=None, parameter=None, fields=None, operators=None, sort=None, ascending=1, start=0, max=0, **kw):
@@ -238,14 +373,22 @@ class Search(object):
         db = self.db
         if not db:
             raise ConnectionError("No database connection")
-        
-        sql, values = db.FmtSQLSelect(fldList, 
+
+        sqlFlds, countkw = fldList, kw
+        keyset = "after" in kw
+        if keyset:
+            start = 0
+            countkw = kw.copy()
+            sqlFlds = fldList + self._PrepareKeyset(kw, None)
+
+        sql, values = db.FmtSQLSelect(sqlFlds, 
                                       parameter=parameter, 
                                       operators=operators, 
                                       start=start,
                                       max=max,
                                       **kw)
         records = db.Query(sql, values)
+        after = self._NextKeyset(records, max) if keyset else None
 
         # convert records
         fldList = self._RenameFieldAlias(fldList)
@@ -253,34 +396,69 @@ class Search(object):
         items, cnt = self._ConvertRecords(records, converter, fields, fldList, kw)
 
         # total records
-        total = len(items) + start
-        if (total==max or start>0) and kw.get("skipCount") != 1:
-            if "sort" in kw:
-                del kw["sort"]
-            if not kw.get("groupby"):
-                sql2, values = db.FmtSQLSelect(["-count(*)"], 
-                                               parameter=parameter, 
-                                               operators=operators, 
-                                               start=None, 
-                                               max=None,
-                                               **kw)
-                val = db.Query(sql2, values)
-                total = val[0][0] if val else 0
-            else:
-                sql2, values = db.FmtSQLSelect(["-count(DISTINCT %s)" % (kw.get("groupby"))], 
-                                               parameter=parameter, 
-                                               operators=operators, 
-                                               start=None, 
-                                               max=None, 
-                                               **kw)
-                val = db.Query(sql2, values)
-                total = len(val) if val else 0
+        total = self._CountTotal(db, items, start, max, keyset, parameter, operators, "", countkw)
 
         items = self._HandleRelations(kw.get("relations"), items, kw)
-        result = self._PrepareResult(items, parameter, cnt, total, start, max, t, sql)
+        result = self._PrepareResult(items, parameter, cnt, total, start, max, t, sql, after)
         return result
 
 
+    def SearchIter(self, parameter, fields=None, operators=None, pool_type=None, **kw):
+        """
+        Iterator version of `Search()` and `SearchType()`. Records are fetched in batches and 
+        rendered while iterating. If *pool_type* is set meta and data fields can be used. 
+        Supports all keyword options except total record counts. By default all records 
+        are returned (max=0).
+        
+        Example ::
+        
+            for item in root.search.SearchIter({"pool_type":"image"}, 
+                                               fields=["id", "title"]):
+                ...
+        
+        returns a generator of result items (See above)
+        """
+        parameter = parameter or {}
+        fields = fields or []
+        operators = operators or {}
+        if "max" not in kw:
+            kw["max"] = 0
+        start, max, kw = self._SearchKWs(kw)
+        # lookup field definitions
+        fields, fldList, groupcol = self._PrepareFields(fields, pool_type)
+        self._HandleGroupByQueries(fields, fldList, groupcol, kw)
+
+        dataTable = ""
+        if pool_type:
+            self._HandleTypeJoins(pool_type, parameter, operators, kw)
+            typeInf = self.app.configurationQuery.GetObjectConf(pool_type)
+            if not typeInf:
+                raise ConfigurationError("Type not found (%s)" % (pool_type))
+            dataTable = typeInf["dbparam"]
+
+        db = self.db
+        if db is None:
+            raise ConnectionError("No database connection")
+
+        sql, values = db.FmtSQLSelect(fldList, 
+                                      parameter=parameter,  
+                                      operators=operators,
+                                      start=start, 
+                                      max=max, 
+                                      dataTable=dataTable,
+                                      **kw)
+        records = db.QueryIter(sql, values, batchSize=kw.get("batchSize"))
+
+        # prepare field renderer and names
+        fldList = self._RenameFieldAlias(fldList)
+        converter = self._PrepareRenderer(kw, fldList)
+        relations = kw.get("relations")
+        for item in self._IterRecords(records, converter, fields, fldList, kw):
+            if relations:
+                self._HandleRelations(relations, [item], kw)
+            yield item
+
+
     def SearchType(self, pool_type, parameter=None, fields=None, operators=None, **kw):
         """
         Extended meta and data layer search function. Supports all keyword options and search result. 
@@ -312,7 +490,14 @@ class Search(object):
         if db is None:
             raise ConnectionError("No database connection")
 
-        sql, values = db.FmtSQLSelect(fldList, 
+        sqlFlds, countkw = fldList, kw
+        keyset = "after" in kw
+        if keyset:
+            start = 0
+            countkw = kw.copy()
+            sqlFlds = fldList + self._PrepareKeyset(kw, typeInf["dbparam"])
+
+        sql, values = db.FmtSQLSelect(sqlFlds, 
                                       parameter=parameter,  
                                       operators=operators,
                                       start=start, 
@@ -320,6 +505,7 @@ class Search(object):
                                       dataTable=typeInf["dbparam"],
                                       **kw)
         records = db.Query(sql, values)
+        after = self._NextKeyset(records, max) if keyset else None
             
         # prepare field renderer and names
         fldList = self._RenameFieldAlias(fldList)
@@ -327,27 +513,10 @@ class Search(object):
         items, cnt = self._ConvertRecords(records, converter, fields, fldList, kw)
 
         # total records
-        total = len(items) + start
-        if (total==max or start>0) and kw.get("skipCount") != 1:
-            if "sort" in kw:
-                del kw["sort"]
-            if not kw.get("groupby"):
-                cntflds = ["-count(*) as cnt"]
-            else:
-                cntflds = ["-count(DISTINCT %s) as cnt" % (kw.get("groupby"))]
-            sql2, values = db.FmtSQLSelect(cntflds, 
-                                           parameter=parameter,  
-                                           operators=operators,
-                                           dataTable=typeInf["dbparam"],
-                                           **kw)
-            val = db.Query(sql2, values)
-            if not kw.get("groupby"):
-                total = val[0][0] if val else 0
-            else:
-                total = len(val) if val else 0
+        total = self._CountTotal(db, items, start, max, keyset, parameter, operators, typeInf["dbparam"], countkw)
 
         items = self._HandleRelations(kw.get("relations"), items, kw)
-        result = self._PrepareResult(items, parameter, cnt, total, start, max, t, sql)
+        result = self._PrepareResult(items, parameter, cnt, total, start, max, t, sql, after)
         return result
 
 
@@ -750,17 +919,179 @@ class Search(object):
         return fldList
 
     def _ConvertRecords(self, records, converter, fields, fldList, kws):
-        # convert result
-        db = self.db
-        items = []
+        # convert result column by column
+        if not records:
+            return [], 0
+        columns = list(zip(*records))
+        values = []
+        for p, (de, render) in enumerate(self._CompileConverters(converter, fields, kws)):
+            col = columns[p]
+            if de is not None:
+                col = list(map(de, col))
+            if render is not None:
+                col = list(map(render, col))
+            else:
+                col = ["" if v is None else v for v in col]
+            values.append(col)
+        items = list(map(self._RowFactory(fldList[:len(values)], kws), zip(*values)))
+        return items, len(items)
+
+    def _IterRecords(self, records, converter, fields, fldList, kws):
+        # convert and render records one by one
+        converters = [(de, render or _EmptyNone) for de, render in self._CompileConverters(converter, fields, kws)]
+        factory = self._RowFactory(fldList[:len(converters)], kws)
         for rec in records:
             rec2 = []
-            for p in range(len(fields)):
-                value = db.structure._de(rec[p], fields[p]["datatype"], fields[p])
-                rec2.append(converter.Render(fields[p], value, False, **kws))
-            items.append(dict(list(zip(fldList, rec2))))
-        return items, len(items)
+            for p, (de, render) in enumerate(converters):
+                value = rec[p]
+                if de is not None:
+                    value = de(value)
+                rec2.append(render(value))
+            yield factory(rec2)
+
+    def _CompileConverters(self, converter, fields, kws):
+        # resolve the deserializer and renderer for each field once. returns a list of 
+        # (deserializer, renderer) tuples. None is used for conversions without effect 
+        # except empty values.
+        structure = self.db.structure
+        converters = []
+        for fld in fields:
+            de = structure.GetDeserializer(fld["datatype"], fld)
+            render = None
+            if converter.IsRendered(fld):
+                render = converter.Compile(fld, False, **kws)
+            converters.append((de, render))
+        return converters
+
+    def _RowFactory(self, names, kws):
+        # returns a function creating a result row from a value sequence
+        if kws.get("rowType") == "record" and not kws.get("relations"):
+            return SearchRecord.Type(names)
+        return lambda row: dict(zip(names, row))
     
+    def _PrepareKeyset(self, kws, dataTable, singleTable=False):
+        # adds the keyset sort order and condition to kws. returns the fields to be appended
+        # to the selected fields. records are sorted by the sort field and id. NULL values 
+        # are sorted as the largest values on all database systems.
+        sort = kws.get("sort") or "id"
+        if not isinstance(sort, str) or sort[0] in "-!+" or sort.find(",") != -1 or sort.strip().find(" ") != -1:
+            raise ValueError("Keyset pagination requires a single sort field")
+        if (kws.get("logicalOperator") or "AND").upper() != "AND":
+            raise ValueError("Keyset pagination requires logicalOperator AND")
+        sort = sort.strip()
+        ascending = kws.get("ascending", 1) != 0
+        if singleTable:
+            col, idcol = sort, "id"
+        else:
+            idcol = "meta__.id"
+            metaStructure = self.db.structure.get(self.db.MetaTable, ())
+            if sort in metaStructure or not dataTable:
+                col = "meta__." + sort
+            else:
+                col = "data__." + sort
+        if sort != "id":
+            # the sort direction of the id column is added by FmtSQLSelect
+            direction = "ASC" if ascending else "DESC"
+            kws["sort"] = "!%s IS NULL %s, %s %s, %s" % (col, direction, col, direction, idcol)
+        else:
+            kws["sort"] = sort
+        if not kws.get("after"):
+            return [sort, "id"]
+
+        value, id = DecodeKeyset(kws["after"])
+        op = ">" if ascending else "<"
+        ph = self.db.placeholder
+        if sort == "id":
+            condition = "%s %s %s" % (idcol, op, ph)
+            values = [id]
+        elif value is None:
+            # last record in the NULL group
+            if ascending:
+                condition = "(%s IS NULL AND %s > %s)" % (col, idcol, ph)
+            else:
+                condition = "(%s IS NOT NULL OR %s < %s)" % (col, idcol, ph)
+            values = [id]
+        else:
+            condition = "(%s %s %s OR (%s = %s AND %s %s %s))" % (col, op, ph, col, ph, idcol, op, ph)
+            if ascending:
+                condition = "(%s OR %s IS NULL)" % (condition, col)
+            values = [value, value, id]
+        if kws.get("condition"):
+            condition = "(%s) AND %s" % (kws["condition"], condition)
+        kws["condition"] = condition
+        kws["extraValues"] = list(kws.get("extraValues") or []) + values
+        return [sort, "id"]
+
+    def _NextKeyset(self, records, max):
+        # continuation token based on the last record. sort value and id are the last two columns.
+        if not max or len(records) < max:
+            return ""
+        return EncodeKeyset(records[-1][-2], records[-1][-1])
+
+    def _CountTotal(self, db, items, start, max, keyset, parameter, operators, dataTable, kws):
+        # calculates the total number of records based on kws["totals"]
+        total = len(items) + start
+        totals = kws.get("totals") or "exact"
+        if not (total==max or start>0 or (keyset and kws.get("after"))) or kws.get("skipCount") == 1 or totals == "none":
+            return total
+        kws = kws.copy()
+        for k in ("sort", "after"):
+            if k in kws:
+                del kws[k]
+        groupby = kws.get("groupby")
+        if totals == "estimate" and not groupby:
+            sql, values = db.FmtSQLSelect(["id"], 
+                                          parameter=parameter, 
+                                          operators=operators, 
+                                          start=None, 
+                                          max=None,
+                                          dataTable=dataTable,
+                                          **kws)
+            estimate = db.EstimateCount(sql, values)
+            if estimate is not None:
+                return estimate
+        if not groupby:
+            cntflds = ["-count(*)"]
+        else:
+            cntflds = ["-count(DISTINCT %s)" % (groupby)]
+        sql, values = db.FmtSQLSelect(cntflds, 
+                                      parameter=parameter, 
+                                      operators=operators, 
+                                      start=None, 
+                                      max=None,
+                                      dataTable=dataTable,
+                                      **kws)
+        key = None
+        if totals == "cached":
+            cache = self._GetCountCache()
+            try:
+                key = (sql, tuple(values))
+                hash(key)
+            except TypeError:
+                key = None
+            if key is not None and key in cache:
+                t, cnt = cache[key]
+                if t > time.time():
+                    return cnt
+        val = db.Query(sql, values)
+        if not groupby:
+            total = val[0][0] if val else 0
+        else:
+            total = len(val) if val else 0
+        if key is not None:
+            if len(cache) > 1000:
+                cache.clear()
+            cache[key] = (time.time() + (self.app.configuration.get("searchCountCacheTime") or CountCacheTime), total)
+        return total
+
+    def _GetCountCache(self):
+        # application wide cache for search totals
+        cache = getattr(self.app, "_c_searchcounts", None)
+        if cache is None:
+            cache = {}
+            self.app._c_searchcounts = cache
+        return cache
+
     def _HandleRelations(self, relations, items, kws):
         if not relations:
             return items
@@ -782,9 +1113,11 @@ class Search(object):
             # todo load obj by id
         return items
 
-    def _PrepareResult(self, items, parameter, cnt, total, start, max, t, sql):
+    def _PrepareResult(self, items, parameter, cnt, total, start, max, t, sql, after=None):
         # prepare result dictionary and paging information
         result = {}
+        if after is not None:
+            result["after"] = after
         result["items"] = items
         result["criteria"] = parameter
         result["count"] = cnt
@@ -816,7 +1149,7 @@ class Search(object):
 
     def GetTree(self, flds=None, sort="id", base=0, parameter=""):
         """
-        Select list of all folders from db.
+        Select the subtree below `base` from db in a single query.
         
         returns the subtree
         {'items': [{'id': 354956L, 'ref1': 354954L, 'ref2': 354952L, ..., 'ref10': None, 'items': [...]}]
@@ -948,8 +1281,11 @@ class Search(object):
             parameter["pool_unitref"] = unitref
         parameter["pool_filename"] = filename
         operators["pool_filename"] = "="
-        # lookup meta list default fields
-        flds = self.app.configuration.listDefault
+        if firstResultOnly:
+            flds = ["id"]
+        else:
+            # lookup meta list default fields
+            flds = self.app.configuration.listDefault
         recs = self.Select(parameter=parameter, fields=flds, operators=operators)
         #print recs
         if firstResultOnly:
@@ -959,6 +1295,46 @@ class Search(object):
         return recs
 
 
+    def FilenamesStartingWith(self, names, unitrefs=None):
+        """
+        Selects all url path filenames (meta.pool_filename) starting with one of `names`.
+        If `unitrefs` is a list of ids the query is restricted to these containers. `_` in 
+        names matches any character, compare the returned filenames. Long lists are queried 
+        in chunks of `_MaxBatchSize` values.
+
+        returns records as list of (id, pool_unitref, pool_filename)
+        """
+        names = [n for n in names if n]
+        if not names:
+            return []
+        db = self.db
+        size = db._MaxBatchSize
+        refchunks = [None]
+        if unitrefs is not None:
+            unitrefs = list(unitrefs)
+            if not unitrefs:
+                return []
+            # names and unitrefs share the number of values per statement
+            size = max(size // 2, 1)
+            refchunks = db._ChunkIDs(unitrefs, size)
+        ph = db.placeholder
+        recs = []
+        ids = set()
+        for namechunk in db._ChunkIDs(names, size):
+            for refchunk in refchunks:
+                values = [n+"%" for n in namechunk]
+                sql = "SELECT id, pool_unitref, pool_filename FROM %s WHERE (%s)" % (db.MetaTable, " OR ".join(["pool_filename LIKE %s" % ph]*len(namechunk)))
+                if refchunk is not None:
+                    sql += " AND pool_unitref IN (%s)" % ",".join([ph]*len(refchunk))
+                    values += refchunk
+                for rec in db.Query(sql, values):
+                    # a filename may start with names of different chunks
+                    if rec[0] not in ids:
+                        ids.add(rec[0])
+                        recs.append(rec)
+        return recs
+
+
     def IDToFilename(self, id):
         """
         Convert id to url path filename (meta.pool_filename). This function does not lookup
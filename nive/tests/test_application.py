@@ -1,4 +1,5 @@
 import time
+import operator
 import unittest
 
 from nive.application import *
@@ -392,6 +393,36 @@ class appConfigurationQueryTest(unittest.TestCase):
         self.assertTrue(self.app.configurationQuery.GetObjectFld(FieldConf(id="a1"), "object"))
         self.assertTrue(self.app.configurationQuery.GetMetaFld(FieldConf(id="pool_type")))
 
+    def test_fieldindex(self):
+        index = self.app._fieldIndex
+        self.assertTrue(index)
+        self.assertTrue(index.types["object"] is self.app.configurationQuery.GetObjectConf("object"))
+        self.assertTrue(index.roots["root"])
+        self.assertEqual(set(index.fields["object"].keys()), set(["a1", "a2"]))
+        self.assertTrue(index.meta["pool_type"] is self.app.configurationQuery.GetMetaFld("pool_type"))
+        self.assertRaises(TypeError, operator.setitem, index.meta, "x", None)
+        conf = self.app.configurationQuery.GetObjectConf("object")
+        self.assertTrue(self.app.configurationQuery.GetObjectFld("a1", conf))
+        self.assertTrue(self.app.configurationQuery.GetObjectFld("a3", conf) == None)
+        self.assertTrue(self.app.configurationQuery.GetMetaFld(["pool_type"]) == None)
+        self.app._LoadStructure(forceReload=True)
+        self.assertFalse(self.app._fieldIndex is index)
+        self.assertTrue(self.app._fieldIndex.types["object"])
+
+    def test_classcache(self):
+        cache = self.app._classCache
+        self.assertTrue(cache)
+        conf = self.app.configurationQuery.GetObjectConf("object")
+        entry = cache.Get(conf)
+        self.assertTrue(entry.cls is self.app.factory.GetObjectClass(conf))
+        self.assertTrue(entry.cls.__dict__["_c_inits"] is entry.inits)
+        self.assertEqual(dict(entry.listeners), {})
+        self.assertTrue(cache.Get(self.app.configurationQuery.GetRootConf("root")))
+        self.assertTrue(cache.Get(conf.copy()) is None)
+        self.assertTrue(self.app.factory.GetObjectClass(conf.copy()))
+        self.app._LoadStructure(forceReload=True)
+        self.assertFalse(self.app._classCache is cache)
+
     def test_structure(self):
         self.app._LoadStructure(forceReload=False)
         self.assertTrue(self.app._structure)
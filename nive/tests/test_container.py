@@ -1,9 +1,12 @@
+import os
 
 
 from nive.tests import __local
 from nive.tests import db_app 
 
 from nive.security import User
+from nive.definitions import ConfigurationError, ContainmentError
+from nive.objects import ObjectWrite
 
 
 class TestSecurityContext(object):
@@ -189,6 +192,149 @@ class containerTest_db:
         o3.Commit(user)
         self.assertTrue(o2.obj(o3.id))
 
+    def test_createmany(self):
+        a=self.app
+        r=db_app.root(a)
+        user = User("test")
+        ccc = a.db.GetCountEntries()
+        datalist = []
+        for i in range(5):
+            data = db_app.data1_1.copy()
+            data["title"] = "many %d" % i
+            datalist.append(data)
+        added = []
+        r.ListenEvent("afterAddMany", lambda context, **kw: added.extend(kw["objs"]))
+        objs = []
+        try:
+            objs = r.CreateMany("type1", datalist, user, chunkSize=2, batchEvents=True)
+            self.assertEqual(len(objs), 5)
+            self.assertEqual(len(added), 5)
+            self.assertEqual(a.db.GetCountEntries(), ccc+5)
+            for i, o in enumerate(objs):
+                o2 = r.obj(o.id)
+                self.assertEqual(o2.meta.title, "many %d" % i)
+                self.assertEqual(o2.meta.pool_type, "type1")
+                self.assertEqual(o2.meta.pool_createdby, "test")
+                self.assertEqual(o2.data.ftext, db_app.data1_1["ftext"])
+            self.assertRaises(ConfigurationError, r.CreateMany, "nonexisting", datalist, user)
+        finally:
+            r.RemoveListener("afterAddMany")
+            for o in objs:
+                r.Delete(o.id, user=user)
+        self.assertEqual(a.db.GetCountEntries(), ccc)
+
+
+    def test_deletetree(self):
+        a=self.app
+        r=db_app.root(a)
+        user = User("test")
+        ccc = a.db.GetCountEntries()
+        o1 = db_app.createObj1(r)
+        o2 = db_app.createObj2file(o1)
+        o3 = db_app.createObj1(o1)
+        o4 = db_app.createObj2(o3)
+        path = o2.GetFile("file2").abspath()
+        self.assertTrue(os.path.exists(path))
+        deleted = []
+        r.ListenEvent("afterDeleteMany", lambda context, **kw: deleted.extend(kw["ids"]))
+        try:
+            self.assertEqual(r.DeleteTree(o1.id, user=user), 4)
+        finally:
+            r.RemoveListener("afterDeleteMany")
+        self.assertEqual(sorted(deleted), sorted([o1.id, o2.id, o3.id, o4.id]))
+        self.assertEqual(a.db.GetCountEntries(), ccc)
+        self.assertEqual(a.db.SearchFiles({"id": o2.id}), [])
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(r.DeleteTree(o1.id, user=user), 0)
+
+        # files are returned if the transaction is not committed
+        o1 = db_app.createObj1(r)
+        o2 = db_app.createObj2file(o1)
+        path = o2.GetFile("file2").abspath()
+        conf = a.configuration
+        locked = conf.locked
+        conf.unlock()
+        conf.autocommit = False
+        try:
+            files = []
+            count = r.DeleteTree(o1.id, user=user, files=files)
+            self.assertEqual(count, 2)
+            self.assertTrue(files)
+            self.assertTrue(os.path.exists(path))
+            a.db.Commit()
+            a.db.ReleaseFiles(files)
+            self.assertFalse(os.path.exists(path))
+        finally:
+            conf.autocommit = True
+            if locked:
+                conf.lock()
+
+
+    def test_duplicatetree(self):
+        a=self.app
+        r=db_app.root(a)
+        user = User("test")
+        ccc = a.db.GetCountEntries()
+        o1 = db_app.createObj1(r)
+        o2 = db_app.createObj2file(o1)
+        o3 = db_app.createObj1(o1)
+        o4 = db_app.createObj2(o3)
+        copied = {}
+        r.ListenEvent("duplicateMany", lambda context, **kw: copied.update(kw["ids"]))
+        n1 = None
+        try:
+            n1 = r.DuplicateTree(o1, user=user, updateValues={"pool_filename": "copy"})
+            self.assertEqual(sorted(copied.keys()), sorted([o1.id, o2.id, o3.id, o4.id]))
+            self.assertEqual(a.db.GetCountEntries(), ccc+8)
+            self.assertEqual(n1.meta.pool_filename, "copy")
+            self.assertEqual(n1.data.ftext, o1.data.ftext)
+            n3 = n1.obj(copied[o3.id])
+            self.assertEqual(n3.data.ftext, o3.data.ftext)
+            self.assertEqual([o.id for o in n3.GetObjs()], [copied[o4.id]])
+            n2 = n1.obj(copied[o2.id])
+            self.assertEqual(n2.GetFile("file2").read(), o2.GetFile("file2").read())
+            self.assertNotEqual(n2.GetFile("file2").abspath(), o2.GetFile("file2").abspath())
+            self.assertRaises(ContainmentError, o3.DuplicateTree, o1, user)
+        finally:
+            r.RemoveListener("duplicateMany")
+            r.DeleteTree(o1.id, user=user)
+            if n1 is not None:
+                r.DeleteTree(n1.id, user=user)
+        self.assertEqual(a.db.GetCountEntries(), ccc)
+
+
+    def test_duplicatetree_init(self):
+        a=self.app
+        r=db_app.root(a)
+        user = User("test")
+        o1 = db_app.createObj1(r)
+        o2 = db_app.createObj2(o1)
+        o3 = db_app.createObj1(o1)
+        o4 = db_app.createObj2(o3)
+        created = []
+        createSelf = ObjectWrite.CreateSelf
+        def patched(obj, data, user, **kw):
+            created.append(obj.id)
+            return createSelf(obj, data, user, **kw)
+        ObjectWrite.CreateSelf = patched
+        n1 = n2 = None
+        try:
+            # contained copies are initialized if events are enabled
+            n1 = r.DuplicateTree(o1, user=user)
+            ids = [n1.id] + a.db.GetContainedIDs(base=n1.id)
+            self.assertEqual(len(ids), 4)
+            self.assertEqual(sorted(created), sorted(ids))
+            del created[:]
+            n2 = r.DuplicateTree(o1, user=user, events=False)
+            self.assertEqual(created, [n2.id])
+        finally:
+            ObjectWrite.CreateSelf = createSelf
+            r.DeleteTree(o1.id, user=user)
+            if n1 is not None:
+                r.DeleteTree(n1.id, user=user)
+            if n2 is not None:
+                r.DeleteTree(n2.id, user=user)
+
 
     def test_lists(self):
         #print "Testing objects and subobjects"
@@ -247,6 +393,10 @@ class containerTest_db:
         self.assertTrue(o3.GetObj(o4.GetID()))
         id = o5.GetID()
         self.assertTrue(r.LookupObj(id))
+        o = r.LookupObj(id)
+        self.assertEqual(o.parent.id, o3.id)
+        self.assertEqual(o.parent.parent.id, o1.id)
+        self.assertFalse(r.LookupObj(999999999))
 
         # subitems
         #root
@@ -362,6 +512,8 @@ class containerTest_db:
         self.assertFalse(o3.GetObj(o4.GetID()))
         id = o5.GetID()
         self.assertFalse(r.obj(id))
+        self.assertFalse(r.LookupObj(id))
+        self.assertTrue(r.LookupObj(id, queryRestraints=False))
 
         # subitems
         #root
@@ -396,6 +548,42 @@ class containerTest_db:
         
 
 
+    def test_restraintsParents(self):
+        a=self.app
+        r=db_app.root(a)
+        user = User("test")
+        o1 = db_app.createObj1(r)
+        self.remove.append(o1.id)
+        o3 = db_app.createObj1(o1)
+        o4 = db_app.createObj2(o3)
+        excluded = []
+        default = r.ObjQueryRestraints
+        def restraints(containerObj=None, parameter=None, operators=None):
+            # restrain a single id in one container
+            p, o = default(containerObj, parameter, operators)
+            if excluded and containerObj.id == excluded[0]:
+                p["id"] = excluded[1]
+                o["id"] = "!="
+            return p, o
+        r.ObjQueryRestraints = restraints
+        try:
+            # the restraints of each parent container are applied
+            excluded[:] = [o3.id, o4.id]
+            self.assertTrue(r.LookupObj(o3.id))
+            self.assertFalse(r.LookupObj(o4.id))
+            self.assertTrue(r.LookupObj(o4.id, queryRestraints=False))
+            # root restraints do not apply to sublevels
+            excluded[:] = [r.id, o4.id]
+            obj = r.LookupObj(o4.id)
+            self.assertEqual(obj.id, o4.id)
+            self.assertEqual(obj.data.ftext, db_app.data2_1["ftext"])
+            excluded[:] = [r.id, o1.id]
+            self.assertFalse(r.LookupObj(o4.id))
+        finally:
+            del r.ObjQueryRestraints
+        r.DeleteInternal(o1.GetID(), user=user)
+
+
     def test_shortcuts(self):
         #print "Testing shortcuts"
         a=self.app
@@ -489,6 +677,7 @@ class groupsrootTest_db:
     def tearDown(self):
         db_app.emptypool(self.app)
         self.app.Close()
+        testing.tearDown()
 
     def test_permissions(self):
         #print "Testing shortcuts"
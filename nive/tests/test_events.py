@@ -114,3 +114,69 @@ class EventTest(unittest.TestCase):
 
         self.obj.RemoveListener("callme1")
         self.obj.RemoveListener("callme2")
+
+
+    def test_eventfromtable(self):
+
+        def event_fnc_test1(context=None, data=None):
+            return data
+
+        self.obj.SetupEventsFromConfiguration({"callme1": (event_fnc_test1, event_fnc_test1)})
+        result = self.obj.Signal("callme1", data=1)
+        self.assertTrue(len(result)==2, result)
+        self.obj.RemoveListener("callme1")
+
+
+    def test_initchain(self):
+
+        class base(Events):
+            def Init(self):
+                self.ListenEvent("base", "event_testLocal")
+
+        class ext(object):
+            def Init(self):
+                self.ListenEvent("ext", "event_testLocal")
+
+        cls = type("_factory_base", (ext, base), {})
+        inits = InitChain(cls)
+        self.assertEqual(inits, (ext.__dict__["Init"], base.__dict__["Init"]))
+        self.assertTrue(InitChain(cls) is inits)
+        self.assertEqual(InitChain(base), (base.__dict__["Init"],))
+        obj = cls()
+        obj.InitEvents()
+        self.assertEqual(sorted(obj._eventdispatch.keys()), ["base", "ext"])
+
+
+    def test_handlers(self):
+        handlers = Handlers(testobj, "event_testLocal")
+        self.assertEqual(len(handlers), 1)
+        self.assertTrue(handlers[0][0] is testobj.__dict__["event_testLocal"])
+        self.assertTrue(Handlers(testobj, "event_testLocal") is handlers)
+        self.assertEqual(Handlers(testobj, "nohandler"), ())
+
+        def event_fnc_test1(context=None, data=None):
+            pass
+        self.assertTrue(PassContext(event_fnc_test1))
+        self.assertFalse(PassContext(self.event_test))
+
+
+    def test_stats(self):
+        stats = EnableSignalStats()
+        try:
+            self.assertTrue(GetSignalStats() is stats)
+            self.obj.ListenEvent("test", "event_testLocal")
+            self.obj.ListenEvent("test", self.event_test)
+            self.obj.Signal("test", data=1)
+            self.obj.Signal("test", data=2)
+            self.obj.Signal("nolistener")
+            s = stats.GetStats()
+            self.assertEqual(s["test"]["calls"], 2)
+            self.assertEqual(s["nolistener"]["calls"], 1)
+            self.assertEqual(len(s["test"]["handlers"]), 2)
+            self.assertEqual(s["test"]["handlers"][0][1], 2)
+            stats.Clear()
+            self.assertEqual(stats.GetStats(), {})
+        finally:
+            self.assertTrue(DisableSignalStats() is stats)
+        self.assertTrue(GetSignalStats() is None)
+        self.obj.RemoveListener("test")
@@ -343,6 +343,46 @@ class groupsTest_db:
         r.Delete(id, user=user)
 
 
+    def test_parentgroups(self):
+        from pyramid import testing
+        from nive.extensions.localgroups import LoadLocalGroups
+        a=self.app
+        r=db_app.root(a)
+        user = db_app.User("test")
+        o = db_app.createObj1(r)
+        o2 = db_app.createObj1(o)
+        o3 = db_app.createObj1(o)
+        userid = "test2"
+        try:
+            o.AddLocalGroup(userid, "group:parent")
+            o2.AddLocalGroup(userid, "group:local")
+            self.assertEqual(o2.GetLocalGroups(userid), ["group:local", "group:parent"])
+            self.assertEqual(o3.GetLocalGroups(userid), ["group:parent"])
+
+            # batch load listed objects
+            o4 = r.GetObj(o.id)
+            objs = o4.GetObjs()
+            LoadLocalGroups(objs, userid)
+            self.assertEqual(o4._localRoles[userid], ("group:parent",))
+            for c in objs:
+                self.assertTrue(userid in c._localRoles)
+
+            # request cache
+            request = testing.DummyRequest()
+            testing.setUp(request=request)
+            try:
+                self.assertEqual(r.GetObj(o.id).GetObj(o2.id).GetLocalGroups(userid), ["group:local", "group:parent"])
+                self.assertEqual(request.__nive_localgroups__[a.id][(o.id, userid)], ("group:parent",))
+                o5 = r.GetObj(o.id)
+                o5.RemoveLocalGroups(userid, "group:parent")
+                self.assertFalse((o.id, userid) in request.__nive_localgroups__[a.id])
+                self.assertEqual(r.GetObj(o.id).GetObj(o2.id).GetLocalGroups(userid), ["group:local"])
+            finally:
+                testing.tearDown()
+        finally:
+            r.Delete(o.id, user=user)
+
+
 class groupsTest_db_sqlite(groupsTest_db, __local.SqliteTestCase):
     """
     see tests.__local
@@ -1,5 +1,6 @@
 
 import unittest
+from datetime import datetime
 
 from nive.tests import db_app
 from nive.tests import __local
@@ -65,6 +66,23 @@ class SearchTest_db:
         pool_type="type1"
         r.FilenameToID("number1")
         r.IDToFilename(self.lastid)
+        self.assertEqual(r.FilenamesStartingWith([]), [])
+        self.assertEqual(r.FilenamesStartingWith(["number"], unitrefs=[]), [])
+        for rec in r.FilenamesStartingWith(["number"], unitrefs=[0]):
+            self.assertTrue(rec[2].startswith("number"))
+        # long lists are queried in chunks
+        name = r.IDToFilename(self.lastid)
+        recs = r.FilenamesStartingWith([name])
+        self.assertTrue(recs)
+        db = r.db
+        size = db._MaxBatchSize
+        db._MaxBatchSize = 2
+        try:
+            self.assertEqual(sorted(r.FilenamesStartingWith([name[:-1], "x", name, "y"])), sorted(r.FilenamesStartingWith([name[:-1]])))
+            refs = list(set([rec[1] for rec in recs]))+[-1, -2]
+            self.assertEqual(sorted(r.FilenamesStartingWith([name, "x", "y"], unitrefs=refs)), sorted(recs))
+        finally:
+            db._MaxBatchSize = size
         dataref = r.Select(parameter={"pool_type": pool_type}, fields=["id","pool_dataref"], max=1)[0]
         self.assertTrue(r.ConvertDatarefToID(pool_type, dataref[1])==dataref[0])
         self.assertTrue(r.GetMaxID())
@@ -95,7 +113,106 @@ class SearchTest_db:
         self.assertTrue(r.SearchFulltext("text", fields = fields1, sort = "pool_filename", ascending = 1, start = 0, max = 300)) #["count"]
         self.assertTrue(r.SearchFulltextType(pool_type, "text", fields = fields2, sort = "pool_filename", ascending = 1, start = 0, max = 300))   #["count"]
         r.SearchFilename("file1.txt", parameter, fields = [], sort = "pool_filename", ascending = 1, start = 0, max = 100, operators=operators)
-        
+
+    def test_iter(self):
+        r = Search(self.app.root)
+        parameter = {"pool_state":1}
+        operators = {"pool_state":"<="}
+        fields1 = ["id","pool_filename","pool_state","pool_unitref"]
+        fields2 = ["id","pool_filename","pool_state","pool_unitref","ftext"]
+
+        recs = r.Select(parameter=parameter, fields=fields1, sort="id", operators=operators)
+        self.assertEqual(list(r.SelectIter(parameter=parameter, fields=fields1, sort="id", operators=operators, batchSize=3)), list(recs))
+        recs = r.Select(pool_type="type1", fields=fields2, sort="id")
+        self.assertEqual(list(r.SelectIter(pool_type="type1", fields=fields2, sort="id", batchSize=2)), list(recs))
+
+        result = r.Search(parameter, fields=fields1, sort="id", operators=operators, max=100000)
+        items = list(r.SearchIter(parameter, fields=fields1, sort="id", operators=operators, batchSize=4))
+        self.assertEqual(items, result["items"])
+        result = r.SearchType("type1", {}, fields=fields2, sort="id", max=100000)
+        items = list(r.SearchIter({}, fields=fields2, pool_type="type1", sort="id"))
+        self.assertEqual(items, result["items"])
+        items = list(r.SearchIter({}, fields=fields2, pool_type="type1", sort="id", start=1, max=2))
+        self.assertEqual(items, result["items"][1:3])
+
+        # close generator before all records are read
+        it = r.SelectIter(fields=fields1, batchSize=1)
+        self.assertTrue(next(it))
+        it.close()
+
+    def test_rowtype(self):
+        r = Search(self.app.root)
+        fields = ["id","pool_filename","pool_state","pool_create"]
+        parameter = {"pool_unitref": self.ids[0]}
+        result = r.Search(dict(parameter), fields=fields, sort="id", max=100)
+        records = r.Search(dict(parameter), fields=fields, sort="id", max=100, rowType="record")
+        self.assertEqual(result["count"], records["count"])
+        self.assertTrue(result["count"])
+        for item, rec in zip(result["items"], records["items"]):
+            self.assertEqual(item, rec.asdict())
+            self.assertEqual(item["pool_filename"], rec["pool_filename"])
+            self.assertEqual(item["id"], rec[0])
+            self.assertEqual(rec.get("nofield", 1), 1)
+            self.assertEqual(rec.keys(), tuple(fields))
+        self.assertTrue(type(records["items"][0]) is type(records["items"][-1]))
+        items = list(r.SearchIter(dict(parameter), fields=fields, sort="id", rowType="record"))
+        self.assertEqual([i.asdict() for i in items], result["items"])
+        result = r.Search(dict(parameter), fields=fields, sort="id", max=100, skipRender=True)
+        records = r.Search(dict(parameter), fields=fields, sort="id", max=100, skipRender=True, rowType="record")
+        self.assertEqual(result["items"], [i.asdict() for i in records["items"]])
+
+    def test_keyset(self):
+        r = Search(self.app.root)
+        fields = ["id","pool_filename","pool_state"]
+        parameter = {"pool_unitref": self.ids[0]}
+        all = r.Search(dict(parameter), fields=fields, sort="pool_filename", max=1000)["items"]
+        self.assertEqual(len(all), 5)
+        # sort values with ties and NULL values
+        db = self.app.db
+        date1, date2 = datetime(2020, 1, 1), datetime(2021, 1, 1)
+        values = [None, date2, date2, None, date1]
+        for i, value in zip(sorted([i["id"] for i in all]), values):
+            db.UpdateFields(db.MetaTable, i, {"pool_change": value})
+        db.Commit()
+        for sort in ("pool_filename", "pool_change", "id"):
+            recs = r.Select(parameter=dict(parameter), fields=["id", sort])
+            for ascending in (1, 0):
+                # NULL values are sorted as largest values, ties by id
+                expected = sorted(recs, key=lambda rec: (rec[1] is None, rec[1] or "", rec[0]), reverse=not ascending)
+                expected = [rec[0] for rec in expected]
+                for size in (1, 2):
+                    pages = []
+                    after = ""
+                    while True:
+                        result = r.Search(dict(parameter), fields=fields, sort=sort, ascending=ascending, max=size, after=after, totals="cached")
+                        pages.extend([i["id"] for i in result["items"]])
+                        self.assertEqual(result["total"], 5)
+                        after = result["after"]
+                        if not after:
+                            break
+                    self.assertEqual(pages, expected)
+
+        result = r.SearchType("type1", dict(parameter), fields=["id", "ftext"], sort="ftext", max=2, after="", totals="none")
+        self.assertEqual(len(result["items"]), 2)
+        result2 = r.SearchType("type1", dict(parameter), fields=["id", "ftext"], sort="ftext", max=2, after=result["after"])
+        self.assertEqual(len(result2["items"]), 2)
+        self.assertFalse(set([i["id"] for i in result["items"]]) & set([i["id"] for i in result2["items"]]))
+        self.assertTrue(r.Search({}, fields=fields, max=2, totals="estimate")["total"] >= 2)
+
+        recs, after = r.SelectPage(parameter=dict(parameter), fields=["id", "pool_filename"], sort="pool_filename", max=3)
+        self.assertEqual(len(recs), 3)
+        self.assertEqual(len(recs[0]), 2)
+        recs2, after = r.SelectPage(parameter=dict(parameter), fields=["id", "pool_filename"], sort="pool_filename", max=3, after=after)
+        self.assertEqual(len(recs2), 2)
+        self.assertEqual(after, "")
+        self.assertFalse(set([rec[0] for rec in recs]) & set([rec[0] for rec in recs2]))
+        recs, after = r.SelectPage(pool_type="type1", parameter=dict(parameter), fields=["id"], sort="ftext", max=2)
+        self.assertEqual(len(recs), 2)
+        self.assertTrue(after)
+
+        self.assertRaises(ValueError, r.Search, {}, fields=fields, sort="pool_filename, id", after="")
+        self.assertRaises(ValueError, r.Search, {}, fields=fields, after="invalid")
+
 class SearchTest_db_sqlite(SearchTest_db, __local.SqliteTestCase):
     """
     see tests.__local
@@ -1,11 +1,12 @@
 
 import time
 import unittest
+from wsgiref.util import FileWrapper
 
 from nive.definitions import Conf
 from nive.security import User, Unauthorized, DummySecurityPolicy
 from nive.tests import db_app
-from nive.views import BaseView, PreflightRequest, OriginResponse, ExceptionalResponse, HTTPFound
+from nive.views import BaseView, PreflightRequest, OriginResponse, ExceptionalResponse, HTTPFound, FieldRenderer
 from nive.helper import DecorateViewClassWithViewModuleConf
 from nive.tests import __local
 
@@ -336,6 +337,56 @@ class viewTest_db:
         file = self.context2.GetFile("file1")
         view.SendFile(file)
 
+    def test_sendfile(self):
+        view = BaseView(self.context2, self.request)
+        file = self.context2.GetFile("file1")
+        data = file.read()
+        r = view.SendFile(file)
+        self.assertEqual(r.content_length, len(data))
+        self.assertEqual(b"".join(r.app_iter), data)
+        # strong etag stable for the same file
+        self.assertFalse(r.etag.startswith("W/"))
+        self.assertEqual(r.etag, view.SendFile(self.context2.GetFile("file1")).etag)
+        self.assertNotEqual(r.etag, view.SendFile(self.context2.GetFile("file2")).etag)
+
+        # byte range
+        r = view.SendFile(self.context2.GetFile("file1"))
+        resp = Request.blank("/", headers={"Range": "bytes=2-5"}).get_response(r)
+        self.assertEqual(resp.status_int, 206)
+        self.assertEqual(resp.body, data[2:6])
+
+        # not modified
+        r = view.SendFile(self.context2.GetFile("file1"))
+        resp = Request.blank("/", headers={"If-None-Match": '"%s"' % r.etag}).get_response(r)
+        self.assertEqual(resp.status_int, 304)
+
+        # server file wrapper
+        self.request.environ["wsgi.file_wrapper"] = FileWrapper
+        r = view.SendFile(self.context2.GetFile("file1"))
+        self.assertIsInstance(r.app_iter, FileWrapper)
+        self.assertEqual(b"".join(r.app_iter), data)
+        r.app_iter.close()
+
+    def test_sendfile_offload(self):
+        view = BaseView(self.context2, self.request)
+        file = self.context2.GetFile("file1")
+        conf = self.app.configuration
+        conf.unlock()
+        try:
+            conf.fileOffload = "X-Sendfile"
+            r = view.SendFile(file)
+            self.assertEqual(r.headers["X-Sendfile"], file.abspath())
+            self.assertEqual(r.body, b"")
+            conf.fileOffload = "X-Accel-Redirect"
+            conf.fileOffloadRoot = "/_files/"
+            r = view.SendFile(file)
+            self.assertEqual(r.headers["X-Accel-Redirect"], "/_files/" + file.path)
+            self.assertTrue(r.etag)
+        finally:
+            conf.fileOffload = None
+            conf.fileOffloadRoot = None
+            conf.lock()
+
     
     def test_render(self):
         view = BaseView(self.context2, self.request)
@@ -408,6 +459,19 @@ class viewTest_db:
         self.assertTrue(view2.FmtSeconds(2584))
         self.assertTrue(view2.FmtBytes(135786))
 
+    def test_compiledrenderer(self):
+        renderer = FieldRenderer(self.context, skip=("pool_type",))
+        for fld in ("ftext", "fnumber", "fdate", "flist", "fbool", "pool_type"):
+            conf = self.context.GetFieldConf(fld)
+            if conf is None:
+                continue
+            value = self.context.data.get(fld, self.context.meta.get(fld))
+            fnc = renderer.Compile(conf, context=self.context)
+            self.assertEqual(fnc(value), renderer.Render(conf, value, context=self.context))
+            self.assertEqual(fnc(None), renderer.Render(conf, None, context=self.context))
+        self.assertFalse(renderer.IsRendered(self.context.GetFieldConf("pool_type")))
+        self.assertFalse(renderer.IsRendered(self.context.GetFieldConf("ftext")))
+
 
     def test_assets(self):
         view2 = BaseView(self.context, self.request)
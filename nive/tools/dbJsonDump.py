@@ -68,29 +68,35 @@ class dbJsonDump(Tool):
         for t in list(Structure.items()):
             export.append((t[0], mapfields(t[1]["fields"])))
 
-        data = {}
+        # records are written one by one to keep large tables out of memory
+        encoder = JsonDataEncoder()
+        self.stream.write("{")
+        first = True
+        done = set()
         for table in export:
             #tablename
             tablename=table[0]
             if system and tablename in system:
                 continue 
+            if tablename in done:
+                continue
+            done.add(tablename)
             #fields
             fields=table[1]
             columns = (",").join(fields)
             sql="select %s from %s" % (columns, tablename)
-            c = conn.cursor()
-            c.execute(sql)
-            tvalues = []
-            for rec in c.fetchall():
-                recvalue = {}
-                pos = 0
-                for col in rec:
-                    recvalue[fields[pos]] = col
-                    pos+=1
-                tvalues.append(recvalue)
-            data[tablename] = tvalues
-        
-        self.stream.write(JsonDataEncoder().encode(data))        
+            if not first:
+                self.stream.write(", ")
+            first = False
+            self.stream.write(encoder.encode(tablename)+": [")
+            pos = 0
+            for rec in datapool.QueryIter(sql):
+                if pos:
+                    self.stream.write(", ")
+                self.stream.write(encoder.encode(dict(list(zip(fields, rec)))))
+                pos += 1
+            self.stream.write("]")
+        self.stream.write("}")
         
         return self.stream, 1
 
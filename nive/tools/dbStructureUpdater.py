@@ -3,7 +3,7 @@
 #
 
 from nive.tool import Tool, ToolView
-from nive.definitions import ToolConf, ViewConf, FieldConf, IApplication, Structure, MetaTbl
+from nive.definitions import ToolConf, ViewConf, FieldConf, IApplication, Structure, MetaTbl, Indexes
 
 from nive.i18n import _
 from nive.helper import FakeLocalizer
@@ -54,7 +54,8 @@ This tool compares the physically existing database structure (tables, columns)
 The database structure is shown on the left, configuration settings on the right. <br><br>
 Existing database columns will only be altered if manually selected in the 'Modify' column. Modifying a table may destroy the data
 stored (e.g if converted from string to integer), so don't forget to create backups of the database before modifying anything.<br>
-By default this tool will only create new tables and columns and never delete any column.
+By default this tool will only create new tables, columns and configured indexes and never delete any column. Indexes not
+included in the configuration are only dropped if selected.
  </div>       """)
         self.stream.write(localizer.translate(_(text)))
 
@@ -88,6 +89,12 @@ By default this tool will only create new tables and columns and never delete an
             db.dbConn.commit()
         db.UseDatabase(conf.get("dbName"))
 
+        dropIndexes = None
+        if modify:
+            dropIndexes = request.get("dropIndex")
+            if isinstance(dropIndexes, str):
+                dropIndexes = [dropIndexes]
+
         # check types for data tables -------------------------------------------------------------
         aTypes = app.configurationQuery.GetAllObjectConfs()
         
@@ -112,6 +119,7 @@ By default this tool will only create new tables and columns and never delete an
             db.dbConn.commit()
                 
             self.printStructure(db.GetColumns(aT["dbparam"], fmt), aT["dbparam"], fmt, db, localizer)
+            self.updateIndexes(db, aT["dbparam"], TableIndexes(aT["dbparam"], fmt, aT), dropIndexes, localizer)
 
         # check meta table exists and update ---------------------------------------------------------------
         if not MetaTbl in ignoreTables:
@@ -136,6 +144,7 @@ By default this tool will only create new tables and columns and never delete an
             db.dbConn.commit()
 
             self.printStructure(db.GetColumns(tableName, meta), tableName, meta, db, localizer)
+            self.updateIndexes(db, tableName, TableIndexes(tableName, meta, app.configuration), dropIndexes, localizer)
 
 
         # check structure tables exist and update ------------------------------------------------------------
@@ -165,6 +174,7 @@ By default this tool will only create new tables and columns and never delete an
 
             if showSystem:
                 self.printStructure(db.GetColumns(tableName, fields), tableName, fields, db, localizer)
+            self.updateIndexes(db, tableName, TableIndexes(tableName, fields), dropIndexes, localizer, show=showSystem)
 
 
 
@@ -177,6 +187,48 @@ By default this tool will only create new tables and columns and never delete an
         return self.stream, result
 
     
+    def updateIndexes(self, db, table, indexes, drop, localizer, show=True):
+        result = db.UpdateIndexes(table, indexes, drop)
+        db.dbConn.commit()
+        if show or result["missing"] or result["unused"]:
+            self.printIndexes(result, table, localizer)
+        return result
+
+
+    def printIndexes(self, result, table, localizer):
+        header = """
+<table class="table"><tbody>
+<tr><td>%(Index)s</td><td>%(Columns)s</td><td>%(Status)s</td><td>%(Drop?)s</td></tr>
+"""  % {"Index": localizer.translate(_("Index")),
+        "Columns": localizer.translate(_("Columns")),
+        "Status": localizer.translate(_("Status")),
+        "Drop?": localizer.translate(_("Drop?"))
+       }
+
+        row = """
+<tr><td>%s</td><td>%s</td><td>%s</td><td>%s</td></tr>
+"""
+
+        cb = """
+<input type="checkbox" name="dropIndex" value="%s">""" 
+
+        footer = """
+</tbody></table> <br>"""
+
+        self.stream.write(header)
+        for name, cols in result["existing"].items():
+            self.stream.write(row % (name, ", ".join(cols), localizer.translate(_("OK")), ""))
+        for name in result["created"]:
+            self.stream.write(row % (name, "", localizer.translate(_("Created")), ""))
+        for name in result["dropped"]:
+            self.stream.write(row % (name, "", localizer.translate(_("Dropped")), ""))
+        for cols in result["missing"]:
+            self.stream.write(row % ("", ", ".join(cols), localizer.translate(_("Missing. Columns do not exist.")), ""))
+        for name, cols in result["unused"].items():
+            self.stream.write(row % (name, ", ".join(cols), localizer.translate(_("Not configured")), cb % name))
+        self.stream.write(footer)
+
+    
     def printStructure(self, structure, table, fmt, db, localizer):
         header = """
 <h4>%(Table)s: %(tablename)s</h4>
@@ -222,6 +274,29 @@ By default this tool will only create new tables and columns and never delete an
 
         self.stream.write(footer)
 
-        return 
-    
+        return
+
+
+def TableIndexes(table, fields, conf=None):
+    """
+    Collects the configured indexes of the table: Default indexes (`definitions.Indexes`),
+    fields with `index=True` and `conf.indexes` of the object or application configuration.
     
+    returns a list of column tuples
+    """
+    indexes = []
+    def add(cols):
+        if isinstance(cols, str):
+            cols = (cols,)
+        cols = tuple(cols)
+        if cols and not cols in indexes:
+            indexes.append(cols)
+    for cols in Indexes.get(table, ()):
+        add(cols)
+    for fld in fields:
+        if fld.get("index"):
+            add(fld["id"])
+    if conf is not None:
+        for cols in conf.get("indexes") or ():
+            add(cols)
+    return indexes
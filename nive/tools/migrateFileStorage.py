@@ -0,0 +1,85 @@
+# Copyright 2012, 2013 Arndt Droullier, Nive GmbH. All rights reserved.
+# Released under GPL3. See license.txt
+#
+
+from pyramid.i18n import get_localizer
+from pyramid.threadlocal import get_current_request
+
+from nive.tool import Tool, ToolView
+from nive.helper import FakeLocalizer
+from nive.definitions import ToolConf, FieldConf, ViewConf, IApplication
+from nive.utils.path import DvPath
+from nive.utils.dataPool2.files import BlobStorage
+from nive.i18n import _
+
+
+configuration = ToolConf(
+    id = "migrateFileStorage",
+    context = "nive.tools.migrateFileStorage.migrateFileStorage",
+    name = _("Migrate files to blob storage"),
+    description = _("Converts existing files to content addressed blob files. Files with the same contents are stored once. Set 'fileStorage=\"blob\"' in the database configuration after the migration. Run 'dbStructureUpdater' before to create the index for pool_files.path."),
+    apply = (IApplication,),
+    mimetype = "text/html",
+    data = [
+        FieldConf(id="tag", datatype="string", default="migrateFileStorage", hidden=1),
+        FieldConf(id="collectGarbage", datatype="bool", default=0, name=_("Remove unused blob files"),
+                  description=_("Removes blob files not referenced by any file record and unchanged for more than a day.")),
+    ],
+    views = [
+        ViewConf(name="", view=ToolView, attr="form", permission="system", context="nive.tools.migrateFileStorage.migrateFileStorage")
+    ]
+)
+
+
+class migrateFileStorage(Tool):
+    """
+    Moves all files not stored in the blob directory to the content addressed blob storage.
+    File records are updated and committed in batches before the original files are removed.
+    """
+    batchSize = 100
+
+    def _Run(self, **values):
+
+        try:
+            localizer = get_localizer(get_current_request())
+        except:
+            localizer = FakeLocalizer()
+
+        self.InitStream()
+        db = self.app.db
+        storage = db.storage
+        if not isinstance(storage, BlobStorage):
+            storage = BlobStorage(db)
+
+        converted = missing = 0
+        replaced = []
+        for fileid, path in db.Query("SELECT fileid, path FROM %s" % (db.FileTable)):
+            if not path or storage.IsBlobPath(path):
+                continue
+            original = DvPath(str(db.root))
+            original.AppendSeperator()
+            original.Append(path)
+            if not original.IsFile():
+                missing += 1
+                continue
+            db.UpdateFields(db.FileTable, fileid, {"path": storage.Import(str(original))}, idColumn="fileid")
+            replaced.append(original)
+            converted += 1
+            if len(replaced) >= self.batchSize:
+                self._Commit(db, replaced)
+                replaced = []
+        self._Commit(db, replaced)
+
+        self.stream.write(localizer.translate(_("<div class='alert alert-success'>${count} files converted.</div>", mapping={"count": converted})))
+        if missing:
+            self.stream.write(localizer.translate(_("<div class='alert alert-warning'>${count} files not found.</div>", mapping={"count": missing})))
+        if values.get("collectGarbage"):
+            count = storage.CollectGarbage()
+            self.stream.write(localizer.translate(_("<div class='alert alert-success'>${count} unused blob files removed.</div>", mapping={"count": count})))
+        return self.stream, 1
+
+    def _Commit(self, db, replaced):
+        # the original files are removed after the records are committed
+        db.Commit()
+        for path in replaced:
+            path.Delete()
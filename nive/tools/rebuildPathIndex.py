@@ -0,0 +1,51 @@
+# Copyright 2012, 2013 Arndt Droullier, Nive GmbH. All rights reserved.
+# Released under GPL3. See license.txt
+#
+
+from pyramid.i18n import get_localizer
+from pyramid.threadlocal import get_current_request
+
+from nive.tool import Tool, ToolView
+from nive.helper import FakeLocalizer
+from nive.definitions import ToolConf, FieldConf, ViewConf, IApplication
+from nive.i18n import _
+
+
+configuration = ToolConf(
+    id = "rebuildPathIndex",
+    context = "nive.tools.rebuildPathIndex.rebuildPathIndex",
+    name = _("Rebuild path index"),
+    description = _("Recalculates the stored parent path of all elements. Requires 'pool_path' in the meta layer configuration. Run 'dbStructureUpdater' before to create the column and index."),
+    apply = (IApplication,),
+    mimetype = "text/html",
+    data = [
+        FieldConf(id="tag", datatype="string", default="rebuildPathIndex", hidden=1),
+    ],
+    views = [
+        ViewConf(name="", view=ToolView, attr="form", permission="system", context="nive.tools.rebuildPathIndex.rebuildPathIndex")
+    ]
+)
+
+
+class rebuildPathIndex(Tool):
+    """
+    Recalculates the path index for all entries in the database.
+    """
+
+    def _Run(self, **values):
+
+        try:
+            localizer = get_localizer(get_current_request())
+        except:
+            localizer = FakeLocalizer()
+
+        self.InitStream()
+        db = self.app.db
+        if not db.HasPathIndex():
+            self.stream.write(localizer.translate(_("<div class='alert alert-danger'>Path index not configured. Add 'pool_path' to the meta layer configuration.</div>")))
+            return self.stream, 0
+
+        count = db.RebuildPathIndex()
+        db.Commit()
+        self.stream.write(localizer.translate(_("<div class='alert alert-success'>${count} elements updated.</div>", mapping={"count": count})))
+        return self.stream, 1
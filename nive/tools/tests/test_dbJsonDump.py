@@ -1,5 +1,6 @@
 
 import time
+import json
 import unittest
 
 from nive.tools.dbJsonDump import *
@@ -47,6 +48,8 @@ class DBSqlDataTest1_db(__local.DefaultTestCase):
         r = t()
         #print v
         self.assertTrue(r)
+        data = json.loads(r[0].getvalue())
+        self.assertTrue(len(data["pool_meta"]) >= 4)
 
 
     def test_toolrun2(self):
@@ -28,6 +28,13 @@ class DBStructureTest(unittest.TestCase):
         t = dbStructureUpdater(configuration,None)
         self.assertTrue(t)
 
+
+    def test_tableindexes(self):
+        fields = [FieldConf(id="a", datatype="string"), FieldConf(id="b", datatype="string", index=True)]
+        conf = ObjectConf(id="test", indexes=[("a","b"), "b"])
+        self.assertEqual(TableIndexes("test", fields, conf), [("b",), ("a","b")])
+        self.assertEqual(TableIndexes(MetaTbl, [])[0], ("pool_unitref",))
+
     
 class DBStructureTest2(__local.DefaultTestCase):
     """
@@ -49,6 +56,21 @@ class DBStructureTest2(__local.DefaultTestCase):
         self.assertTrue(r)
 
 
+    def test_indexes(self):
+        t = self.app.GetTool("nive.tools.dbStructureUpdater")
+        r = t()
+        self.assertTrue(r)
+        connection = self.app.NewConnection()
+        try:
+            indexes = list(connection.GetDBManager().GetIndexes(MetaTbl).values())
+            fileIndexes = list(connection.GetDBManager().GetIndexes(FileTbl).values())
+        finally:
+            connection.close()
+        for cols in Indexes[MetaTbl]:
+            self.assertIn(cols, indexes)
+        self.assertIn(("path",), fileIndexes)
+
+
     def test_toolrun2(self):
         t = self.app.GetTool("nive.tools.dbStructureUpdater")
         self.assertTrue(t)
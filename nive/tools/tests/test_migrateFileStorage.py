@@ -0,0 +1,69 @@
+import unittest
+
+from nive.definitions import *
+from nive.tools.migrateFileStorage import *
+from nive.security import User
+from nive import File
+
+from nive.tests import __local
+from nive.tests import db_app
+
+from nive.helper import FormatConfTestFailure
+
+# -----------------------------------------------------------------
+
+class MigrateFileStorageTest1(unittest.TestCase):
+
+    def test_conf1(self):
+        r=configuration.test()
+        if not r:
+            return
+        self.fail(FormatConfTestFailure(r))
+
+
+    def test_tool(self):
+        migrateFileStorage(configuration,None)
+
+
+class MigrateFileStorageTest1_db(__local.DefaultTestCase):
+
+    def setUp(self):
+        self._loadApp([configuration])
+
+    def tearDown(self):
+        self._closeApp()
+
+    def test_migrate(self):
+        db = self.app.db
+        user = User("test")
+        root = self.app.GetRoot("root")
+        storage = db.storage
+        data = db_app.data2_1.copy()
+        data["file1"] = File(**db_app.file2_1)
+        o1 = root.Create("type2", data=data, user=user)
+        data["file1"] = File(**db_app.file2_1)
+        o2 = root.Create("type2", data=data, user=user)
+        try:
+            f1 = o1.GetFile("file1")
+            f2 = o2.GetFile("file1")
+            self.assertNotEqual(f1.path, f2.path)
+            t = self.app.GetTool("migrateFileStorage", self.app)
+            r, v = t()
+            self.assertTrue(v)
+            db.storage = BlobStorage(db)
+            f1 = db.GetEntry(o1.id).GetFile("file1")
+            f2 = db.GetEntry(o2.id).GetFile("file1")
+            self.assertEqual(f1.path, f2.path)
+            self.assertTrue(db.storage.IsBlobPath(f1.path))
+            self.assertEqual(f1.read(), db_app.file2_1["file"])
+            refs = db.storage.References(f1.path)
+            self.assertTrue(refs >= 2)
+            root.Delete(o1.id, user=user)
+            self.assertTrue(f1.exists())
+            self.assertEqual(db.storage.References(f1.path), refs-1)
+            root.Delete(o2.id, user=user)
+            self.assertEqual(db.storage.References(f1.path), refs-2)
+        finally:
+            db.storage = storage
+            root.Delete(o1.id, user=user)
+            root.Delete(o2.id, user=user)
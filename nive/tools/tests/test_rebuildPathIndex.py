@@ -0,0 +1,79 @@
+import unittest
+
+from nive.definitions import *
+from nive.tools.rebuildPathIndex import *
+from nive.security import User
+
+from nive.tests import __local
+from nive.tests import db_app
+
+from nive.helper import FormatConfTestFailure
+
+# -----------------------------------------------------------------
+
+class PathIndexTest1(unittest.TestCase):
+
+    def test_conf1(self):
+        r=configuration.test()
+        if not r:
+            return
+        self.fail(FormatConfTestFailure(r))
+
+
+    def test_tool(self):
+        rebuildPathIndex(configuration,None)
+
+
+class PathIndexTest1_db(__local.DefaultTestCase):
+
+    def setUp(self):
+        meta = db_app.appconf.meta + list(copy.deepcopy(PathIndexFlds))
+        self._loadApp([db_app.appconf.copy(meta=meta), configuration])
+
+    def tearDown(self):
+        self._closeApp()
+
+    def test_toolrun1(self):
+        t = self.app.GetTool("rebuildPathIndex", self.app)
+        self.assertTrue(t)
+        r = t()
+        self.assertTrue(r)
+
+    def test_index(self):
+        db = self.app.db
+        self.assertTrue(db.HasPathIndex())
+        user = User("test")
+        root = self.app.GetRoot("root")
+        o1 = root.Create("type1", data=db_app.data1_1, user=user)
+        o2 = o1.Create("type1", data=db_app.data1_1, user=user)
+        o3 = o2.Create("type2", data=db_app.data2_1, user=user)
+        try:
+            self.assertEqual(db.GetPathIndex(o3.id), "/%d/%d/%d/" % (o1.id, o2.id, o3.id))
+            self.assertEqual(db.GetParentPath(o3.id), [o1.id, o2.id])
+            self.assertEqual(len(db.GetParentTitles(o3.id)), 2)
+            self.assertEqual(db.GetContainedIDs(base=o1.id), [o2.id, o3.id])
+
+            # move o2 to root
+            o2.dbEntry.meta["pool_unitref"] = root.id
+            o2.dbEntry.Commit(user="test")
+            self.assertEqual(db.GetPathIndex(o3.id), "/%d/%d/" % (o2.id, o3.id))
+
+            # rebuild
+            db.Execute("UPDATE pool_meta SET pool_path='' WHERE id=%d" % o3.id).close()
+            self.assertTrue(db.RebuildPathIndex() >= 1)
+            self.assertEqual(db.GetPathIndex(o3.id), "/%d/%d/" % (o2.id, o3.id))
+        finally:
+            root.Delete(o1.id, user=user)
+            root.Delete(o2.id, user=user)
+
+    def test_indexquery(self):
+        from nive.utils.dataPool2.sqlite.sqlite3Pool import Sqlite3
+        db = self.app.db
+        if not isinstance(db, Sqlite3):
+            return
+        # subtree selects use the path index
+        condition, value = db._PathCondition("/1/")
+        plan = db.Query("EXPLAIN QUERY PLAN SELECT id FROM %s WHERE %s" % (db.MetaTable, condition), [value])
+        plan = " ".join([str(r[-1]) for r in plan])
+        self.assertIn("SEARCH", plan)
+        self.assertIn("pool_path>", plan)
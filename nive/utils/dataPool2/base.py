@@ -45,9 +45,17 @@ class Base(object):
     version:       string. the default version
     useBackups:    bool.     store backup versions of files on replace
     useTrashcan:   bool.     moves files to trashcan rather than delete physically
+    fileStorage:   string. file storage backend. "local" (default), "blob" or a dotted python name
     debug:         number. turn debugging on. 0 = off, 1=on (no traceback), 2...20=on (traceback lines) 
     log:           string. log file path for debugging
 
+    Path index
+    ----------
+    If the meta layer structure contains `pool_path` the pool maintains a materialized
+    path of parent ids for each entry (e.g. '/1/5/9/' for entry 9) on commit. Tree 
+    functions (GetParentPath, GetParentTitles, GetContainedIDs, GetTree) use the path 
+    for single indexed queries. Use `RebuildPathIndex()` to initialize existing entries.
+
     Standard Meta
     -------------
     A list consisting of meta layer fields which are used in preloading
@@ -62,11 +70,19 @@ class Base(object):
     _ProgrammingError=ProgrammingError
     _Warning=Warning
     _DefaultConnection = None
+    _PoolConnection = None
     _EmptyValues = None
+    _MaxBatchSize = 1000
+    _QueryCacheSize = 500
+    _StreamBatchSize = 1000
+    # FmtSQLSelect options included in the query cache key
+    _QueryOptions = ("singleTable", "version", "operators", "logicalOperator", "condition",
+                     "join", "groupby", "sort", "ascending", "mapJoinFld")
 
     MetaTable = "pool_meta"
     FulltextTable = "pool_fulltext"
     GroupsTable = "pool_groups"
+    PathIndexField = "pool_path"
     
 
     def __init__(self, connection = None, structure = None, root = "",
@@ -74,16 +90,18 @@ class Base(object):
                  codePage = "utf-8", dbCodePage = "utf-8",
                  connParam = None,
                  debug = 0, log = "sql.log",
-                 timezone = None, **kw):
+                 timezone = None, fileStorage = None, **kw):
 
         self.codePage = codePage
         self.dbCodePage = dbCodePage
         self.useBackups = useBackups
         self.useTrashcan = useTrashcan
         self.pytimezone = timezone
+        self.fileStorage = fileStorage
 
         self._debug = debug
         self._log = log
+        self._commitListeners = []
         self.name = root        # used for logging
         
         self._conn = None
@@ -157,6 +175,23 @@ class Base(object):
         """
         self.usedconnection.commit()
 
+    def AddCommitListener(self, callback):
+        """
+        Registers `callback(id)` called after an entry has been committed by 
+        `Entry.Commit()` or `CommitEntries()`. Used to invalidate caches.
+        """
+        if callback not in self._commitListeners:
+            self._commitListeners.append(callback)
+
+    def RemoveCommitListener(self, callback):
+        if callback in self._commitListeners:
+            self._commitListeners.remove(callback)
+
+    def _Committed(self, ids):
+        for callback in self._commitListeners:
+            for id in ids:
+                callback(id)
+
     def GetDBDate(self, date=None):
         if not date:
             date = datetime.now(tz=self.pytimezone)
@@ -204,14 +239,39 @@ class Base(object):
         sort: result sort order. sort prefix ! to skip auto table lookup
         ascending: result sort order ascending or descending
         extraValues: list. additional values for sql statement not included in parameter list. appended to returned value list
+        
+        Generated statements are cached by query shape (fields, parameter names, value types, 
+        operators and options). Cache hits only bind the parameter values. The cache is shared 
+        by all pool instances using the same structure and limited to `_QueryCacheSize` entries.
         """
+        if parameter is None:
+            parameter = {}
+        key = self._QueryShape(flds, parameter, dataTable, start, max, kw)
+        cache = getattr(self.structure, "queryCache", None) if key is not None else None
+        plan = cache.get(key) if cache is not None else None
+        if plan is None:
+            plan = self._CompileSQLSelect(flds, parameter, dataTable, start, max, kw)
+            if cache is not None and plan[2]:
+                if len(cache) >= self._QueryCacheSize:
+                    cache.clear()
+                cache[key] = plan
+        sql, binds, cacheable = plan
+        plist = self._BindValues(binds, parameter)
+        if kw.get("extraValues"):
+            plist.extend(kw.get("extraValues"))
+        return sql, plist
+
+
+    def _CompileSQLSelect(self, flds, parameter, dataTable, start, max, kw):
+        # returns sql, value binding list and cacheable flag. see FmtSQLSelect()
         operators = kw.get("operators",{})
         jointype = operators.get("jointype", "INNER")
         singleTable = kw.get("singleTable",0)
         version = kw.get("version")
         metaStructure = self.structure.get(self.MetaTable, version=version)
         mapJoinFld = kw.get("mapJoinFld")
-        plist = []   # sorted list of query parameters for execute()
+        binds = []   # sorted list of (parameter, mode) for execute() values
+        cacheable = True
         ph = self.placeholder   # placeholder to be used instead plist values
         fields = []
         for field in flds:
@@ -254,8 +314,6 @@ class Base(object):
         addCombi = False
         
         where = []
-        if parameter is None:
-            parameter={}
         for key in list(parameter.keys()):
             value = parameter[key]
             paramname = key
@@ -282,29 +340,28 @@ class Base(object):
                 if operator == "LIKE":
                     if value == "":
                         continue
-                    value = "%%%s%%" % value.replace("*", "%")
                     if addCombi:
                         where.append(" %s " % aCombi)
                     where.append("%s%s %s %s " % (table, paramname, operator, ph))
-                    plist.append(value)
+                    binds.append((key, "like"))
                 elif operator == "BETWEEN":
                     if value == "":
                         continue
                     if addCombi:
                         where.append(" %s " % aCombi)
                     where.append("%s%s %s %s " % (table, paramname, operator, ph))
-                    plist.append(value)
+                    binds.append((key, None))
                 elif operator == "IN":
                     operator = "="
                     if addCombi:
                         where.append(" %s " % aCombi)
                     where.append("%s%s %s %s " % (table, paramname, operator, ph))
-                    plist.append(value)
+                    binds.append((key, None))
                 else:
                     if addCombi:
                         where.append(" %s " % aCombi)
                     where.append("%s%s %s %s " % (table, paramname, operator, ph))
-                    plist.append(value)
+                    binds.append((key, None))
                 addCombi = True
 
             # fmt list values
@@ -317,8 +374,7 @@ class Base(object):
                     if len(value) < 2:
                         continue
                     where.append("%s%s %s %s AND %s" % (table, paramname, operator, ph, ph))
-                    plist.append(value[0])
-                    plist.append(value[1])
+                    binds.append((key, "between"))
                 elif operator.startswith("LIKE:"):
                     if value == "":
                         continue
@@ -339,9 +395,8 @@ class Base(object):
                         if not v:
                             where.append("%s%s %s %s " % (table, paramname, "=", ph))
                         else:
-                            v = "%%%s%%" % v.replace("*", "%")
                             where.append("%s%s %s %s " % (table, paramname, "LIKE", ph))
-                        plist.append(v)
+                    binds.append((key, "likelist"))
                     where.append(") ")
                 elif len(value)==1:
                     if operator == "IN":
@@ -349,15 +404,17 @@ class Base(object):
                     elif operator == "NOT IN":
                         operator = "<>"
                     where.append("%s%s %s %s " % (table, paramname, operator, ph))
-                    plist.append(value[0])
+                    binds.append((key, "first"))
                 else:
                     v = self._FmtListForQuery(value)
                     if isinstance(v, str):
                         # sqlite error: cannot use placeholder with lists
+                        # values are included in the statement
                         where.append("%s%s %s (%s) " % (table, paramname, operator, v))
+                        cacheable = False
                     else:
                         where.append("%s%s %s %s " % (table, paramname, operator, ph))
-                        plist.append(value)
+                        binds.append((key, None))
                 addCombi = True
 
             # fmt number values
@@ -367,7 +424,7 @@ class Base(object):
                 if operator == "LIKE":
                     operator = "="
                 where.append("%s%s %s %s" % (table, paramname, operator, ph))
-                plist.append(value)
+                binds.append((key, None))
                 addCombi = True
 
             # fmt datetime values
@@ -377,7 +434,7 @@ class Base(object):
                 if operator == "LIKE":
                     operator = "="
                 where.append("%s%s %s %s" % (table, paramname, operator, ph))
-                plist.append(value)
+                binds.append((key, None))
                 addCombi = True
 
             # fmt datetime values
@@ -387,7 +444,7 @@ class Base(object):
                 if operator == "LIKE":
                     operator = "="
                 where.append("DATE(%s%s) %s %s" % (table, paramname, operator, ph))
-                plist.append(value)
+                binds.append((key, None))
                 addCombi = True
 
         condition = kw.get("condition")
@@ -454,9 +511,6 @@ class Base(object):
         if sort != "":
             sort = "ORDER BY %s %s" % (sort, order)
 
-        if kw.get("extraValues"):
-            plist.extend(kw.get("extraValues"))
-
         sql = """
         SELECT %s
         FROM %s
@@ -468,7 +522,64 @@ class Base(object):
         %s
         %s
         """ % (fields, table, join, joindata, customJoin, where, groupby, sort, limit)
-        return sql, plist
+        return sql, binds, cacheable
+
+
+    def _QueryShape(self, flds, parameter, dataTable, start, max, kw):
+        # returns the cache key for FmtSQLSelect() or None if the query cannot be cached
+        shape = []
+        operators = kw.get("operators") or {}
+        for key, value in parameter.items():
+            if isinstance(value, str):
+                kind = "s" if value != "" else ""
+            elif isinstance(value, (tuple, list)):
+                if str(operators.get(key, "")).startswith("LIKE:"):
+                    kind = tuple([bool(v) for v in value])
+                else:
+                    kind = min(len(value), 2)
+            elif isinstance(value, (int, float)):
+                kind = "n"
+            elif isinstance(value, datetime):
+                kind = "dt"
+            elif isinstance(value, date):
+                kind = "d"
+            else:
+                kind = None
+            shape.append((key, kind))
+        options = []
+        for option in self._QueryOptions:
+            value = kw.get(option)
+            if isinstance(value, dict):
+                value = tuple(sorted(value.items()))
+            options.append(value)
+        key = (tuple(flds), tuple(shape), dataTable, start, max, tuple(options), self.placeholder)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def _BindValues(self, binds, parameter):
+        # returns the list of values for execute() based on the binding list
+        plist = []
+        for key, mode in binds:
+            value = parameter[key]
+            if mode is None:
+                plist.append(value)
+            elif mode == "like":
+                plist.append("%%%s%%" % value.replace("*", "%"))
+            elif mode == "first":
+                plist.append(value[0])
+            elif mode == "between":
+                plist.append(value[0])
+                plist.append(value[1])
+            elif mode == "likelist":
+                for v in value:
+                    if v:
+                        v = "%%%s%%" % v.replace("*", "%")
+                    plist.append(v)
+        return plist
+
 
 
     def _FmtListForQuery(self, values):
@@ -550,23 +661,7 @@ class Base(object):
         if self._debug:
             STACKF(0,sql+"\r\n",self._debug, self._log,name=self.name)
         sql = self.DecodeText(sql)
-        if values:
-            # check for list and strings
-            found = [isinstance(v, list) or isinstance(v, bytes) for v in values]
-            if True in found:
-                # shouldnt happen
-                v1 = []
-                for v in values:
-                    if isinstance(v, list):
-                        v1.append(tuple(v))
-                    elif isinstance(v, bytes):
-                        v1.append(self.DecodeText(v))
-                    else:
-                        v1.append(v)
-                values = v1
-        # adjust different accepted empty values sets
-        if not values:
-            values = self._EmptyValues
+        values = self._FmtQueryValues(values)
         try:
             c.execute(sql, values)
         except self._OperationalError as e:
@@ -587,6 +682,86 @@ class Base(object):
         return result
 
 
+    def QueryIter(self, sql, values = None, batchSize = None):
+        """
+        Execute a query on the database and iterate the result records. Records are fetched in
+        batches of `batchSize` records (default `_StreamBatchSize`) instead of loading the whole
+        result at once. Postgres uses a server side cursor, MySql a server side cursor on a 
+        separate connection. 
+        
+        MySql reads committed data only. Changes not yet committed on the current connection 
+        are not included in the result. Errors on the separate connection do not roll back
+        the current transaction.
+        
+        The cursor is closed if the iteration is finished or the generator is closed.
+        """
+        if self._debug:
+            STACKF(0,sql+"\r\n",self._debug, self._log,name=self.name)
+        sql = self.DecodeText(sql)
+        values = self._FmtQueryValues(values)
+        batchSize = batchSize or self._StreamBatchSize
+        c, conn = self._OpenStreamCursor()
+        try:
+            try:
+                c.execute(sql, values)
+            except self._OperationalError as e:
+                # map to nive.utils.dataPool2.base.OperationalError
+                if conn is None:
+                    self.Undo()
+                logging.getLogger(self.name).error(str(e) + "  " + sql)
+                raise OperationalError(e)
+            except self._ProgrammingError as e:
+                # map to nive.utils.dataPool2.base.OperationalError
+                if conn is None:
+                    self.Undo()
+                logging.getLogger(self.name).error(str(e) + "  " + sql)
+                raise ProgrammingError(e)
+            while True:
+                records = c.fetchmany(batchSize)
+                if not records:
+                    break
+                for r in records:
+                    yield r
+        finally:
+            c.close()
+            if conn is not None:
+                conn.close()
+
+
+    def EstimateCount(self, sql, values = None):
+        """
+        Returns the estimated number of records selected by the statement based on the query 
+        planner or None if not supported by the database.
+        """
+        return None
+
+
+    def _OpenStreamCursor(self):
+        # returns the cursor used by QueryIter and a private connection to be closed afterwards or None
+        return self.connection.cursor(), None
+
+
+    def _FmtQueryValues(self, values):
+        if values:
+            # check for list and strings
+            found = [isinstance(v, list) or isinstance(v, bytes) for v in values]
+            if True in found:
+                # shouldnt happen
+                v1 = []
+                for v in values:
+                    if isinstance(v, list):
+                        v1.append(tuple(v))
+                    elif isinstance(v, bytes):
+                        v1.append(self.DecodeText(v))
+                    else:
+                        v1.append(v)
+                values = v1
+        # adjust different accepted empty values sets
+        if not values:
+            values = self._EmptyValues
+        return values
+
+
     def SelectFields(self, table, fields, idValues, idColumn = None):
         """
         Select row with multiple fields in the table.
@@ -804,6 +979,105 @@ class Base(object):
         return entry
 
 
+    def CreateEntries(self, pool_datatbl, count, user = "", **kw):
+        """
+        Create `count` new entries at once. Ids are allocated in blocks of `_MaxBatchSize`
+        entries with one insert statement per table and block. The entries are initialized
+        like `CreateEntry()` and are not committed. Use `CommitEntries()` to store changes.
+        Requires pool_datatbl as parameter
+        
+        returns list of entries
+        """
+        if not pool_datatbl:
+            raise ConfigurationError("Missing data table - Entry not created")
+        entries = []
+        kw["preload"] = "skip"
+        for chunk in self._ChunkIDs(list(range(count))):
+            datarefs = self._InsertRows(pool_datatbl, (), len(chunk))
+            ids = self._InsertRows(self.MetaTable, ("pool_datatbl", "pool_dataref"), 
+                                   [(pool_datatbl, ref) for ref in datarefs])
+            for id, dataref in zip(ids, datarefs):
+                kw["pool_dataref"] = dataref
+                entry = self._GetPoolEntry(id, **kw)
+                entry._InitNew(pool_datatbl, user)
+                entries.append(entry)
+        return entries
+
+
+    def CommitEntries(self, entries, user = "", dbCommit = False):
+        """
+        Commit temporary changes of multiple entries. Changes are grouped by table and changed
+        fields and each group is written with a single statement. Path indexes are calculated
+        with one query for all entries. Files are committed per entry.
+        The database transaction is only committed if `dbCommit` is True.
+        """
+        groups = {}
+        paths = self._BatchPathIndex(entries)
+        try:
+            for entry in entries:
+                entry.Touch(user)
+                if entry.meta.HasTemp():
+                    meta = entry.meta.GetTemp()
+                    if entry.id in paths:
+                        meta[self.PathIndexField] = paths[entry.id]
+                    self._GroupUpdate(groups, self.MetaTable, entry.id, meta)
+                if entry.data.HasTemp():
+                    self._GroupUpdate(groups, entry.GetDataTbl(), entry.GetDataRef(), entry.data.GetTemp())
+            ph = self.placeholder
+            cursor = self.connection.cursor()
+            for (table, flds), (rows, ids) in groups.items():
+                sql = "UPDATE %s SET %s WHERE id=%s" % (table, ",".join(["%s=%s" % (f, ph) for f in flds]), ph)
+                if self._debug:
+                    STACKF(0,sql+"\r\n",self._debug, self._log,name=self.name)
+                values = self.structure.serialize_rows(table, flds, rows)
+                cursor.executemany(sql, [v+[id] for v, id in zip(values, ids)])
+            cursor.close()
+            for entry in entries:
+                if entry.files.HasTemp():
+                    entry.CommitFiles(entry.files.GetTemp())
+            if dbCommit:
+                self.Commit()
+        except self._OperationalError as e:
+            self._UndoEntries(entries)
+            raise OperationalError(e)
+        except:
+            self._UndoEntries(entries)
+            raise
+        for entry in entries:
+            entry._FinishCommit()
+        self._Committed([entry.id for entry in entries])
+        return True
+
+
+    def WriteFulltexts(self, texts):
+        """
+        Update or create fulltext for multiple entries. `texts` is a dictionary {id: text}.
+        Existing texts are deleted and all texts are inserted with one statement.
+        """
+        if not texts:
+            return
+        ph = self.placeholder
+        ids = list(texts.keys())
+        cursor = self.connection.cursor()
+        try:
+            for chunk in self._ChunkIDs(ids):
+                sql = "DELETE FROM %s WHERE id IN (%s)" % (self.FulltextTable, ",".join([ph]*len(chunk)))
+                if self._debug:
+                    STACKF(0,sql+"\r\n",self._debug, self._log,name=self.name)
+                cursor.execute(sql, chunk)
+            sql = "INSERT INTO %s (id,text) VALUES (%s,%s)" % (self.FulltextTable, ph, ph)
+            if self._debug:
+                STACKF(0,sql+"\r\n",self._debug, self._log,name=self.name)
+            cursor.executemany(sql, [(id, self.DecodeText(texts[id] or "")) for id in ids])
+        except self._OperationalError as e:
+            raise OperationalError(e)
+        except:
+            self.Undo()
+            raise
+        finally:
+            cursor.close()
+
+
     def GetEntry(self, id, **kw):
         """
         Get entry from db by ID
@@ -842,6 +1116,160 @@ class Base(object):
         return 1
 
 
+    def DeleteEntries(self, ids):
+        """
+        Deletes the entries with set based statements. Ids are processed in chunks of 
+        `_MaxBatchSize`. Meta, data, fulltext, local groups and file records are removed.
+        The physical files are not touched. Pass the returned file records to 
+        `ReleaseFiles()` after the transaction has been committed.
+        
+        returns the number of deleted entries, list of removed file records
+        """
+        ph = self.placeholder
+        count = 0
+        files = []
+        cursor = self.connection.cursor()
+        try:
+            for chunk in self._ChunkIDs(list(ids)):
+                values = ",".join([ph]*len(chunk))
+                sql = "SELECT pool_datatbl, pool_dataref FROM %s WHERE id IN (%s)" % (self.MetaTable, values)
+                if self._debug:
+                    STACKF(0,sql+"\r\n",self._debug, self._log,name=self.name)
+                cursor.execute(sql, chunk)
+                data = {}
+                for datatbl, dataref in cursor.fetchall():
+                    if datatbl:
+                        data.setdefault(datatbl, []).append(dataref)
+                for datatbl, refs in data.items():
+                    sql = "DELETE FROM %s WHERE id IN (%s)" % (datatbl, ",".join([ph]*len(refs)))
+                    cursor.execute(sql, refs)
+                files.extend(self._DeleteFileRecords(cursor, chunk))
+                for table in (self.FulltextTable, self.GroupsTable, self.MetaTable):
+                    sql = "DELETE FROM %s WHERE id IN (%s)" % (table, values)
+                    if self._debug:
+                        STACKF(0,sql+"\r\n",self._debug, self._log,name=self.name)
+                    cursor.execute(sql, chunk)
+                count += cursor.rowcount
+        except self._OperationalError as e:
+            raise OperationalError(e)
+        except:
+            self.Undo()
+            raise
+        finally:
+            cursor.close()
+        return count, files
+
+
+    def _DeleteFileRecords(self, cursor, ids):
+        # subclassed. removes the file records of the ids and returns the records
+        return []
+
+
+    def ReleaseFiles(self, files):
+        # subclassed. removes the physical files of deleted file records
+        pass
+
+
+    def DuplicateEntries(self, ids, parent, values=None):
+        """
+        Copies the entries with set based statements. `ids` lists parents before contained
+        entries like `GetContainedIDs()`. Entries referencing a parent not in `ids` are 
+        stored below `parent`, all other parent references are remapped to the copies. 
+        Meta and data records are copied with one `INSERT ... SELECT` statement per table 
+        and chunk of `_MaxBatchSize` ids. Fulltext and file records are copied, physical
+        files are copied or shared by the storage backend. Local groups are not copied.
+        `values` is a dictionary of meta values set for all copies.
+        The changes are not committed. If the transaction is rolled back later, pass the
+        returned file records to `ReleaseFiles()`.
+
+        returns dictionary {id: new id}, list of copied file records
+        """
+        ids = list(ids)
+        ph = self.placeholder
+        recs = {}
+        for chunk in self._ChunkIDs(ids):
+            for rec in self.SelectFields(self.MetaTable, ["id", "pool_unitref", "pool_datatbl", "pool_dataref"], chunk):
+                recs[rec[0]] = rec
+        ids = [id for id in ids if id in recs]
+        files = []
+        cursor = None
+        try:
+            # data records grouped by table
+            data = {}
+            for id in ids:
+                if recs[id][2]:
+                    data.setdefault(recs[id][2], []).append(recs[id][3])
+            refs = {}
+            for datatbl, dataref in data.items():
+                for chunk in self._ChunkIDs(dataref):
+                    for ref, newref in self._CopyRows(datatbl, self._CopyFields(datatbl), chunk).items():
+                        refs[(datatbl, ref)] = newref
+            idmap = {}
+            for chunk in self._ChunkIDs(ids):
+                idmap.update(self._CopyRows(self.MetaTable, self._CopyFields(self.MetaTable), chunk))
+
+            # remap parents and data references in one pass
+            values = dict(values or {})
+            for key in ("id", "pool_unitref", "pool_dataref", self.PathIndexField):
+                values.pop(key, None)
+            flds = sorted(values.keys()) + ["pool_unitref", "pool_dataref"]
+            paths = {}
+            if self.HasPathIndex():
+                flds.append(self.PathIndexField)
+                path = self.GetPathIndex(parent)
+                if not path:
+                    path = "/%s/" % "/".join([str(ref) for ref in self.GetParentPath(parent)+[parent]])
+                paths[parent] = path
+            rows = []
+            newids = []
+            for id in ids:
+                newid = idmap[id]
+                unitref = idmap.get(recs[id][1], parent)
+                row = [values[f] for f in flds[:len(values)]]
+                row += [unitref, refs.get((recs[id][2], recs[id][3]), 0)]
+                if paths:
+                    # parents are listed before contained entries
+                    paths[newid] = "%s%d/" % (paths[unitref], newid)
+                    row.append(paths[newid])
+                rows.append(row)
+                newids.append(newid)
+            rows = self.structure.serialize_rows(self.MetaTable, flds, rows)
+            sql = "UPDATE %s SET %s WHERE id=%s" % (self.MetaTable, ",".join(["%s=%s" % (f, ph) for f in flds]), ph)
+            if self._debug:
+                STACKF(0,sql+"\r\n",self._debug, self._log,name=self.name)
+            cursor = self.connection.cursor()
+            cursor.executemany(sql, [r+[id] for r, id in zip(rows, newids)])
+
+            sql = "INSERT INTO %s (id,text) SELECT %s, text FROM %s WHERE id=%s" % (self.FulltextTable, ph, self.FulltextTable, ph)
+            if self._debug:
+                STACKF(0,sql+"\r\n",self._debug, self._log,name=self.name)
+            cursor.executemany(sql, [(idmap[id], id) for id in ids])
+            for chunk in self._ChunkIDs(ids):
+                files.extend(self._DuplicateFileRecords(cursor, dict([(id, idmap[id]) for id in chunk])))
+        except self._OperationalError as e:
+            self.Undo()
+            self.ReleaseFiles(files)
+            raise OperationalError(e)
+        except:
+            self.Undo()
+            self.ReleaseFiles(files)
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+        return idmap, files
+
+
+    def _CopyFields(self, table):
+        # fields copied by _CopyRows(). ids are created by the database.
+        return [f for f in self.structure.get(table, ()) if f != "id"]
+
+
+    def _DuplicateFileRecords(self, cursor, ids):
+        # subclassed. copies the file records of the ids {id: new id} and returns the new records
+        return []
+
+
     def IsIDUsed(self, id):
         """
         Query database if id exists
@@ -858,16 +1286,17 @@ class Base(object):
 
     def GetBatch(self, ids, **kw):
         """
-        Get all entries as objects at once. returns a list.
+        Get all entries as objects at once. returns a list in the order of `ids`.
         supports preload: all, skip, meta
         
+        Large id lists are loaded in chunks of `_MaxBatchSize` ids. 
+        
         kw: 
-        - meta: list of meta pool_datatbl for faster lookup
+        - meta: list of meta records including id and pool_datatbl for faster lookup
         """
         preload = kw.get("preload", "all")
         entries = []
         version = kw.get("version")
-        sort = kw.get("sort")
         if len(ids) == 0:
             return entries
 
@@ -877,69 +1306,270 @@ class Base(object):
                 entries.append(e)
             return entries
 
-        if preload == "meta":
-            flds = self.structure.get(self.MetaTable, version=version)
-            if not flds:
-                raise ConfigurationError("Meta layer is empty.")
-            parameter = {"id": ids}
-            operators = {"id": "IN"}
-            sql, values = self.FmtSQLSelect(flds, parameter=parameter, dataTable=self.MetaTable, max=len(ids), sort=sort, operators=operators, singleTable=1)
-            recs = self.Query(sql, values)
-            for r in recs:
-                meta = self.ConvertRecToDict(r, flds)
-                e = self._GetPoolEntry(meta["id"], pool_dataref=meta["pool_dataref"], pool_datatbl=meta["pool_datatbl"], preload="skip")
-                e._UpdateCache(meta = meta, data = None)
-                entries.append(e)
-            return entries
+        fldsm = self.structure.get(self.MetaTable, version=version)
+        if not fldsm:
+            raise ConfigurationError("Meta layer is empty.")
+        fldsm = list(fldsm)
+        loaded = {}
 
-        if "meta" in kw and kw["meta"] and "pool_datatbl" in kw["meta"][0]:
+        if preload == "meta":
+            for chunk in self._ChunkIDs(ids):
+                parameter = {"id": chunk}
+                operators = {"id": "IN"}
+                sql, values = self.FmtSQLSelect(fldsm, parameter=parameter, dataTable=self.MetaTable, operators=operators, singleTable=1)
+                for meta in self.structure.deserialize_rows(self.MetaTable, fldsm, self.Query(sql, values)):
+                    e = self._GetPoolEntry(meta["id"], pool_dataref=meta["pool_dataref"], pool_datatbl=meta["pool_datatbl"], preload="skip")
+                    e._UpdateCache(meta = meta, data = None)
+                    loaded[meta["id"]] = e
+            return [loaded[id] for id in ids if id in loaded]
+
+        # group ids by data table
+        tables = {}
+        hint = kw.get("meta")
+        if hint and "pool_datatbl" in hint[0] and "id" in hint[0]:
             # use meta pool_datatbl passed in kw[meta]
-            tables = []
-            for r in kw["meta"]:
-                if not r["pool_datatbl"] in tables:
-                    tables.append(r["pool_datatbl"])
+            for r in hint:
+                tables.setdefault(r["pool_datatbl"], []).append(r["id"])
         else:
             # select data tables for ids
-            flds = ["pool_datatbl"]
-            parameter = {"id": ids}
-            operators = {"id": "IN"}
-            # select list of datatbls
-            sql, values = self.FmtSQLSelect(flds, parameter=parameter, dataTable=self.MetaTable, sort=sort, groupby="pool_datatbl", operators=operators, singleTable=1)
-            tables = []
-            for r in self.Query(sql, values):
-                if not r["pool_datatbl"] in tables:
-                    tables.append(r[0])
-        t = ""
+            for chunk in self._ChunkIDs(ids):
+                parameter = {"id": chunk}
+                operators = {"id": "IN"}
+                sql, values = self.FmtSQLSelect(["id", "pool_datatbl"], parameter=parameter, dataTable=self.MetaTable, operators=operators, singleTable=1)
+                for r in self.Query(sql, values):
+                    tables.setdefault(r[1], []).append(r[0])
+
+        lm = len(fldsm)
+        for table, tids in tables.items():
+            structure = self.structure.get(table, version=version)
+            if not structure:
+                continue
+            fldsd = list(structure)
+            flds = fldsm + fldsd
+            for chunk in self._ChunkIDs(tids):
+                parameter = {"id": chunk, "pool_datatbl": table}
+                operators = {"id": "IN", "pool_datatbl": "="}
+                # select type data
+                sql, values = self.FmtSQLSelect(flds, parameter=parameter, dataTable=table, operators=operators)
+                recs = self.Query(sql, values)
+                metas = self.structure.deserialize_rows(self.MetaTable, fldsm, [r[:lm] for r in recs])
+                datas = self.structure.deserialize_rows(table, fldsd, [r[lm:] for r in recs])
+                for meta, data in zip(metas, datas):
+                    e = self._GetPoolEntry(meta["id"], pool_dataref=meta["pool_dataref"], pool_datatbl=meta["pool_datatbl"], preload="skip")
+                    e._UpdateCache(meta = meta, data = data)
+                    loaded[meta["id"]] = e
+        # restore order of ids
+        return [loaded[id] for id in ids if id in loaded]
+
+    def SelectEntries(self, parameter, operators=None, dataTable=None, **kw):
+        """
+        Selects all entries matching `parameter` and `operators` (see FmtSQLSelect) in a 
+        single query. If `dataTable` is set meta and data records are loaded in the same
+        query. Otherwise data records are loaded with one query per data table if 
+        `loadData` is true or on first access.
+        
+        kw:
+        - version: entry version
+        - condition: custom condition statement 
+        - loadData: load data records of all matching entries
+        
+        returns a dictionary {id: entry}
+        """
+        version = kw.get("version")
+        sql, values, fldsm, fldsd = self._FmtEntrySelect(parameter, operators, dataTable, version, kw.get("condition"))
+        return self._LoadEntries(sql, values, fldsm, dataTable, fldsd, version, kw.get("loadData"))
+
+
+    def GetEntryChain(self, id, parameter=None, operators=None, **kw):
+        """
+        Loads the entry and all its parents in a single query. Entry and parents are 
+        restrained by `parameter` and `operators` (see FmtSQLSelect). Meta records are 
+        preloaded. Data records are loaded with one query per data table if `loadData` 
+        is true or on first access.
+        
+        returns a dictionary {id: entry} of all matching entries
+        """
+        if id <= 0:
+            return {}
+        version = kw.get("version")
+        condition = "meta__.id IN (SELECT cid FROM chain__)"
+        sql, values, fldsm, fldsd = self._FmtEntrySelect(parameter, operators, None, version, condition)
+        sql = """
+        WITH RECURSIVE chain__ (cid) AS (
+            SELECT id FROM %(meta)s WHERE id = %(id)d
+            UNION
+            SELECT %(meta)s.pool_unitref FROM %(meta)s JOIN chain__ ON %(meta)s.id = chain__.cid
+        )""" % {"meta": self.MetaTable, "id": id} + sql
+        return self._LoadEntries(sql, values, fldsm, None, fldsd, version, kw.get("loadData"))
+
+
+    def GetPathIDs(self, base, names):
+        """
+        Resolves a path below `base` in a single query. `names` is a list of url path
+        filenames (pool_filename) or ids (numbers), one for each level. If multiple
+        entries match the first one is used.
+
+        returns the list of ids for each level or an empty list if not found
+        """
+        if not names:
+            return []
+        ph = self.placeholder
+        flds, join, where, values = [], [], ["p0.pool_unitref=%s" % ph], [base]
+        for i, name in enumerate(names):
+            alias = "p%d" % i
+            flds.append(alias+".id")
+            if i:
+                join.append("JOIN %s %s ON %s.pool_unitref=p%d.id" % (self.MetaTable, alias, alias, i-1))
+            if isinstance(name, int):
+                where.append("%s.id=%s" % (alias, ph))
+            else:
+                where.append("%s.pool_filename=%s" % (alias, ph))
+            values.append(name)
+        sql = "SELECT %s FROM %s p0 %s WHERE %s ORDER BY %s" % (",".join(flds), self.MetaTable, " ".join(join),
+                                                                " AND ".join(where), ",".join(flds))
+        recs = self.Query(sql, values)
+        if not recs:
+            return []
+        return list(recs[0])
+
+
+    def _FmtEntrySelect(self, parameter, operators, dataTable, version, condition):
         fldsm = self.structure.get(self.MetaTable, version=version)
         if not fldsm:
             raise ConfigurationError("Meta layer is empty.")
-        unsorted = []
-        for table in tables:
+        fldsm = list(fldsm)
+        fldsd = []
+        parameter = dict(parameter or {})
+        if dataTable:
+            fldsd = list(self.structure.get(dataTable, (), version=version))
+            parameter["pool_datatbl"] = dataTable
+        sql, values = self.FmtSQLSelect(fldsm+fldsd, parameter=parameter, dataTable=dataTable or "",
+                                        operators=operators or {}, condition=condition, version=version)
+        return sql, values, fldsm, fldsd
+
+
+    def _LoadEntries(self, sql, values, fldsm, dataTable, fldsd, version, loadData=False):
+        # creates entries for meta (and data) records
+        entries = {}
+        lm = len(fldsm)
+        recs = self.Query(sql, values)
+        metas = self.structure.deserialize_rows(self.MetaTable, fldsm, [r[:lm] for r in recs])
+        datas = [None]*len(recs)
+        if dataTable:
+            datas = self.structure.deserialize_rows(dataTable, fldsd, [r[lm:] for r in recs])
+        for meta, data in zip(metas, datas):
+            e = self._GetPoolEntry(meta["id"], pool_dataref=meta["pool_dataref"], pool_datatbl=meta["pool_datatbl"],
+                                   preload="skip", version=version)
+            e._UpdateCache(meta = meta, data = data)
+            entries[meta["id"]] = e
+        if loadData and not dataTable:
+            self._LoadData(list(entries.values()), version)
+        return entries
+
+    def _LoadData(self, entries, version):
+        # loads the data records of meta preloaded entries with one query per data table
+        tables = {}
+        for e in entries:
+            table = e.meta.get("pool_datatbl")
+            if table and e.meta.get("pool_dataref"):
+                tables.setdefault(table, {})[e.meta["pool_dataref"]] = e
+        for table, refs in tables.items():
             structure = self.structure.get(table, version=version)
             if not structure:
                 continue
             fldsd = list(structure)
-            flds = list(fldsm) + fldsd
-            parameter = {"id": ids, "pool_datatbl": table}
-            operators = {"id": "IN", "pool_datatbl": "="}
-            # select type data
-            sql, values = self.FmtSQLSelect(flds, parameter=parameter, dataTable=table, sort=sort, operators=operators)
-            typeData = self.Query(sql, values)
-            for r2 in typeData:
-                meta = self.ConvertRecToDict(r2[:len(fldsm)], fldsm)
-                data = self.ConvertRecToDict(r2[len(fldsm):], fldsd)
-                e = self._GetPoolEntry(meta["id"], pool_dataref=meta["pool_dataref"], pool_datatbl=meta["pool_datatbl"], preload="skip")
-                meta = self.structure.deserialize(self.MetaTable, None, meta)
-                data = self.structure.deserialize(table, None, data)
-                e._UpdateCache(meta = meta, data = data)
-                unsorted.append(e)
-        # sort entries
-        for id in ids:
-            for o in unsorted:
-                if o.id==id:
-                    entries.append(o)
-                    break
-        return entries
+            for chunk in self._ChunkIDs(list(refs)):
+                parameter = {"id": chunk}
+                operators = {"id": "IN"}
+                sql, values = self.FmtSQLSelect(["id"]+fldsd, parameter=parameter, dataTable=table, operators=operators, singleTable=1)
+                recs = self.Query(sql, values)
+                datas = self.structure.deserialize_rows(table, fldsd, [r[1:] for r in recs])
+                for r, data in zip(recs, datas):
+                    refs[r[0]]._UpdateCache(data = data)
+
+
+    def _ChunkIDs(self, ids, size=None):
+        # split long id lists for IN queries
+        size = size or self._MaxBatchSize
+        if len(ids) <= size:
+            return [list(ids)]
+        return [list(ids[i:i+size]) for i in range(0, len(ids), size)]
+
+    def _InsertRows(self, table, flds, rows):
+        # insert multiple rows and return the new ids in order. `rows` is a list of value
+        # tuples or the number of empty rows. backends insert all rows with one statement.
+        if isinstance(rows, int):
+            rows = [()]*rows
+        ids = []
+        for row in rows:
+            data, id = self.InsertFields(table, dict(zip(flds, row)), idColumn="id")
+            ids.append(id)
+        return ids
+
+    def _CopyRows(self, table, flds, ids):
+        # copy the rows `ids` and return the new ids as dictionary {id: new id}. backends
+        # copy all rows with one insert select statement.
+        ph = self.placeholder
+        flds = ",".join(flds)
+        if flds:
+            sql = "INSERT INTO %s (%s) SELECT %s FROM %s WHERE id=%s" % (table, flds, flds, table, ph)
+        else:
+            sql = "INSERT INTO %s (id) VALUES (NULL)" % (table)
+        if self._debug:
+            STACKF(0,sql+"\r\n",self._debug, self._log,name=self.name)
+        newids = {}
+        aC = self.connection.cursor()
+        try:
+            for id in ids:
+                aC.execute(sql, [id] if flds else [])
+                newids[id] = self._GetInsertIDValue(aC)
+        finally:
+            aC.close()
+        return newids
+
+    def _GroupUpdate(self, groups, table, id, data):
+        # collect update values by table and field set for executemany. values are 
+        # serialized per group.
+        flds = tuple(sorted(data.keys()))
+        if not flds:
+            return
+        rows, ids = groups.setdefault((table, flds), ([], []))
+        rows.append([data[f] for f in flds])
+        ids.append(id)
+
+    def _BatchPathIndex(self, entries):
+        # calculate the path indexes for entries with changed pool_unitref. parent and current
+        # paths are loaded in one query. moved entries are updated by UpdatePathIndex().
+        if not self.HasPathIndex():
+            return {}
+        refs = {}
+        for entry in entries:
+            meta = entry.meta.GetTemp() if entry.meta.HasTemp() else {}
+            if "pool_unitref" in meta:
+                refs[entry.id] = meta["pool_unitref"]
+        if not refs:
+            return {}
+        ids = [id for id in set(list(refs.keys())+list(refs.values())) if id > 0]
+        stored = {}
+        for chunk in self._ChunkIDs(ids):
+            for rec in self.SelectFields(self.MetaTable, ["id", self.PathIndexField], chunk):
+                stored[rec[0]] = rec[1] or ""
+        paths = {}
+        for id, unitref in refs.items():
+            current = stored.get(id)
+            parentPath = "/" if unitref <= 0 else stored.get(unitref)
+            if current or not parentPath:
+                paths[id] = self.UpdatePathIndex(id, unitref)
+            else:
+                paths[id] = "%s%d/" % (parentPath, id)
+        return paths
+
+    def _UndoEntries(self, entries):
+        for entry in entries:
+            entry.meta.EmptyTemp()
+            entry.data.EmptyTemp()
+            entry.files.EmptyTemp()
+        self.Undo()
 
     def _GetInsertIDValue(self, cursor):
         #("assert", "subclass")
@@ -962,230 +1592,314 @@ class Base(object):
 
     def GetContainedIDs(self, base=0, sort="title", parameter=""):
         """
-        Search subtree and returns a list of all contained ids.
-        id needs to be first field, pool_unitref second
-        """
-        refs = """
-        pool_unitref as ref1,
-        (select pool_unitref from %(meta)s where id = ref1) as ref2,
-        (select pool_unitref from %(meta)s where id = ref2) as ref3,
-        (select pool_unitref from %(meta)s where id = ref3) as ref4,
-        (select pool_unitref from %(meta)s where id = ref4) as ref5,
-        (select pool_unitref from %(meta)s where id = ref5) as ref6,
-        (select pool_unitref from %(meta)s where id = ref6) as ref7,
-        (select pool_unitref from %(meta)s where id = ref7) as ref8,
-        (select pool_unitref from %(meta)s where id = ref8) as ref9,
-        (select pool_unitref from %(meta)s where id = ref9) as ref10,
-        """ % {"meta": self.MetaTable}
-
-        if parameter:
-            parameter = "where " + parameter
-        sql = """
-        select %s id
-        from %s %s
-        order by pool_unitref, %s
-        """ % (refs, self.MetaTable, parameter, sort)
-        aC = self.connection.cursor()
-        aC.execute(sql)
-        l = aC.fetchall()
-        aC.close()
-        if len(l) == 0:
-            return []
+        Search subtree and returns a list of all contained ids. The subtree is selected 
+        in a single query. Ids are returned depth first, each level sorted by `sort`.
+        
+        `parameter` is an optional sql condition for pool_meta fields. Entries not matching 
+        the condition are skipped including their subtree.
 
+        The result is the same on all database systems. Previous versions returned the ids
+        on MySQL ordered by parent and included entries below not matching entries.
+        """
+        recs = self._SelectSubtree(base, [], sort, parameter)
+        children = self._GroupChildren(recs)
         ids = []
-        for rec in l:
-            #ignore outside tree
-            if not base in rec or rec[10] == base:
-                continue
-            #data
-            ids.append(rec[10])
-
+        stack = [base]
+        visited = set(stack)
+        while stack:
+            ref = stack.pop()
+            for rec in reversed(children.get(ref, ())):
+                if rec[0] in visited:
+                    continue
+                visited.add(rec[0])
+                stack.append(rec[0])
+            if ref != base:
+                ids.append(ref)
         return ids
 
 
     def GetTree(self, flds=None, sort="title", base=0, parameter=""):
         """
-        Loads a subtree as dictionary. 
-        The returned dictionary has the following format:
-        {"id": 123, "items": [{"id": 124, "items": [], "data": "q", ....}, ...], "data": "q", ....}
+        Loads a subtree as dictionary. The subtree is selected in a single query without
+        depth limit. The returned dictionary has the following format:
+        {"items": [{"id": base, "items": [{"id": 124, "items": [], "ref1": base, ..., "data": "q", ....}, ...], "data": "q", ....}]}
         
-        id needs to be first field, pool_unitref second
+        Entries contain the ids of the first ten parents as `ref1` to `ref10`. Each level
+        is sorted by `sort`. `parameter` is an optional sql condition for pool_meta fields. 
+        Entries not matching the condition are included as {"id": id, "items": [...]} if 
+        contained entries match.
         """
         if flds is None:
             flds = ["id"]
-        refs = """
-        pool_unitref as ref1,
-        (select pool_unitref from %(meta)s where id = ref1) as ref2,
-        (select pool_unitref from %(meta)s where id = ref2) as ref3,
-        (select pool_unitref from %(meta)s where id = ref3) as ref4,
-        (select pool_unitref from %(meta)s where id = ref4) as ref5,
-        (select pool_unitref from %(meta)s where id = ref5) as ref6,
-        (select pool_unitref from %(meta)s where id = ref6) as ref7,
-        (select pool_unitref from %(meta)s where id = ref7) as ref8,
-        (select pool_unitref from %(meta)s where id = ref8) as ref9,
-        (select pool_unitref from %(meta)s where id = ref9) as ref10,
-        """ % {"meta":self.MetaTable}
-
-        if parameter:
-            parameter = "where " + parameter
-        sql = """
-        select 
-        %s 
-        %s
-        from %s %s
-        order by pool_unitref, %s
-        """ % (refs, ConvertListToStr(flds), self.MetaTable, parameter, sort)
-        aC = self.connection.cursor()
-        aC.execute(sql)
-        l = aC.fetchall()
-        tree = {"items":[]}
-        aC.close()
-        if len(l) == 0:
-            return tree
-
-        flds2 = ["ref1", "ref2", "ref3", "ref4", "ref5", "ref6", "ref7", "ref8", "ref9", "ref10"] + flds
-        rtree = ["ref10", "ref9", "ref8", "ref7", "ref6", "ref5", "ref4", "ref3", "ref2", "ref1"]
-        for rec in l:
-            #ignore outside tree
-            if not base in rec:  # or rec[10] == base:
-                continue
-            #data
-            data = self.ConvertRecToDict(rec, flds2)
-            #parent and path, lookup base in parents 
-            add = 0
-            current = tree
-            for ref in rtree:
-                if data[ref] is None:
-                    continue
-                if data[ref] == base:
-                    add = 1
-                if not add:
+        parameter = parameter.strip()
+        if parameter.lower().startswith("and "):
+            parameter = parameter[4:]
+        match = "CASE WHEN (%s) THEN 1 ELSE 0 END" % (parameter) if parameter else "1"
+        recs = self._SelectSubtree(base, list(flds)+[match], sort, "", includeBase=True)
+        refs = ["ref1", "ref2", "ref3", "ref4", "ref5", "ref6", "ref7", "ref8", "ref9", "ref10"]
+        # parent ids of each entry, nearest first
+        parents = {base: []}
+        if base > 0:
+            parents[base] = list(reversed(self.GetParentPath(base))) + [0]
+        children = self._GroupChildren(recs)
+        order = []
+        stack = [base]
+        while stack:
+            ref = stack.pop()
+            for rec in children.get(ref, ()):
+                if rec[0] in parents:
                     continue
-                # add item to tree list
-                if "items" not in current:
-                    current["items"] = []
-                refentry = self._InList(current["items"], data[ref])
-                if not refentry:
-                    refentry = {"id":data[ref], "items": []}
-                    current["items"].append(refentry)
-                current = refentry
-            # add data 
-            if "items" not in current:
-                current["items"] = []
-            entry = self._InList(current["items"], data["id"])
-            if not entry:
-                entry = data
-                current["items"].append(entry)
-            else:
-                entry.update(data)
+                parents[rec[0]] = [ref] + parents[ref]
+                order.append(rec)
+                stack.append(rec[0])
+        # entries not matching are kept if contained entries match
+        matched = dict([(rec[0], rec[-1]) for rec in recs])
+        keep = set()
+        for rec in reversed(order):
+            if rec[0] in keep or matched[rec[0]]:
+                keep.add(rec[0])
+                keep.add(rec[1])
+        nodes = {}
+        for rec in recs:
+            if rec[0] != base and rec[0] not in keep:
+                continue
+            data = {}
+            if matched[rec[0]]:
+                data = self.ConvertRecToDict(rec[2:-1], flds)
+                data.update(zip(refs, (parents[rec[0]]+[None]*10)[:10]))
+            data["id"] = rec[0]
+            data["items"] = []
+            nodes[rec[0]] = data
+        root = nodes.get(base) or {"id": base, "items": []}
+        nodes[base] = root
+        for rec in order:
+            if rec[0] in keep:
+                nodes[rec[1]]["items"].append(nodes[rec[0]])
+        if not root["items"] and not matched.get(base):
+            return {"items": []}
+        return {"items": [root]}
 
-        return tree
 
-    def _InList(self, l, id):
-        for i in l:
-            if i["id"] == id:
-                return i
-        return None
-    
-    
     def GetParentPath(self, id):
         """
-        Returns id references of parents for the given id.
-        Maximum 10 parents
+        Returns id references of parents for the given id. The first id is the root.
         """
         if id <= 0:
             return []
-        sql = """
-        SELECT t1.pool_unitref AS ref1, 
-         t2.pool_unitref as ref2, 
-         t3.pool_unitref as ref3, 
-         t4.pool_unitref as ref4,
-         t5.pool_unitref as ref5,
-         t6.pool_unitref as ref6,
-         t7.pool_unitref as ref7,
-         t8.pool_unitref as ref8,
-         t9.pool_unitref as ref9,
-         t10.pool_unitref as ref10
-        FROM %(meta)s AS t1
-        LEFT JOIN %(meta)s AS t2 ON t2.id = t1.pool_unitref
-        LEFT JOIN %(meta)s AS t3 ON t3.id = t2.pool_unitref
-        LEFT JOIN %(meta)s AS t4 ON t4.id = t3.pool_unitref
-        LEFT JOIN %(meta)s AS t5 ON t5.id = t4.pool_unitref
-        LEFT JOIN %(meta)s AS t6 ON t6.id = t5.pool_unitref
-        LEFT JOIN %(meta)s AS t7 ON t7.id = t6.pool_unitref
-        LEFT JOIN %(meta)s AS t8 ON t8.id = t7.pool_unitref
-        LEFT JOIN %(meta)s AS t9 ON t9.id = t8.pool_unitref
-        LEFT JOIN %(meta)s AS t10 ON t10.id = t9.pool_unitref
-        WHERE t1.id = %(id)d;""" % {"id":id, "meta": self.MetaTable}
-        
-        if self._debug:
-            STACKF(0,sql+"\r\n",self._debug, self._log,name=self.name)
-        aC = self.connection.cursor()
-        aC.execute(sql)
-        aL = aC.fetchall()
-        parents = []
-        if len(aL) == 0:
-            return parents
-        cnt = 10
-        for i in range(0, cnt-1):
-            id = aL[0][i]
-            if id == None:
-                continue
-            if id <= 0:
-                break
-            parents.insert(0, id)
-        aC.close()
-        return parents
+        if self.HasPathIndex():
+            path = self.GetPathIndex(id)
+            if path:
+                return self._SplitPath(path)[:-1]
+        return [rec[0] for rec in self._SelectParents(id, [])]
 
 
     def GetParentTitles(self, id):
         """
-        Returns titles of parents for the given id.
-        maximum 10 parents
+        Returns titles of parents for the given id. The first title is the root's title.
         """
         if id <= 0:
             return []
+        if self.HasPathIndex():
+            path = self.GetPathIndex(id)
+            if path:
+                parents = self._SplitPath(path)[:-1]
+                if not parents:
+                    return []
+                titles = dict(self.SelectFields(self.MetaTable, ["id", "title"], parents))
+                return [self.EncodeText(titles[ref]) for ref in parents if titles.get(ref) is not None]
+        return [self.EncodeText(rec[2]) for rec in self._SelectParents(id, ["title"]) if rec[2] is not None]
+
+
+    # Path index --------------------------------------------------------------
+
+    def HasPathIndex(self):
+        """
+        Returns True if the meta layer includes the path index field.
+        """
+        return self.PathIndexField in self.structure.get(self.MetaTable, ())
+
+
+    def GetPathIndex(self, id):
+        """
+        Returns the stored path index of the entry or an empty string if not indexed.
+        """
+        if id <= 0:
+            return "/"
+        r = self.SelectFields(self.MetaTable, [self.PathIndexField], [id])
+        if not r:
+            return ""
+        return r[0][0] or ""
+
+
+    def UpdatePathIndex(self, id, unitref):
+        """
+        Calculates the path index for the entry if stored below `unitref`. If the entry
+        has been moved the paths of all contained entries are updated. The entry's own 
+        path is returned and has to be stored by the caller.
+        """
+        parentPath = self.GetPathIndex(unitref)
+        if not parentPath:
+            # parent not indexed yet
+            parentPath = "/%s/" % "/".join([str(ref) for ref in self.GetParentPath(unitref)+[unitref]])
+        path = "%s%d/" % (parentPath, id)
+        current = self.GetPathIndex(id)
+        if current and current != path:
+            # moved: replace the path prefix of the subtree with one statement
+            ph = self.placeholder
+            condition, value = self._PathCondition(current)
+            sql = "UPDATE %s SET %s=%s WHERE %s AND id<>%s" % (self.MetaTable, self.PathIndexField,
+                                                             self._ConcatSQL(ph, "SUBSTR(%s,%s)" % (self.PathIndexField, ph)),
+                                                             condition, ph)
+            self.Execute(sql, (path, len(current)+1, value, id)).close()
+        return path
+
+
+    def RebuildPathIndex(self):
+        """
+        Recalculates and stores the path index for all entries. Returns the number of
+        updated entries.
+        """
+        cursor = self.Execute("SELECT id, pool_unitref, %s FROM %s" % (self.PathIndexField, self.MetaTable))
+        recs = cursor.fetchall()
+        cursor.close()
+        children = self._GroupChildren(recs)
+        stored = dict([(rec[0], rec[2]) for rec in recs])
+        values = []
+        stack = [(0, "/")]
+        visited = set([0])
+        while stack:
+            ref, path = stack.pop()
+            for rec in children.get(ref, ()):
+                if rec[0] in visited:
+                    continue
+                visited.add(rec[0])
+                p = "%s%d/" % (path, rec[0])
+                if stored.get(rec[0]) != p:
+                    values.append((p, rec[0]))
+                stack.append((rec[0], p))
+        # entries not connected to the tree
+        for rec in recs:
+            if rec[0] not in visited and stored.get(rec[0]):
+                values.append(("", rec[0]))
+        if values:
+            sql = "UPDATE %s SET %s=%s WHERE id=%s" % (self.MetaTable, self.PathIndexField, self.placeholder, self.placeholder)
+            if self._debug:
+                STACKF(0,sql+"\r\n",self._debug, self._log,name=self.name)
+            cursor = self.connection.cursor()
+            cursor.executemany(sql, values)
+            cursor.close()
+        return len(values)
+
+
+    def _SplitPath(self, path):
+        return [int(ref) for ref in path.strip("/").split("/") if ref]
+
+    def _PathCondition(self, path):
+        # returns the condition and value to select all paths starting with `path`. 
+        # LIKE with a constant prefix uses the index. 
+        return "%s LIKE %s" % (self.PathIndexField, self.placeholder), path+"%"
+
+    def _ConcatSQL(self, *values):
+        return "CONCAT(%s)" % (",".join(values))
+
+
+    def _SelectSubtree(self, base, flds, sort, parameter, includeBase=False):
+        # selects all entries below base with a recursive query.
+        # returns a list of records (id, pool_unitref, *flds) sorted by `sort`.
+        parameter = parameter.strip()
+        if parameter.lower().startswith("and "):
+            parameter = parameter[4:]
+        if parameter:
+            parameter = "AND (%s)" % parameter
+        where = ""
+        if includeBase:
+            where = "OR id = %d" % (base)
+        if self.HasPathIndex():
+            path = self.GetPathIndex(base)
+            if path:
+                return self._SelectIndexedSubtree(base, path, flds, sort, parameter, where)
+        sql = """
+        WITH RECURSIVE subtree (tid) AS (
+            SELECT id FROM %(meta)s WHERE pool_unitref = %(base)d %(parameter)s
+            UNION
+            SELECT %(meta)s.id FROM %(meta)s JOIN subtree ON %(meta)s.pool_unitref = subtree.tid
+            WHERE 1=1 %(parameter)s
+        )
+        SELECT %(flds)s FROM %(meta)s
+        WHERE id IN (SELECT tid FROM subtree) %(where)s
+        ORDER BY %(sort)s""" % {"meta": self.MetaTable, "base": base, "parameter": parameter,
+                               "flds": ConvertListToStr(["id", "pool_unitref"]+list(flds)),
+                               "where": where, "sort": sort or "id"}
+        if self._debug:
+            STACKF(0,sql+"\r\n",self._debug, self._log,name=self.name)
         aC = self.connection.cursor()
+        aC.execute(sql)
+        recs = aC.fetchall()
+        aC.close()
+        return recs
+
+
+    def _SelectIndexedSubtree(self, base, path, flds, sort, parameter, where):
+        # selects all entries below base based on the path index.
+        # entries not matching parameter are skipped when the tree is assembled
+        condition, value = self._PathCondition(path)
         sql = """
-        SELECT t1.pool_unitref AS ref1, t1.title AS title1, 
-         t2.pool_unitref as ref2, t2.title AS title2,
-         t3.pool_unitref as ref3, t3.title AS title3,
-         t4.pool_unitref as ref4, t4.title AS title4,
-         t5.pool_unitref as ref5, t5.title AS title5,
-         t6.pool_unitref as ref6, t6.title AS title6,
-         t7.pool_unitref as ref7, t7.title AS title7,
-         t8.pool_unitref as ref8, t8.title AS title8,
-         t9.pool_unitref as ref9, t9.title AS title9,
-         t10.pool_unitref as ref10, t10.title AS title10 
-        FROM %(meta)s AS t1
-        LEFT JOIN %(meta)s AS t2 ON t2.id = t1.pool_unitref
-        LEFT JOIN %(meta)s AS t3 ON t3.id = t2.pool_unitref
-        LEFT JOIN %(meta)s AS t4 ON t4.id = t3.pool_unitref
-        LEFT JOIN %(meta)s AS t5 ON t5.id = t4.pool_unitref
-        LEFT JOIN %(meta)s AS t6 ON t6.id = t5.pool_unitref
-        LEFT JOIN %(meta)s AS t7 ON t7.id = t6.pool_unitref
-        LEFT JOIN %(meta)s AS t8 ON t8.id = t7.pool_unitref
-        LEFT JOIN %(meta)s AS t9 ON t9.id = t8.pool_unitref
-        LEFT JOIN %(meta)s AS t10 ON t10.id = t9.pool_unitref
-        WHERE t1.id = %(id)d;""" % {"id": id, "meta": self.MetaTable}        
-        
+        SELECT %(flds)s FROM %(meta)s
+        WHERE (%(condition)s AND id <> %(base)d %(parameter)s) %(where)s
+        ORDER BY %(sort)s""" % {"meta": self.MetaTable, "base": base, "parameter": parameter,
+                               "flds": ConvertListToStr(["id", "pool_unitref"]+list(flds)),
+                               "condition": condition, "where": where, "sort": sort or "id"}
+        cursor = self.Execute(sql, (value,))
+        recs = cursor.fetchall()
+        cursor.close()
+        return recs
+
+
+    def _SelectParents(self, id, flds):
+        # selects the parent chain of id with a recursive query.
+        # returns a list of records (id, pool_unitref, *flds), root first. 
+        sql = """
+        WITH RECURSIVE parents (pid) AS (
+            SELECT pool_unitref FROM %(meta)s WHERE id = %(id)d
+            UNION
+            SELECT %(meta)s.pool_unitref FROM %(meta)s JOIN parents ON %(meta)s.id = parents.pid
+        )
+        SELECT %(flds)s FROM %(meta)s
+        WHERE id IN (SELECT pid FROM parents) OR id = %(id)d""" % {"meta": self.MetaTable, "id": id,
+                               "flds": ConvertListToStr(["id", "pool_unitref"]+list(flds))}
         if self._debug:
             STACKF(0,sql+"\r\n",self._debug, self._log,name=self.name)
+        aC = self.connection.cursor()
         aC.execute(sql)
-        aL = aC.fetchall()
+        recs = dict([(rec[0], rec) for rec in aC.fetchall()])
+        aC.close()
         parents = []
-        if len(aL) == 0:
+        if id not in recs:
             return parents
-        cnt = 10
-        for i in range(1, cnt-1):
-            title = aL[0][i*2+1]
-            if title is None:
+        ref = recs[id][1]
+        visited = set([id])
+        while ref and ref > 0 and ref not in visited:
+            visited.add(ref)
+            rec = recs.get(ref)
+            if rec is None:
+                parents.insert(0, (ref, None) + (None,)*len(flds))
                 break
-            parents.insert(0, self.EncodeText(title))
-        aC.close()
+            parents.insert(0, rec)
+            ref = rec[1]
         return parents
 
 
+    def _GroupChildren(self, recs):
+        # groups sorted subtree records by parent id
+        children = {}
+        for rec in recs:
+            if rec[1] in children:
+                children[rec[1]].append(rec)
+            else:
+                children[rec[1]] = [rec]
+        return children
+
+
     # Files and directories ---------------------------------------------------------------------
 
     def InitFileStorage(self, root, connectionParam):
@@ -1210,10 +1924,16 @@ class Base(object):
         Get local group assignment for userid.
 
         `id` can be a single value or a tuple. If its a tuple the groups for
-        all matching ids are returned.
+        all matching ids are returned. Long id lists are queried in chunks of 
+        `_MaxBatchSize` ids.
 
         returns a group assignment list [["userid", "groupid", "id"], ...]
         """
+        if isinstance(id, (list, tuple)) and len(id) > self._MaxBatchSize:
+            r = []
+            for ids in self._ChunkIDs(id):
+                r += self.GetGroups(tuple(ids), userid=userid, group=group)
+            return r
         # check if exists
         parameter = {}
         
@@ -1418,7 +2138,10 @@ class Entry(object):
         try:
             # meta
             if self.meta.HasTemp():
-                self.pool.UpdateFields(self.pool.MetaTable, self.id, self.meta.GetTemp())
+                meta = self.meta.GetTemp()
+                if "pool_unitref" in meta and self.pool.HasPathIndex():
+                    meta[self.pool.PathIndexField] = self.pool.UpdatePathIndex(self.id, meta["pool_unitref"])
+                self.pool.UpdateFields(self.pool.MetaTable, self.id, meta)
             # data
             if self.data.HasTemp():
                 self.pool.UpdateFields(self.GetDataTbl(), self.GetDataRef(), self.data.GetTemp())
@@ -1427,14 +2150,8 @@ class Entry(object):
                 self.CommitFiles(self.files.GetTemp())
             if dbCommit:
                 self.pool.Commit()
-            # remove previous files
-            self.Cleanup(self.files.GetTemp())
-            self.data.SetContent(self.data.GetTemp())
-            self.data.clear()
-            self.meta.SetContent(self.meta.GetTemp())
-            self.meta.clear()
-            self.files.SetContent(self.files.GetTemp())
-            self.files.clear()
+            self._FinishCommit()
+            self.pool._Committed((self.id,))
         except Exception as e:
             try:
                 self.Undo()
@@ -1444,6 +2161,17 @@ class Entry(object):
         return True
 
 
+    def _FinishCommit(self):
+        # remove previous files and move temporary values to the cache
+        self.Cleanup(self.files.GetTemp())
+        self.data.SetContent(self.data.GetTemp())
+        self.data.clear()
+        self.meta.SetContent(self.meta.GetTemp())
+        self.meta.clear()
+        self.files.SetContent(self.files.GetTemp())
+        self.files.clear()
+
+
     def Undo(self):
         """
         Undo changes in database
@@ -70,6 +70,10 @@ class Connection(object):
         """ Close and connect to server """
         # "use a subclassed connection"
 
+    def _Open(self):
+        """ Opens and returns a new raw dbapi connection. Used by connection pools. """
+        return self.PrivateConnection()
+
     def close(self):
         """ Close database connection """
         db = self._get(connect=False)
@@ -285,3 +289,277 @@ class ConnectionRequest(Connection):
     def _setvtime(self):
         self.local._vtime = time()
 
+
+
+
+class PoolConnectionProxy(object):
+    """
+    Wraps a dbapi connection checked out from a `ConnectionPool`. All attributes are
+    passed to the raw connection except `close()` which returns the connection to the
+    pool instead of closing it.
+    """
+
+    def __init__(self, pool, db):
+        self._pool = pool
+        self._db = db
+
+    def __getattr__(self, key):
+        db = self.__dict__.get("_db")
+        if db is None:
+            raise OperationalError("Database is closed")
+        return getattr(db, key)
+
+    def close(self):
+        """ Return the connection to the pool """
+        db = self._db
+        if db is None:
+            return
+        self._db = None
+        self._pool._Checkin(db)
+        self._pool = None
+
+    def discard(self):
+        """ Close the raw connection and remove it from the pool """
+        db = self._db
+        if db is None:
+            return
+        self._db = None
+        self._pool._Checkin(db, discard=True)
+        self._pool = None
+
+
+class ConnectionPool(ConnectionRequest):
+    """
+    Shares a bounded set of database connections across requests and threads.
+
+    A connection is checked out from the pool on first use and stored as request value
+    for the time of the request (like `ConnectionRequest`). Instead of being closed it
+    is rolled back and returned to the pool when the request is finished. Without a 
+    request the connection is stored as thread local value until `close()` is called.
+
+    The pool is configured by the database configuration:
+    poolSize = maximum number of open connections
+    poolMinSize = number of idle connections kept open on eviction
+    poolTimeout = seconds to wait for a free connection if all are in use
+    poolIdleTime = idle connections are closed after `poolIdleTime` seconds
+    
+    Idle connections are health checked on checkout if `verifyConnection` is set. If 
+    `revalidate` is larger than 0 the check is skipped for connections used or validated 
+    within the last `revalidate` seconds.
+    
+    Use `GetPoolStats()` to read the current pool state and usage statistics.
+    """
+
+    def __init__(self, config = None, connectNow = True):
+        self.local = threading.local()
+        self._lock = threading.Condition(threading.Lock())
+        self._idle = []     # list of (dbapi connection, last used, last validated)
+        self._size = 0      # number of open connections (idle + in use)
+        self._inuse = 0
+        self._stats = dict(checkouts=0, created=0, evicted=0, discarded=0,
+                           waits=0, waittime=0.0, maxwaittime=0.0, timeouts=0)
+        Connection.__init__(self, config, False)
+        if connectNow:
+            self.Fill()
+
+    def __del__(self):
+        try:
+            self.close()
+        finally:
+            self.Dispose()
+
+    def connect(self):
+        """ Checks out a connection from the pool and binds it to the request or thread """
+        current = self._get(connect=False)
+        if current is not None:
+            # reconnect: the current connection is not returned to the pool
+            current.discard()
+        db = PoolConnectionProxy(self, self._Checkout())
+        self._set(db)
+        return db
+
+    def VerifyConnection(self):
+        """ 
+        Connections are verified on checkout. Failures during requests are not to be 
+        expected.
+        """
+        if self._get(connect=False) is None:
+            self.connect()
+        return True
+
+    def IsConnected(self):
+        """ Check if the current connection is alive """
+        db = self._get(connect=False)
+        if db is None:
+            return False
+        return self._IsAlive(db)
+
+    # pool management --------------------------------------------------------------
+
+    def Fill(self):
+        """ Opens connections until `poolMinSize` connections are available """
+        minsize = self._PoolConf("poolMinSize", 0)
+        with self._lock:
+            while self._size < minsize:
+                db = self._Open()
+                now = time()
+                self._idle.append((db, now, now))
+                self._size += 1
+                self._stats["created"] += 1
+            self._lock.notify_all()
+
+    def Dispose(self):
+        """ Closes all idle connections. Connections in use are closed on checkin. """
+        with self._lock:
+            idle = self._idle
+            self._idle = []
+            self._size -= len(idle)
+        for db, used, validated in idle:
+            self._Close(db)
+
+    def GetPoolStats(self):
+        """
+        Returns the current pool state and usage statistics as dictionary ::
+        
+            size = number of open connections
+            idle = number of idle connections
+            inuse = number of checked out connections
+            maxsize = configured maximum size
+            checkouts = total number of checkouts
+            created = total number of opened connections
+            evicted = idle connections closed after `poolIdleTime`
+            discarded = broken connections closed on checkout or checkin
+            waits = number of checkouts which had to wait for a free connection
+            waittime = total time in seconds spent waiting
+            maxwaittime = longest single wait in seconds
+            timeouts = number of checkouts failed after `poolTimeout`
+        """
+        with self._lock:
+            stats = self._stats.copy()
+            stats["size"] = self._size
+            stats["idle"] = len(self._idle)
+            stats["inuse"] = self._inuse
+            stats["maxsize"] = self._PoolConf("poolSize", 10)
+        return stats
+
+    def _Checkout(self):
+        conf = self.configuration
+        maxsize = self._PoolConf("poolSize", 10)
+        timeout = self._PoolConf("poolTimeout", 10)
+        waited = None
+        with self._lock:
+            self._Evict()
+            while not self._idle and self._size >= maxsize:
+                if waited is None:
+                    waited = time()
+                    self._stats["waits"] += 1
+                remaining = timeout - (time() - waited)
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    self._AddWaitTime(waited)
+                    raise OperationalError("Connection pool exhausted. No free connection after %s seconds." % str(timeout))
+                self._lock.wait(remaining)
+            if waited is not None:
+                self._AddWaitTime(waited)
+            if self._idle:
+                db, used, validated = self._idle.pop()
+            else:
+                db = validated = None
+            # reserve the slot before leaving the lock. opening and health checks
+            # are done unlocked.
+            if db is None:
+                self._size += 1
+            self._inuse += 1
+            self._stats["checkouts"] += 1
+
+        try:
+            if db is not None and conf.get("verifyConnection"):
+                revalidate = self._PoolConf("revalidate", 0)
+                if revalidate <= 0 or validated + revalidate <= time():
+                    if not self._IsAlive(db):
+                        self._Close(db)
+                        with self._lock:
+                            self._stats["discarded"] += 1
+                        db = None
+            if db is None:
+                db = self._Open()
+                if not db:
+                    raise OperationalError("Cannot connect to database '%s'" % (conf.dbName))
+                with self._lock:
+                    self._stats["created"] += 1
+        except:
+            with self._lock:
+                self._size -= 1
+                self._inuse -= 1
+                self._lock.notify()
+            raise
+        self._setvtime()
+        return db
+
+    def _Checkin(self, db, discard=False):
+        if not discard:
+            try:
+                # rollback uncommited values by default
+                db.rollback()
+            except:
+                discard = True
+        with self._lock:
+            self._inuse -= 1
+            if discard or self._size > self._PoolConf("poolSize", 10):
+                self._size -= 1
+                if discard:
+                    self._stats["discarded"] += 1
+            else:
+                now = time()
+                self._idle.append((db, now, self._getvtime()))
+                db = None
+            self._Evict()
+            self._lock.notify()
+        if db is not None:
+            self._Close(db)
+
+    def _Evict(self):
+        # close idle connections not used for `poolIdleTime`. requires lock.
+        idletime = self._PoolConf("poolIdleTime", 300)
+        if not idletime or not self._idle:
+            return
+        minsize = self._PoolConf("poolMinSize", 0)
+        limit = time() - idletime
+        keep = []
+        # idle list is used as stack. oldest connections first.
+        for entry in self._idle:
+            if entry[1] < limit and self._size > minsize:
+                self._size -= 1
+                self._stats["evicted"] += 1
+                self._Close(entry[0])
+                continue
+            keep.append(entry)
+        self._idle = keep
+
+    def _AddWaitTime(self, started):
+        w = time() - started
+        self._stats["waittime"] += w
+        if w > self._stats["maxwaittime"]:
+            self._stats["maxwaittime"] = w
+
+    def _IsAlive(self, db):
+        try:
+            c = db.cursor()
+            c.execute("SELECT 1")
+            c.fetchall()
+            c.close()
+            return True
+        except:
+            return False
+
+    def _Close(self, db):
+        try:
+            db.close()
+        except:
+            pass
+
+    def _PoolConf(self, key, default):
+        value = self.configuration.get(key)
+        if value is None:
+            return default
+        return value
@@ -300,6 +300,78 @@ class DatabaseManager(object):
         return True
 
 
+    # Indexes --------------------------------------------------------------
+    """
+    Secondary indexes are configured as tuples of column names and matched by columns. 
+    Primary keys and unique indexes are not handled.
+    """
+
+    def IndexName(self, tableName, columns):
+        return "%s_%s" % (tableName, "_".join(columns))
+
+
+    def CreateIndex(self, tableName, columns, name=None):
+        if not self.IsDB():
+            return False
+        if not tableName or not columns:
+            return False
+        if not name:
+            name = self.IndexName(tableName, columns)
+        self.db.execute("create index %s on %s (%s)" % (name, tableName, ",".join(columns)))
+        return True
+
+
+    def DropIndex(self, tableName, name):
+        if not self.IsDB():
+            return False
+        self.db.execute("drop index %s on %s" % (name, tableName))
+        return True
+
+
+    def UpdateIndexes(self, tableName, indexes, drop=None):
+        """
+        Creates missing indexes and drops existing indexes not configured.
+        
+        indexes = list of column tuples
+        drop = list of index names to be dropped if not configured
+        
+        returns dict {"created": [names], "dropped": [names], "existing": {name: columns}, 
+                      "missing": [columns], "unused": {name: columns}}
+        missing lists indexes which cannot be created because columns do not exist.
+        """
+        result = {"created": [], "dropped": [], "existing": {}, "missing": [], "unused": {}}
+        if not self.IsTable(tableName):
+            return result
+        # column names are compared case insensitive
+        existing = self.GetIndexes(tableName)
+        columns = set([c.lower() for c in self.GetColumns(tableName)])
+        byColumns = dict([(tuple([c.lower() for c in cols]), name) for name, cols in existing.items()])
+        configured = set()
+        for cols in indexes:
+            key = tuple([c.lower() for c in cols])
+            if key in byColumns:
+                configured.add(byColumns[key])
+                result["existing"][byColumns[key]] = cols
+                continue
+            if [c for c in key if not c in columns]:
+                result["missing"].append(cols)
+                continue
+            name = self.IndexName(tableName, cols)
+            if not self.CreateIndex(tableName, cols, name):
+                result["missing"].append(cols)
+                continue
+            configured.add(name)
+            result["created"].append(name)
+        for name, cols in existing.items():
+            if name in configured:
+                continue
+            if drop and name in drop and self.DropIndex(tableName, name):
+                result["dropped"].append(name)
+                continue
+            result["unused"][name] = cols
+        return result
+
+
     # physical database structure ----------------------------------------------------------------
 
     def GetDatabases(self):
@@ -339,3 +411,19 @@ class DatabaseManager(object):
         return table
 
 
+    def GetIndexes(self, tableName):
+        """
+        returns a dict of secondary indexes {name: (column, ...)}
+        """
+        if not self.IsDB():
+            return {}
+        if not self.IsTable(tableName):
+            return {}
+        self.db.execute("show index from %s" % (tableName))
+        indexes = {}
+        for c in self.db.fetchall():
+            # Table, Non_unique, Key_name, Seq_in_index, Column_name
+            if not c[1]:
+                continue
+            indexes.setdefault(c[2], []).append((c[3], c[4]))
+        return dict([(name, tuple([c[1] for c in sorted(cols)])) for name, cols in indexes.items()])
@@ -4,7 +4,12 @@
 
 import weakref
 import os
+import io
+import stat
 import uuid
+import time
+import hashlib
+import importlib
 from io import BytesIO
 
 from nive.utils.path import DvPath
@@ -129,10 +134,10 @@ class File:
         if self.file and hasattr(self.file, "close"):
             self.file.close()
 
-    def iterator(self):
+    def iterator(self, chunkSize=None):
         path = self.abspath()
         if path:
-            return FileIterable(path)
+            return FileIterable(path, chunkSize=chunkSize)
         return None
     
     def isTempFile(self):
@@ -180,9 +185,10 @@ class File:
     def commitTemp(self, fileentry):
         """
         This functions writes the file to the pool directory. If the file is not marked
-        as tempfile, nothing is written.
+        as tempfile, nothing is written. The file is written by the storage backend of
+        the pool (`pool.storage`).
         
-        Files are processed in the following order:
+        `LocalStorage` processes files in the following order:
         - a temp path is created
         - the file is written to this path
         - the original file is renamed to be deleted on success and stored as `file.deleteOnSuccess`
@@ -196,84 +202,15 @@ class File:
             return True
         if not self.fileentry:
             self.fileentry = weakref.ref(fileentry)
-        
-        maxFileSize = fileentry.maxFileSize
-        if self.size and self.size > maxFileSize:
-            raise ValueError("File too big")
-
-        # create temp path for current
-        backupPath = None
-        originalPath = DvPath(self.abspath())
-        
-        newPath = DvPath(self._CreatePath(self.filekey, self.filename))
-        tempPath = DvPath(str(newPath))
-        tempPath.SetName("_temp_" + str(uuid.uuid4()))
-        tempPath.SetExtension(newPath.GetExtension())
+        return fileentry.pool.storage.Write(self, fileentry)
 
-        if tempPath.Exists():
-            tempPath.Delete()
-        tempPath.CreateDirectories()
-        size = 0
-        out = None
-        try:
-            out = open(tempPath.GetStr(), "wb")
-            data = self.read(10000)
-            while data:
-                size += len(data)
-                if maxFileSize and size > maxFileSize:
-                    raise ValueError("File too big")
-                out.write(data)
-                data = self.read(10000)
-            out.close()
-            #file.close()
-        except Exception as e:
-            try:
-                self.file.close()
-            except:
-                pass
-            try:
-                if out is not None:
-                    out.close()
-            except:
-                pass
-            # reset old file
-            tempPath.Delete()
-            raise
-
-        # store path for cleanup on success
-        if str(originalPath) and originalPath.Exists():
-            backupPath = DvPath(str(originalPath))
-            backupPath.SetName("_del_" + str(uuid.uuid4()))
-            backupPath.SetExtension(originalPath.GetExtension())
-            if originalPath.Exists() and not originalPath.Rename(backupPath):
-                tempPath.Delete()
-                raise IOError("Rename file failed")
-            self.deleteOnSuccess = str(backupPath)
-
-        try:
-            # rename temp path
-            os.renames(str(tempPath), str(newPath))
-            # update meta properties
-            self.path = fileentry._RelativePath(str(newPath))
-            self.size = size
-            return True
-        except:
-            tempPath.Delete()
-            if backupPath:
-                backupPath.Rename(originalPath)
-            raise
-
-    def delete(self):
+    def delete(self, entryID=None):
+        """
+        Removes the physical file. `entryID` is set if all files of the entry are removed.
+        """
         if not self.path:
             return True
-        originalPath = DvPath(self.abspath())
-        if not originalPath.IsFile():
-            #not a file
-            return True
-        if originalPath.Exists() and not self.fileentry().pool._MoveToTrashcan(originalPath, self.fileentry().id):
-            #Delete failed!
-            return False
-        return True
+        return self.fileentry().pool.storage.Delete(self, entryID=entryID)
 
     
     # file class dictionary support ---------------------------------------
@@ -327,15 +264,8 @@ class File:
         """
         Create the physical path of the file
         """
-        root = str(self.fileentry().pool.root)
-        aP = DvPath(root)
-        aP.AppendSeperator()
-        aP.AppendDirectory(self.fileentry().pool._GetDirectory(self.fileentry().id))
-        aP.AppendSeperator()
-
-        aP.SetName("%06d_%s_" % (self.fileentry().id, key))
-        aP.SetExtension(DvPath(filename).GetExtension())
-        return aP.GetStr()
+        entry = self.fileentry()
+        return entry.pool.storage.CreatePath(entry.id, key, filename)
 
 
 
@@ -349,6 +279,14 @@ class FileManager(object):
     Table "pool_files" ("id", "fileid", "filekey", "path", "filename", "size", "extension", "version").
     Field path stores internal path to the file in filesystem without root.
 
+    Files are written, copied and removed by the storage backend `self.storage`. Set
+    `fileStorage` in the pool configuration to select the backend:
+
+    - "local" or None: `LocalStorage`. One physical file for each entry and file key.
+    - "blob": `BlobStorage`. Content addressed files shared by all entries with the same
+      file contents.
+    - a storage class or dotted python name
+
     Preperty descriptions are dictionaries with key:value pairs.
     Property values:
     id = unit id to store file for (id is required)
@@ -366,6 +304,7 @@ class FileManager(object):
     FileTable = "pool_files"    # file table name
     FileTableFields = ("id", "fileid", "filekey", "path", "filename", "size", "extension", "version")
     Trashcan = "_trashcan"
+    fileStorage = None
     
     def GetFileClass(self):
         """
@@ -379,12 +318,27 @@ class FileManager(object):
         """
         self.root = DvPath()
         self.root.SetStr(root)
+        self.storage = self.GetStorageClass(self.fileStorage)(self)
         if root == "":
             return
         self.root.AppendSeperator()
         self.root.CreateDirectoriesExcp()
 
 
+    def GetStorageClass(self, storage):
+        """
+        Returns the storage backend class for the `fileStorage` setting
+        """
+        if not storage or storage == "local":
+            return LocalStorage
+        if storage == "blob":
+            return BlobStorage
+        if isinstance(storage, str):
+            module, name = storage.rsplit(".", 1)
+            return getattr(importlib.import_module(module), name)
+        return storage
+
+
     def SearchFilename(self, filename):
         """
         search for filename
@@ -416,13 +370,66 @@ class FileManager(object):
         entry = self.GetEntry(id, version=version)
         for f in files:
             file = self.GetFileClass()(filedict=f,fileentry=entry)
-            file.delete()
+            file.delete(entryID=id)
         if len(files):
             sql = "delete from %s where id = %d" % (self.FileTable, id)
             self.Query(sql, getResult=False)
         return True
 
 
+    def _DeleteFileRecords(self, cursor, ids):
+        """
+        Removes the file records of all ids and returns the records
+        """
+        ph = self.placeholder
+        values = ",".join([ph]*len(ids))
+        flds = self.FileTableFields
+        cursor.execute("SELECT %s FROM %s WHERE id IN (%s)" % (",".join(flds), self.FileTable, values), ids)
+        files = [self.ConvertRecToDict(f, flds) for f in cursor.fetchall()]
+        if files:
+            cursor.execute("DELETE FROM %s WHERE id IN (%s)" % (self.FileTable, values), ids)
+        return files
+
+
+    def _DuplicateFileRecords(self, cursor, ids):
+        """
+        Copies the file records of all ids to the new ids ({id: new id}). Physical files 
+        are copied or shared by the storage backend. Records of missing files are skipped.
+        Returns the new records.
+        """
+        ph = self.placeholder
+        flds = self.FileTableFields
+        cursor.execute("SELECT %s FROM %s WHERE id IN (%s)" % (",".join(flds), self.FileTable, ",".join([ph]*len(ids))), list(ids.keys()))
+        files = []
+        try:
+            for f in [self.ConvertRecToDict(r, flds) for r in cursor.fetchall()]:
+                path = self.storage.Copy(f, ids[f["id"]])
+                if not path:
+                    continue
+                f["id"] = ids[f["id"]]
+                f["path"] = path
+                del f["fileid"]
+                files.append(f)
+            if files:
+                flds = [f for f in flds if f != "fileid"]
+                cursor.executemany("INSERT INTO %s (%s) VALUES (%s)" % (self.FileTable, ",".join(flds), ",".join([ph]*len(flds))),
+                                   [[f[k] for k in flds] for f in files])
+        except:
+            self.storage.Release(files)
+            raise
+        return files
+
+
+    def ReleaseFiles(self, files):
+        """
+        Removes the physical files of deleted file records. Call after the records have 
+        been deleted and committed. 
+        """
+        if files:
+            self.storage.Release(files)
+        return True
+
+
     # Internal --------------------------------------------------------------
 
     def _GetDirectory(self, id):
@@ -563,14 +570,11 @@ class FileEntry(object):
         """
         if not isinstance(files, dict):
             files = {"":files}
+        storage = self.pool.storage
         for key, file in list(files.items()):
-            if not hasattr(file, "deleteOnSuccess"):
+            if file is None:
                 continue
-            path = DvPath(file.deleteOnSuccess)
-            try:
-                path.Delete()
-            except:
-                pass
+            storage.Cleanup(file)
 
     
     # Options --------------------------------------------------------------------
@@ -582,11 +586,12 @@ class FileEntry(object):
         """
         files = self.Files()
         result = True
+        storage = self.pool.storage
         for file in files:
             if not file.exists():
                 result = False
                 continue
-            newFile = self.pool.GetFileClass()(file=file, filename=file.filename, size=file.size, tempfile=True, fileentry=newEntry)
+            newFile = storage.Duplicate(file, newEntry)
             try:
                 newEntry.CommitFile(file.filekey, newFile)
             except:
@@ -663,36 +668,491 @@ class FileEntry(object):
 
 
 
+# file storage backends --------------------------------------------------------
+
+CopyBufferSize = 1024*1024
+
+
+def CopyFileData(infile, out, maxFileSize=0, hash=None):
+    """
+    Copies the contents of the readable `infile` to the open file `out` and returns the
+    number of bytes written. Regular files are copied by the kernel with `os.copy_file_range`
+    or `os.sendfile` if supported. Other streams are copied in large buffered reads.
+    If `hash` is set data is always read and passed to `hash.update()`. 
+    Raises a ValueError if `maxFileSize` is exceeded.
+    """
+    if hash is None:
+        size = _CopyFileRange(infile, out, maxFileSize)
+        if size is not None:
+            return size
+    size = 0
+    while True:
+        data = infile.read(CopyBufferSize)
+        if not data:
+            break
+        size += len(data)
+        if maxFileSize and size > maxFileSize:
+            raise ValueError("File too big")
+        if hash is not None:
+            hash.update(data)
+        out.write(data)
+    return size
+
+
+def _CopyFileRange(infile, out, maxFileSize):
+    # kernel copy between regular files. returns None if not supported.
+    try:
+        infd = infile.fileno()
+        outfd = out.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+    if not stat.S_ISREG(os.fstat(infd).st_mode):
+        return None
+    pos = infile.tell()
+    length = os.fstat(infd).st_size - pos
+    if maxFileSize and length > maxFileSize:
+        raise ValueError("File too big")
+    out.flush()
+    copy = getattr(os, "copy_file_range", None)
+    size = 0
+    while size < length:
+        try:
+            if copy is not None:
+                n = copy(infd, outfd, length-size, pos+size)
+            else:
+                n = os.sendfile(outfd, infd, pos+size, length-size)
+        except OSError:
+            if size > 0:
+                raise
+            if copy is not None:
+                # e.g. not supported across file systems
+                copy = None
+                continue
+            return None
+        if n == 0:
+            break
+        size += n
+    infile.seek(pos+size)
+    out.seek(0, os.SEEK_END)
+    return size
+
+
+class LocalStorage(object):
+    """
+    Default file storage. Stores one physical file for each entry and file key. ::
+
+        root/id[-4:-2]00/id[-2:]/<id>_<filekey>_.<extension>
+
+    Storage backends are created by the pool and handle writing, copying and removing the
+    physical files. File paths are stored relative to the pool root in `pool_files.path`.
+    """
+
+    def __init__(self, pool):
+        self._pool = weakref.ref(pool)
+
+    @property
+    def pool(self):
+        return self._pool()
+
+    def Write(self, file, fileentry):
+        """
+        Writes the temp file and updates `file.path` and `file.size`.
+        """
+        maxFileSize = fileentry.maxFileSize
+        if file.size and file.size > maxFileSize:
+            raise ValueError("File too big")
+
+        # create temp path for current
+        backupPath = None
+        originalPath = DvPath(file.abspath())
+
+        newPath = DvPath(self.CreatePath(fileentry.id, file.filekey, file.filename))
+        tempPath = DvPath(str(newPath))
+        tempPath.SetName("_temp_" + str(uuid.uuid4()))
+        tempPath.SetExtension(newPath.GetExtension())
+        size = self._WriteTemp(file, tempPath, maxFileSize)
+
+        # store path for cleanup on success
+        if str(originalPath) and originalPath.Exists():
+            backupPath = DvPath(str(originalPath))
+            backupPath.SetName("_del_" + str(uuid.uuid4()))
+            backupPath.SetExtension(originalPath.GetExtension())
+            if originalPath.Exists() and not originalPath.Rename(backupPath):
+                tempPath.Delete()
+                raise IOError("Rename file failed")
+            file.deleteOnSuccess = str(backupPath)
+
+        try:
+            # rename temp path
+            os.renames(str(tempPath), str(newPath))
+            # update meta properties
+            file.path = self.RelativePath(str(newPath))
+            file.size = size
+            return True
+        except:
+            tempPath.Delete()
+            if backupPath:
+                backupPath.Rename(originalPath)
+            raise
+
+    def Duplicate(self, file, newEntry):
+        """
+        Returns a new file object to be committed for `newEntry` with the contents of `file`.
+        """
+        return self.pool.GetFileClass()(file=file, filename=file.filename, size=file.size, tempfile=True, fileentry=newEntry)
+
+    def Copy(self, file, id):
+        """
+        Copies the physical file of the file record (dictionary) for the entry `id`.
+        Returns the new path or None if the file does not exist.
+        """
+        source = self._AbsPath(file.get("path"))
+        if source is None or not source.IsFile():
+            return None
+        path = DvPath(self.CreatePath(id, file["filekey"], file["filename"] or source.GetNameExtension()))
+        path.CreateDirectories()
+        with open(str(source), "rb") as infile, open(str(path), "wb") as out:
+            CopyFileData(infile, out)
+        return self.RelativePath(str(path))
+
+    def Delete(self, file, entryID=None):
+        """
+        Removes the physical file or moves it to the trashcan. `entryID` is set if all files
+        of the entry are removed.
+        """
+        originalPath = DvPath(file.abspath())
+        if not originalPath.IsFile():
+            #not a file
+            return True
+        if originalPath.Exists() and not self.pool._MoveToTrashcan(originalPath, file.fileentry().id):
+            #Delete failed!
+            return False
+        return True
+
+    def Release(self, files):
+        """
+        Removes the physical files of deleted file records (dictionaries). Files are
+        moved to the trashcan if enabled.
+        """
+        for f in files:
+            if not f.get("path"):
+                continue
+            self._Release(f["path"], f.get("id") or 0)
+
+    def _Release(self, path, id):
+        aP = self._AbsPath(path)
+        if aP.IsFile():
+            self.pool._MoveToTrashcan(aP, id)
+
+    def _AbsPath(self, path):
+        # absolute path of the stored relative path
+        if not path:
+            return None
+        root = str(self.pool.root)
+        if path[:len(root)] != root:
+            aP = DvPath(root)
+            aP.AppendSeperator()
+            aP.Append(path)
+            return aP
+        return DvPath(path)
+
+    def Cleanup(self, file):
+        """
+        Removes replaced files after the entry has been committed
+        """
+        path = getattr(file, "deleteOnSuccess", None)
+        if not path:
+            return
+        try:
+            DvPath(path).Delete()
+        except:
+            pass
+
+    def CreatePath(self, id, key, filename):
+        """
+        Create the physical path of the file
+        """
+        pool = self.pool
+        aP = DvPath(str(pool.root))
+        aP.AppendSeperator()
+        aP.AppendDirectory(pool._GetDirectory(id))
+        aP.AppendSeperator()
+
+        aP.SetName("%06d_%s_" % (id, key))
+        aP.SetExtension(DvPath(filename).GetExtension())
+        return aP.GetStr()
+
+    def RelativePath(self, path):
+        p = path[len(str(self.pool.root)):]
+        p = p.replace("\\", "/")
+        return p
+
+    def _WriteTemp(self, file, tempPath, maxFileSize, hash=None):
+        # copy the file contents to the temp path. returns the size.
+        if tempPath.Exists():
+            tempPath.Delete()
+        tempPath.CreateDirectories()
+        source = file.file
+        opened = None
+        if isinstance(source, File) and not source.isTempFile() and source.abspath():
+            # copy from stored file
+            source = opened = open(source.abspath(), "rb")
+        elif source is None:
+            raise IOError("Tempfile is none")
+        out = None
+        try:
+            out = open(tempPath.GetStr(), "wb")
+            size = CopyFileData(source, out, maxFileSize, hash)
+            out.close()
+        except Exception as e:
+            try:
+                file.file.close()
+            except:
+                pass
+            try:
+                if out is not None:
+                    out.close()
+            except:
+                pass
+            # reset old file
+            tempPath.Delete()
+            raise
+        finally:
+            if opened is not None:
+                opened.close()
+        return size
+
+
+class BlobStorage(LocalStorage):
+    """
+    Content addressed file storage. Files are stored once for each content and named by
+    the sha256 hash of the contents ::
+
+        root/_blobs/<hash[:2]>/<hash[2:4]>/<hash>
+
+    Entries with the same file contents share the physical file. Duplicating an entry or
+    uploading the same file again does not copy any data. 
+
+    Physical files are never removed while records are written or deleted, because a
+    concurrent transaction may reference the same file again. Unreferenced files are
+    removed by `CollectGarbage()` after a grace period. Writing a file refreshes the
+    modification time of an existing blob, so files used by pending transactions are
+    kept.
+
+    Use the `migrateFileStorage` tool to convert existing files.
+    """
+    Directory = "_blobs"
+    GarbageGracePeriod = 24*60*60
+
+    def Write(self, file, fileentry):
+        """
+        Writes the temp file and updates `file.path` and `file.size`.
+        A previously stored file of the record is left for `CollectGarbage()`.
+        """
+        maxFileSize = fileentry.maxFileSize
+        if file.size and file.size > maxFileSize:
+            raise ValueError("File too big")
+
+        tempPath = self._BlobRoot()
+        tempPath.SetName("_temp_" + str(uuid.uuid4()))
+        hash = hashlib.sha256()
+        size = self._WriteTemp(file, tempPath, maxFileSize, hash)
+        blobPath = self.BlobPath(hash.hexdigest())
+        try:
+            if blobPath.Exists():
+                tempPath.Delete()
+                self._Touch(blobPath)
+            else:
+                blobPath.CreateDirectories()
+                os.replace(str(tempPath), str(blobPath))
+        except:
+            tempPath.Delete()
+            raise
+        file.path = self.RelativePath(str(blobPath))
+        file.size = size
+        return True
+
+    def Duplicate(self, file, newEntry):
+        """
+        Returns a new file object referencing the physical file of `file`.
+        """
+        return self.pool.GetFileClass()(filekey=file.filekey, filename=file.filename, size=file.size,
+                                        path=file.path, extension=file.extension, fileentry=newEntry)
+
+    def Delete(self, file, entryID=None):
+        """
+        Physical files are shared and only removed by `CollectGarbage()`.
+        """
+        return True
+
+    def Copy(self, file, id):
+        """
+        Returns the path of the file record. The physical file is shared.
+        """
+        source = self._AbsPath(file.get("path"))
+        if source is None or not source.IsFile():
+            return None
+        return file["path"]
+
+    def Release(self, files):
+        """
+        Physical files of deleted file records are removed by `CollectGarbage()`.
+        """
+        pass
+
+    def References(self, path, fileid=None, entryID=None):
+        """
+        Returns the number of file records referencing the path. Records with `fileid` or
+        of the entry `entryID` are not counted.
+        """
+        pool = self.pool
+        ph = pool.placeholder
+        sql = "SELECT COUNT(*) FROM %s WHERE path=%s" % (pool.FileTable, ph)
+        values = [path]
+        if fileid:
+            sql += " AND fileid<>%s" % ph
+            values.append(fileid)
+        if entryID:
+            sql += " AND id<>%s" % ph
+            values.append(entryID)
+        return pool.Query(sql, values)[0][0]
+
+    def BlobPath(self, digest):
+        """
+        Returns the physical path for the content hash
+        """
+        aP = self._BlobRoot()
+        aP.AppendDirectory(digest[:2])
+        aP.AppendDirectory(digest[2:4])
+        aP.SetName(digest)
+        return aP
+
+    def IsBlobPath(self, path):
+        """
+        Checks if the relative path points to the blob directory
+        """
+        return path.lstrip("/").startswith(self.Directory+"/")
+
+    def Import(self, path):
+        """
+        Adds an existing physical file to the storage and returns the relative blob path.
+        The file is hard linked if possible, otherwise copied. The original file is not removed.
+        """
+        hash = hashlib.sha256()
+        with open(path, "rb") as f:
+            data = f.read(CopyBufferSize)
+            while data:
+                hash.update(data)
+                data = f.read(CopyBufferSize)
+        blobPath = self.BlobPath(hash.hexdigest())
+        if blobPath.Exists():
+            self._Touch(blobPath)
+        else:
+            blobPath.CreateDirectories()
+            tempPath = self._BlobRoot()
+            tempPath.SetName("_temp_" + str(uuid.uuid4()))
+            try:
+                os.link(path, str(tempPath))
+            except OSError:
+                with open(path, "rb") as f, open(str(tempPath), "wb") as out:
+                    CopyFileData(f, out)
+            os.replace(str(tempPath), str(blobPath))
+        return self.RelativePath(str(blobPath))
+
+    def CollectGarbage(self, grace=None):
+        """
+        Removes physical files not referenced by any file record and not written or 
+        reused within the last `grace` seconds (default `GarbageGracePeriod`). The grace
+        period has to be longer than the longest running transaction. Returns the number 
+        of removed files.
+        """
+        if grace is None:
+            grace = self.GarbageGracePeriod
+        pool = self.pool
+        paths = set(r[0] for r in pool.Query("SELECT DISTINCT path FROM %s" % pool.FileTable))
+        root = str(self._BlobRoot())
+        limit = time.time() - grace
+        cnt = 0
+        for dirpath, dirnames, filenames in os.walk(root):
+            for name in filenames:
+                if name.startswith("_temp_"):
+                    continue
+                abspath = os.path.join(dirpath, name)
+                if self.RelativePath(abspath) in paths:
+                    continue
+                try:
+                    if os.stat(abspath).st_mtime > limit:
+                        continue
+                except OSError:
+                    continue
+                if self.pool._MoveToTrashcan(DvPath(abspath), 0):
+                    cnt += 1
+        return cnt
+
+    def _BlobRoot(self):
+        aP = DvPath(str(self.pool.root))
+        aP.AppendSeperator()
+        aP.AppendDirectory(self.Directory)
+        return aP
+
+    def _Touch(self, path):
+        # refreshes the modification time of a reused blob
+        try:
+            os.utime(str(path), None)
+        except OSError:
+            pass
+
+
+
 # file download iterators --------------------------------------------------------
 
 class FileIterable(object):
-    def __init__(self, file, start=None, stop=None):
+    """
+    WSGI app_iter for files with byte range support (`app_iter_range()`). Ranges share the 
+    file and do not open it again. The file is opened on iteration and closed by `close()`
+    or if all data has been read.
+    """
+
+    def __init__(self, file, start=None, stop=None, chunkSize=None):
         """
         'file' may be either a filename or a open and readable/seekable file object
         """
         self.file = file
         self.start = start
         self.stop = stop
+        self.chunkSize = chunkSize
+        self._iterator = None
 
     def __iter__(self):
-        return FileIterator(self.file, self.start, self.stop)
+        self._iterator = FileIterator(self.file, self.start, self.stop, self.chunkSize)
+        return self._iterator
     
     def app_iter_range(self, start, stop):
-        return self.__class__(self.file, start, stop)
+        return self.__class__(self.file, start, stop, self.chunkSize)
+
+    def close(self):
+        if self._iterator is not None:
+            self._iterator.close()
+        if not isinstance(self.file, str) and hasattr(self.file, "close"):
+            self.file.close()
 
 
 class FileIterator(object):
-    chunk_size = 10*1024
+    chunk_size = 64*1024
 
-    def __init__(self, file, start, stop):
+    def __init__(self, file, start, stop, chunkSize=None):
         if isinstance(file, str):
             self.fileobj = open(file, 'rb')
+            self.opened = True
         else:
             self.fileobj = file
+            self.opened = False
+        if chunkSize:
+            self.chunk_size = chunkSize
         if start:
             self.fileobj.seek(start)
         if stop is not None:
-            self.length = stop - start
+            self.length = stop - (start or 0)
         else:
             self.length = None
     
@@ -701,13 +1161,19 @@ class FileIterator(object):
     
     def __next__(self):
         if self.length is not None and self.length <= 0:
+            self.close()
             raise StopIteration
-        chunk = self.fileobj.read(self.chunk_size)
+        size = self.chunk_size
+        if self.length is not None and self.length < size:
+            size = self.length
+        chunk = self.fileobj.read(size)
         if not chunk:
+            self.close()
             raise StopIteration
         if self.length is not None:
             self.length -= len(chunk)
-            if self.length < 0:
-                # Chop off the extra:
-                chunk = chunk[:self.length]
         return chunk
+
+    def close(self):
+        if self.opened and not self.fileobj.closed:
+            self.fileobj.close()
@@ -437,6 +437,31 @@ class MySQLManager(DatabaseManager):
         return True
 
 
+    # Indexes --------------------------------------------------------------
+
+    # prefix length of indexes on text columns
+    textIndexLength = 255
+
+    def CreateIndex(self, tableName, columns, name=None):
+        if not self.IsDB():
+            return False
+        if not tableName or not columns:
+            return False
+        if not name:
+            name = self.IndexName(tableName, columns)
+        types = {}
+        for c, col in self.GetColumns(tableName).items():
+            if col["db"]:
+                types[c] = str(col["db"]["type"]).lower()
+        cols = []
+        for c in columns:
+            if "text" in types.get(c, "") or "blob" in types.get(c, ""):
+                c = "%s(%d)" % (c, self.textIndexLength)
+            cols.append(c)
+        self.db.execute("create index %s on %s (%s)" % (name, tableName, ",".join(cols)))
+        return True
+
+
     # physical database structure ----------------------------------------------------------------
 
     def GetDatabases(self):
@@ -29,7 +29,7 @@ from nive.utils.utils import STACKF
 
 from nive.utils.dataPool2.base import Base, Entry
 from nive.utils.dataPool2.base import NotFound
-from nive.utils.dataPool2.connection import Connection, ConnectionThreadLocal, ConnectionRequest
+from nive.utils.dataPool2.connection import Connection, ConnectionThreadLocal, ConnectionRequest, ConnectionPool
 
 from nive.utils.dataPool2.mysql.dbManager import MySQLManager
 from nive.utils.dataPool2.files import FileManager, FileEntry
@@ -140,6 +140,16 @@ class MySqlConnRequest(MySqlConnection, ConnectionRequest):
         MySqlConnection.__init__(self, config, connectNow)
 
 
+class MySqlConnPool(ConnectionPool, MySqlConnection):
+    """
+    Shares a pool of database connections across requests and threads. 
+    Connections are checked out for the time of a request. 
+    """
+
+    def __init__(self, config = None, connectNow = True):
+        ConnectionPool.__init__(self, config, connectNow)
+
+
 
 class MySql(FileManager, Base):
     """
@@ -149,12 +159,80 @@ class MySql(FileManager, Base):
     _ProgrammingError = MySQLdb.ProgrammingError
     _Warning = MySQLdb.Warning
     _DefaultConnection = MySqlConnRequest
+    _PoolConnection = MySqlConnPool
 
 
     def _GetInsertIDValue(self, cursor):
         cursor.execute("SELECT LAST_INSERT_ID()")
         return cursor.fetchone()[0]
 
+    def _InsertRows(self, table, flds, rows):
+        # rows are inserted with a single multi row statement. innodb assigns consecutive
+        # auto increment values to simple inserts unless innodb_autoinc_lock_mode=2
+        # (interleaved). LAST_INSERT_ID() returns the first one. In interleaved mode 
+        # rows are inserted one by one.
+        if not self._ConsecutiveInsertIDs():
+            return Base._InsertRows(self, table, flds, rows)
+        if isinstance(rows, int):
+            flds, rows = (), [()]*rows
+        if not rows:
+            return []
+        ph = self.placeholder
+        row = "(%s)" % ",".join([ph]*len(flds))
+        sql = "INSERT INTO %s (%s) VALUES %s" % (table, ",".join(flds), ",".join([row]*len(rows)))
+        if self._debug:
+            STACKF(0,sql+"\r\n",self._debug, self._log,name=self.name)
+        aC = self.connection.cursor()
+        try:
+            aC.execute(sql, [v for r in rows for v in r])
+            first = self._GetInsertIDValue(aC)
+        finally:
+            aC.close()
+        return list(range(first, first+len(rows)))
+
+    def _CopyRows(self, table, flds, ids):
+        # rows are copied with one insert select statement ordered by id. innodb assigns
+        # consecutive auto increment values to the bulk insert like in _InsertRows(). In 
+        # interleaved mode rows are copied one by one.
+        if not self._ConsecutiveInsertIDs():
+            return Base._CopyRows(self, table, flds, ids)
+        ids = sorted(set(ids))
+        if not ids:
+            return {}
+        ph = self.placeholder
+        cols = ",".join(flds)
+        if cols:
+            sql = "INSERT INTO %s (%s) SELECT %s FROM %s WHERE id IN (%s) ORDER BY id" % (table, cols, cols, table, ",".join([ph]*len(ids)))
+        else:
+            sql = "INSERT INTO %s (id) SELECT NULL FROM %s WHERE id IN (%s) ORDER BY id" % (table, table, ",".join([ph]*len(ids)))
+        if self._debug:
+            STACKF(0,sql+"\r\n",self._debug, self._log,name=self.name)
+        aC = self.connection.cursor()
+        try:
+            aC.execute(sql, ids)
+            if aC.rowcount != len(ids):
+                raise OperationalError("Copy failed. Rows not found in %s." % (table))
+            first = self._GetInsertIDValue(aC)
+        finally:
+            aC.close()
+        return dict(zip(ids, range(first, first+len(ids))))
+
+    def _ConsecutiveInsertIDs(self):
+        # checks innodb_autoinc_lock_mode once per pool
+        consecutive = getattr(self, "_consecutiveIDs", None)
+        if consecutive is None:
+            aC = self.connection.cursor()
+            try:
+                aC.execute("SELECT @@innodb_autoinc_lock_mode")
+                r = aC.fetchone()
+                consecutive = r is not None and r[0] is not None and int(r[0]) < 2
+            except (self._OperationalError, self._ProgrammingError):
+                consecutive = False
+            finally:
+                aC.close()
+            self._consecutiveIDs = consecutive
+        return consecutive
+
                
     def _CreateNewID(self, table = "", dataTbl = None):
         #
@@ -201,6 +279,25 @@ class MySql(FileManager, Base):
         return aID, 0
 
 
+    def EstimateCount(self, sql, values = None):
+        """
+        Returns the query planner estimate of the number of selected records.
+        """
+        c = self.Execute("EXPLAIN " + sql, values)
+        names = [d[0].lower() for d in c.description]
+        recs = c.fetchall()
+        c.close()
+        if not recs or "rows" not in names:
+            return None
+        return int(recs[0][names.index("rows")] or 0)
+
+    def _OpenStreamCursor(self):
+        # server side cursors block the connection until all records are read. 
+        # a separate connection is used. it does not see uncommitted changes of the
+        # current transaction.
+        conn = self.connection.PrivateConnection()
+        return conn.cursor(MySQLdb.cursors.SSCursor), conn
+
     # types/classes -------------------------------------------------------------------
 
     def _GetPoolEntry(self, id, **kw):
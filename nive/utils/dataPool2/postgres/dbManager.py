@@ -274,6 +274,27 @@ class PostgresManager(DatabaseManager):
         return table
 
 
+    def GetIndexes(self, tableName):
+        """
+        returns a dict of secondary indexes {name: (column, ...)}
+        """
+        if not self.IsDB():
+            return {}
+        if not self.IsTable(tableName):
+            return {}
+        sql = """SELECT i.relname, a.attname FROM pg_class t
+                 JOIN pg_index ix ON t.oid = ix.indrelid
+                 JOIN pg_class i ON i.oid = ix.indexrelid
+                 JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = ANY(ix.indkey)
+                 WHERE t.relname = %s AND NOT ix.indisprimary AND NOT ix.indisunique
+                 ORDER BY i.relname, array_position(ix.indkey::int2[], a.attnum)"""
+        self.db.execute(sql, (tableName.lower(),))
+        indexes = {}
+        for c in self.db.fetchall():
+            indexes.setdefault(c[0], []).append(c[1])
+        return dict([(name, tuple(cols)) for name, cols in indexes.items()])
+
+
     # Tables --------------------------------------------------------------
     """
     inTableEntrys --> ColumnName ColumnDataTyp ColumnOptions
@@ -370,3 +391,26 @@ class PostgresManager(DatabaseManager):
         return self.CreateColumn(tableName, columnName, "SERIAL PRIMARY KEY")
 
 
+    # Indexes --------------------------------------------------------------
+
+    # columns selected with LIKE 'prefix%'. the default operator class supports LIKE 
+    # only with the C collation.
+    patternColumns = ("pool_path",)
+
+    def CreateIndex(self, tableName, columns, name=None):
+        if not self.IsDB():
+            return False
+        if not tableName or not columns:
+            return False
+        if not name:
+            name = self.IndexName(tableName, columns)
+        cols = [c+" text_pattern_ops" if c in self.patternColumns else c for c in columns]
+        self.db.execute("create index %s on %s (%s)" % (name, tableName, ",".join(cols)))
+        return True
+
+
+    def DropIndex(self, tableName, name):
+        if not self.IsDB():
+            return False
+        self.db.execute("drop index %s" % (name))
+        return True
@@ -10,6 +10,8 @@ Data Pool Postgres Module
 
 
 import threading
+import uuid
+import json
 
 from nive.definitions import ConfigurationError
 try:
@@ -36,7 +38,7 @@ from nive.utils.utils import STACKF
 
 from nive.utils.dataPool2.base import Base, Entry
 from nive.utils.dataPool2.base import NotFound
-from nive.utils.dataPool2.connection import Connection, ConnectionThreadLocal, ConnectionRequest
+from nive.utils.dataPool2.connection import Connection, ConnectionThreadLocal, ConnectionRequest, ConnectionPool
 
 from nive.utils.dataPool2.postgres.dbManager import PostgresManager
 from nive.utils.dataPool2.files import FileManager, FileEntry
@@ -134,6 +136,16 @@ class PgConnRequest(PostgresConnection, ConnectionRequest):
         PostgresConnection.__init__(self, config, connectNow)
 
 
+class PgConnPool(ConnectionPool, PostgresConnection):
+    """
+    Shares a pool of database connections across requests and threads. 
+    Connections are checked out for the time of a request. 
+    """
+
+    def __init__(self, config = None, connectNow = True):
+        ConnectionPool.__init__(self, config, connectNow)
+
+
 class PostgreSql(FileManager, Base):
     """
     Data Pool Postgres implementation
@@ -142,34 +154,58 @@ class PostgreSql(FileManager, Base):
     _ProgrammingError = psycopg2.ProgrammingError
     _Warning = psycopg2.Warning
     _DefaultConnection = PgConnRequest#PgConnThreadLocal
+    _PoolConnection = PgConnPool
             
 
-    def GetContainedIDs(self, base=0, sort="title", parameter=""):
-        """
-        select list of all entries
-        id needs to be first field, pool_unitref second
-        """
-        def _SelectIDs(base, ids, sql, cursor):
-            cursor.execute(sql%(base))
-            entries = cursor.fetchall()
-            for e in entries:
-                ids.append(e[0])
-                ids = _SelectIDs(e[0], ids, sql, cursor)
-            return ids
-        if parameter != "":
-            parameter = "AND " + parameter
-        parameter = ("WHERE pool_unitref=%d", parameter)
-        sql = """SELECT id FROM %s %s ORDER BY %s""" % (self.MetaTable, " ".join(parameter), sort)
-        cursor = self.connection.cursor()
-        ids = _SelectIDs(base, [], sql, cursor)
-        cursor.close()
-        return ids
-    
-    
     def _GetInsertIDValue(self, cursor):
         cursor.execute("SELECT LASTVAL()")
         return cursor.fetchone()[0]
 
+    def _InsertRows(self, table, flds, rows):
+        # ids are allocated from the table sequence in one block. rows are inserted with
+        # a single multi row statement returning the new ids.
+        if isinstance(rows, int):
+            sql = "INSERT INTO %s (id) SELECT nextval(pg_get_serial_sequence('%s','id')) FROM generate_series(1,%d) RETURNING id" % (table, table, rows)
+            values = []
+        else:
+            if not rows:
+                return []
+            ph = self.placeholder
+            row = "(%s)" % ",".join([ph]*len(flds))
+            sql = "INSERT INTO %s (%s) VALUES %s RETURNING id" % (table, ",".join(flds), ",".join([row]*len(rows)))
+            values = [v for r in rows for v in r]
+        if self._debug:
+            STACKF(0,sql+"\r\n",self._debug, self._log,name=self.name)
+        aC = self.connection.cursor()
+        try:
+            aC.execute(sql, values)
+            ids = [r[0] for r in aC.fetchall()]
+        finally:
+            aC.close()
+        return ids
+
+    def _CopyRows(self, table, flds, ids):
+        # ids are allocated from the table sequence in one block and assigned to the copies 
+        # in a single insert select statement.
+        ids = sorted(set(ids))
+        if not ids:
+            return {}
+        aC = self.connection.cursor()
+        try:
+            aC.execute("SELECT nextval(pg_get_serial_sequence('%s','id')) FROM generate_series(1,%d)" % (table, len(ids)))
+            newids = dict(zip(ids, [r[0] for r in aC.fetchall()]))
+            case = "CASE id %s END" % " ".join(["WHEN %d THEN %d" % (id, newids[id]) for id in ids])
+            cols = "".join([","+f for f in flds])
+            sql = "INSERT INTO %s (id%s) SELECT %s%s FROM %s WHERE id IN (%s)" % (table, cols, case, cols, table, ",".join([self.placeholder]*len(ids)))
+            if self._debug:
+                STACKF(0,sql+"\r\n",self._debug, self._log,name=self.name)
+            aC.execute(sql, ids)
+            if aC.rowcount != len(ids):
+                raise OperationalError("Copy failed. Rows not found in %s." % (table))
+        finally:
+            aC.close()
+        return newids
+
     def _CreateNewID(self, table = "", dataTbl = None):
         aC = self.connection.cursor()
         if table == "":
@@ -213,6 +249,25 @@ class PostgreSql(FileManager, Base):
         aC.close()
         return aID, 0
 
+    def EstimateCount(self, sql, values = None):
+        """
+        Returns the query planner estimate of the number of selected records.
+        """
+        recs = self.Query("EXPLAIN (FORMAT JSON) " + sql, values)
+        try:
+            plan = recs[0][0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]["Plan"]["Plan Rows"])
+        except (IndexError, KeyError, TypeError, ValueError):
+            return None
+
+    def _OpenStreamCursor(self):
+        # named cursors are executed server side
+        cursor = self.connection.dbapi.cursor(name="nive_%s" % uuid.uuid4().hex)
+        cursor.itersize = self._StreamBatchSize
+        return cursor, None
+
     # types/classes -------------------------------------------------------------------
 
 
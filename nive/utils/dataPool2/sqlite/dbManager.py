@@ -244,6 +244,25 @@ class Sqlite3Manager(DatabaseManager):
         return table
 
 
+    def GetIndexes(self, tableName):
+        """
+        returns a dict of secondary indexes {name: (column, ...)}
+        """
+        if not self.IsDB():
+            return {}
+        if not self.IsTable(tableName):
+            return {}
+        self.db.execute("PRAGMA index_list(%s)" % (tableName))
+        indexes = {}
+        # seq, name, unique, ...
+        for c in self.db.fetchall():
+            if c[2]:
+                continue
+            self.db.execute("PRAGMA index_info(%s)" % (c[1]))
+            indexes[c[1]] = tuple([i[2] for i in sorted(self.db.fetchall())])
+        return indexes
+
+
     # Tables --------------------------------------------------------------
     """
     inTableEntrys --> ColumnName ColumnDataTyp ColumnOptions
@@ -328,6 +347,15 @@ class Sqlite3Manager(DatabaseManager):
         return self.CreateColumn(tableName, columnName, "INTEGER PRIMARY KEY AUTOINCREMENT")
 
 
+    # Indexes --------------------------------------------------------------
+
+    def DropIndex(self, tableName, name):
+        if not self.IsDB():
+            return False
+        self.db.execute("drop index %s" % (name))
+        return True
+
+
     # Database Options ------------------------------------------------------------
 
     def IsDatabase(self, databaseName):
@@ -15,7 +15,7 @@ from nive.definitions import ConfigurationError
 
 from nive.utils.dataPool2.base import Base, Entry
 from nive.utils.dataPool2.base import NotFound
-from nive.utils.dataPool2.connection import Connection, ConnectionThreadLocal, ConnectionRequest
+from nive.utils.dataPool2.connection import Connection, ConnectionThreadLocal, ConnectionRequest, ConnectionPool
 from nive.utils.utils import ConvertListToStr
 
 from nive.utils.dataPool2.files import FileManager, FileEntry
@@ -58,6 +58,14 @@ class Sqlite3Connection(Connection):
     def connect(self):
         """ Close and connect to server """
         #t = time()
+        db = self._Open()
+        self._set(db)
+        #print "connect:", time() - t
+        return db
+
+
+    def _Open(self):
+        """ Opens and returns a new raw connection in autocommit mode """
         conf = self.configuration
         if not conf.dbName:
             raise OperationalError("Connection failed. Database name is empty.") 
@@ -70,8 +78,6 @@ class Sqlite3Connection(Connection):
         #c.execute("PRAGMA temp_store = MEMORY")
         c.execute("PRAGMA synchronous = OFF")
         c.close()
-        self._set(db)
-        #print "connect:", time() - t
         return db
 
 
@@ -137,6 +143,18 @@ class Sqlite3ConnRequest(Sqlite3Connection, ConnectionRequest):
             self.connect()
     
 
+class Sqlite3ConnPool(ConnectionPool, Sqlite3Connection):
+    """
+    Shares a pool of database connections across requests and threads. 
+    Connections are checked out for the time of a request. 
+    """
+
+    def __init__(self, config = None, connectNow = True):
+        Sqlite3Connection.__init__(self, config, False)
+        # pooled connections are passed between threads
+        self.check_same_thread = False
+        ConnectionPool.__init__(self, config, connectNow)
+
 
 
 class Sqlite3(FileManager, Base):
@@ -145,62 +163,80 @@ class Sqlite3(FileManager, Base):
     """
     _OperationalError = sqlite3.OperationalError
     _DefaultConnection = Sqlite3ConnRequest
+    _PoolConnection = Sqlite3ConnPool
     _EmptyValues = []
+    _MaxBatchSize = 900
 
 
-    def GetContainedIDs(self, base=0, sort="title", parameter=""):
-        """
-        select list of all entries
-        id needs to be first field, pool_unitref second
-        """
-        def _SelectIDs(base, ids, sql, cursor):
-            cursor.execute(sql%(base))
-            entries = cursor.fetchall()
-            for e in entries:
-                ids.append(e[0])
-                ids = _SelectIDs(e[0], ids, sql, cursor)
-            return ids
-        parameter = "where pool_unitref=%d " + parameter
-        sql = """select id from %s %s order by %s""" % (self.MetaTable, parameter, sort)
-        cursor = self.connection.cursor()
-        ids = _SelectIDs(base, [], sql, cursor)
-        cursor.close()
+    def _GetInsertIDValue(self, cursor):
+        cursor.execute("SELECT last_insert_rowid()")
+        return cursor.fetchone()[0]
+
+
+    def _InsertRows(self, table, flds, rows):
+        # rows are inserted with one multi row statement per block. a single statement 
+        # locks the database for writing, so sqlite assigns consecutive rowids and 
+        # last_insert_rowid() returns the last one. the connection runs in autocommit
+        # mode, executemany() would commit each row separately.
+        if isinstance(rows, int):
+            flds, rows = ("id",), [(None,)]*rows
+        if not rows:
+            return []
+        ph = self.placeholder
+        row = "(%s)" % ",".join([ph]*len(flds))
+        # stay below the default limit of 999 sql variables
+        size = max(1, 999//len(flds))
+        ids = []
+        aC = self.connection.cursor()
+        try:
+            for i in range(0, len(rows), size):
+                block = rows[i:i+size]
+                sql = "INSERT INTO %s (%s) VALUES %s" % (table, ",".join(flds), ",".join([row]*len(block)))
+                if self._debug:
+                    STACKF(0,sql+"\r\n",self._debug, self._log, name=self.name)
+                aC.execute(sql, [v for r in block for v in r])
+                aC.execute("SELECT last_insert_rowid()")
+                last = aC.fetchone()[0]
+                ids.extend(range(last-len(block)+1, last+1))
+        finally:
+            aC.close()
         return ids
 
 
-    def GetTree(self, flds=None, sort="title", base=0, parameter=""):
-        """
-        select list of all entries
-        id needs to be first field if flds
-        """
-        if flds is None:
-            flds = ["id"]
-        def _Select(base, tree, flds, sql, cursor):
-            cursor.execute(sql%(base))
-            entries = cursor.fetchall()
-            for e in entries:
-                data = self.ConvertRecToDict(e, flds)
-                data.update({"id": e[0], "items": []})
-                tree["items"].append(data)
-                data = _Select(e[0], data, flds, sql, cursor)
-            return tree
-
-        if parameter != "":
-            parameter = "and " + parameter
-        parameter = "where pool_unitref=%d " + parameter
-        sql = """select %s from %s %s order by %s""" % (ConvertListToStr(flds), self.MetaTable, parameter, sort)
-        cursor = self.connection.cursor()
-        tree = {"id":base, "items":[]}
-        tree = _Select(base, tree, flds, sql, cursor)
-        cursor.close()
-        return tree
+    def _PathCondition(self, path):
+        # LIKE is case insensitive in sqlite and cannot use the default index. Paths only
+        # contain digits and slashes, so the case sensitive GLOB is used.
+        return "%s GLOB %s" % (self.PathIndexField, self.placeholder), path+"*"
 
+    def _ConcatSQL(self, *values):
+        return "(%s)" % ("||".join(values))
+
+    def _CopyRows(self, table, flds, ids):
+        # rows are copied with one insert select statement ordered by id. the new rowids
+        # are consecutive like in _InsertRows().
+        ids = sorted(set(ids))
+        if not ids:
+            return {}
+        ph = self.placeholder
+        cols = ",".join(flds)
+        if cols:
+            sql = "INSERT INTO %s (%s) SELECT %s FROM %s WHERE id IN (%s) ORDER BY id" % (table, cols, cols, table, ",".join([ph]*len(ids)))
+        else:
+            sql = "INSERT INTO %s (id) SELECT NULL FROM %s WHERE id IN (%s) ORDER BY id" % (table, table, ",".join([ph]*len(ids)))
+        if self._debug:
+            STACKF(0,sql+"\r\n",self._debug, self._log, name=self.name)
+        aC = self.connection.cursor()
+        try:
+            aC.execute(sql, ids)
+            if aC.rowcount != len(ids):
+                raise OperationalError("Copy failed. Rows not found in %s." % (table))
+            aC.execute("SELECT last_insert_rowid()")
+            last = aC.fetchone()[0]
+        finally:
+            aC.close()
+        return dict(zip(ids, range(last-len(ids)+1, last+1)))
 
-    def _GetInsertIDValue(self, cursor):
-        cursor.execute("SELECT last_insert_rowid()")
-        return cursor.fetchone()[0]
 
-               
     def _CreateNewID(self, table = "", dataTbl = None):
         #
         aC = self.connection.cursor()
@@ -96,6 +96,25 @@ class Sqlite3Test(unittest.TestCase):
         self._deltable()
 
 
+
+    def test_Indexes(self):
+        self._createtbl()
+        self.assertTrue(self.db.UpdateStructure(tablename, SystemFlds))
+        indexes = [("pool_unitref",), ("pool_datatbl", "pool_state"), ("missing",)]
+        result = self.db.UpdateIndexes(tablename, indexes)
+        self.assertEqual(result["created"], [tablename+"_pool_unitref", tablename+"_pool_datatbl_pool_state"])
+        self.assertEqual(result["missing"], [("missing",)])
+        self.assertEqual(self.db.GetIndexes(tablename)[tablename+"_pool_datatbl_pool_state"], ("pool_datatbl", "pool_state"))
+        # second run
+        result = self.db.UpdateIndexes(tablename, indexes[:1])
+        self.assertEqual(result["created"], [])
+        self.assertEqual(list(result["existing"].keys()), [tablename+"_pool_unitref"])
+        self.assertEqual(list(result["unused"].keys()), [tablename+"_pool_datatbl_pool_state"])
+        result = self.db.UpdateIndexes(tablename, indexes[:1], drop=[tablename+"_pool_datatbl_pool_state"])
+        self.assertEqual(result["dropped"], [tablename+"_pool_datatbl_pool_state"])
+        self.assertEqual(list(self.db.GetIndexes(tablename).keys()), [tablename+"_pool_unitref"])
+        self._deltable()
+
     
     def _createtbl(self):
         try:
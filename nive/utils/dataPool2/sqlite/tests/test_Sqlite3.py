@@ -3,7 +3,8 @@ import unittest
 
 from nive.definitions import DatabaseConf
 from nive.utils.path import DvPath
-from nive.utils.dataPool2.sqlite.sqlite3Pool import Sqlite3
+from nive.utils.dataPool2.sqlite.sqlite3Pool import Sqlite3, Sqlite3ConnPool
+from nive.definitions import OperationalError
 
 from nive.utils.dataPool2.tests import test_db
 from nive.utils.dataPool2.tests import test_Base
@@ -35,3 +36,94 @@ class Sqlite3Test(test_db.dbTest, SqliteTestCase):
         self.pool.Close()
 
 
+
+
+class Sqlite3PooledTest(Sqlite3Test):
+    """
+    Runs nive.utils.dataPool2.tests.test_db for pooled sqlite connections
+    """
+
+    def setUp(self):
+        dbfile = DvPath(DB_CONF["dbName"])
+        if not dbfile.IsFile():
+            dbfile.CreateDirectories()
+        conn = Sqlite3ConnPool(DatabaseConf(DB_CONF, poolSize=2), connectNow=False)
+        p = Sqlite3(connection=conn, **test_Base.conf)
+        p.structure.Init(structure=test_Base.struct, stdMeta=test_Base.struct["pool_meta"])
+        self.pool = p
+        self.pool.connection.connect()
+
+
+class Sqlite3ConnPoolTest(SqliteTestCase):
+
+    def setUp(self):
+        dbfile = DvPath(DB_CONF["dbName"])
+        if not dbfile.IsFile():
+            dbfile.CreateDirectories()
+        self.conn = Sqlite3ConnPool(DatabaseConf(DB_CONF, poolSize=2, poolMinSize=1, poolTimeout=0.1), connectNow=True)
+
+    def tearDown(self):
+        self.conn.close()
+        self.conn.Dispose()
+
+    def test_fill(self):
+        stats = self.conn.GetPoolStats()
+        self.assertEqual(stats["size"], 1)
+        self.assertEqual(stats["idle"], 1)
+        self.assertEqual(stats["inuse"], 0)
+
+    def test_checkout(self):
+        db = self.conn.dbapi
+        c = db.cursor()
+        c.execute("SELECT 1")
+        c.close()
+        stats = self.conn.GetPoolStats()
+        self.assertEqual(stats["inuse"], 1)
+        self.assertEqual(stats["checkouts"], 1)
+        self.assertEqual(stats["created"], 1)
+        # returned to pool and reused
+        self.conn.close()
+        stats = self.conn.GetPoolStats()
+        self.assertEqual(stats["inuse"], 0)
+        self.assertEqual(stats["idle"], 1)
+        self.conn.dbapi
+        stats = self.conn.GetPoolStats()
+        self.assertEqual(stats["created"], 1)
+        self.assertEqual(stats["checkouts"], 2)
+
+    def test_exhausted(self):
+        db1 = self.conn._Checkout()
+        db2 = self.conn._Checkout()
+        self.assertRaises(OperationalError, self.conn._Checkout)
+        stats = self.conn.GetPoolStats()
+        self.assertEqual(stats["waits"], 1)
+        self.assertEqual(stats["timeouts"], 1)
+        self.conn._Checkin(db1)
+        self.conn._Checkin(db2)
+        self.assertEqual(self.conn.GetPoolStats()["inuse"], 0)
+
+    def test_eviction(self):
+        conf = DatabaseConf(DB_CONF, poolSize=2, poolIdleTime=0.0001)
+        conn = Sqlite3ConnPool(conf, connectNow=False)
+        db = conn._Checkout()
+        conn._Checkin(db)
+        self.assertEqual(conn.GetPoolStats()["idle"], 1)
+        import time
+        time.sleep(0.01)
+        conn._Checkin(conn._Checkout())
+        stats = conn.GetPoolStats()
+        self.assertEqual(stats["evicted"], 1)
+        conn.Dispose()
+
+    def test_verify(self):
+        conf = DatabaseConf(DB_CONF, verifyConnection=True)
+        conn = Sqlite3ConnPool(conf, connectNow=False)
+        db = conn._Checkout()
+        conn._Checkin(db)
+        db.close()
+        # broken connection is discarded on checkout
+        db = conn._Checkout()
+        db.cursor().execute("SELECT 1")
+        conn._Checkin(db)
+        self.assertEqual(conn.GetPoolStats()["discarded"], 1)
+        conn.Dispose()
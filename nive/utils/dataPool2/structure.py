@@ -127,6 +127,16 @@ class Wrapper:
     def GetTempKey(self, key):        return self._temp_.get(key)
     def HasTempKey(self, key):        return key in self._temp_
 
+    def HasChanged(self, key):
+        """
+        True if the temp value differs from the loaded content. 
+        """
+        if key not in self._temp_:
+            return False
+        if not self._content_ or key not in self._content_:
+            return True
+        return self._content_[key] != self._temp_[key]
+
     def GetEntry(self):                return self._entry_()
 
     def SetContent(self, content):
@@ -217,6 +227,51 @@ class FileWrapper(Wrapper):
 #  Pool Structure ---------------------------------------------------------------------------
 
 
+class CallbackRegistry(dict):
+    """
+    Datatype callback dictionary. Resets the compiled converters of the structure if
+    callbacks are added or removed.
+    """
+
+    def __init__(self, structure, callbacks=None):
+        dict.__init__(self, callbacks or {})
+        self._structure = structure
+
+    def _Changed(self):
+        self._structure._converters = {}
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        self._Changed()
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self._Changed()
+
+    def update(self, *args, **kw):
+        dict.update(self, *args, **kw)
+        self._Changed()
+
+    def setdefault(self, key, default=None):
+        value = dict.setdefault(self, key, default)
+        self._Changed()
+        return value
+
+    def pop(self, key, *default):
+        value = dict.pop(self, key, *default)
+        self._Changed()
+        return value
+
+    def popitem(self):
+        item = dict.popitem(self)
+        self._Changed()
+        return item
+
+    def clear(self):
+        dict.clear(self)
+        self._Changed()
+
+
 class PoolStructure(object):
     """
     Data Pool 2 Structure handling. Defines a table field mapping. If field types are available serializing 
@@ -268,6 +323,9 @@ class PoolStructure(object):
     If fieldtype (`fieldtypes`) information is not given json data is stored with `_json_`
     prefix.
 
+    Converter functions for each table and field are compiled once and reset if `Init()` is 
+    called or the callback registries `serializeCallbacks` and `deserializeCallbacks` are
+    changed. Use `serialize_rows()` and `deserialize_rows()` to convert multiple records.
     """
     MetaTable = "pool_meta"
     
@@ -276,8 +334,10 @@ class PoolStructure(object):
         self.stdMeta = ()
         self.structure = {}
         self.fieldtypes = {}
-        self.serializeCallbacks = {}
-        self.deserializeCallbacks = {}
+        self._serializeCallbacks = CallbackRegistry(self)
+        self._deserializeCallbacks = CallbackRegistry(self)
+        self._converters = {}
+        self.queryCache = {}
         self.codepage = codepage
         self.pytimezone = tzinfo
         if structure:
@@ -286,6 +346,8 @@ class PoolStructure(object):
 
     def Init(self, structure, fieldtypes=None, stdMeta=None, codepage="utf-8", tzinfo=None, **kw):
         s = structure.copy()
+        self.queryCache = {}
+        self._converters = {}
         self.codepage = codepage
         self.pytimezone = tzinfo
         meta = list(s[self.MetaTable])
@@ -305,6 +367,29 @@ class PoolStructure(object):
         if stdMeta:
             self.stdMeta = tuple(stdMeta)
 
+        # compile converters
+        for table in self.fieldtypes:
+            self._Converters(table, 0)
+            self._Converters(table, 1)
+
+    @property
+    def serializeCallbacks(self):
+        return self._serializeCallbacks
+
+    @serializeCallbacks.setter
+    def serializeCallbacks(self, callbacks):
+        self._serializeCallbacks = CallbackRegistry(self, callbacks)
+        self._converters = {}
+
+    @property
+    def deserializeCallbacks(self):
+        return self._deserializeCallbacks
+
+    @deserializeCallbacks.setter
+    def deserializeCallbacks(self, callbacks):
+        self._deserializeCallbacks = CallbackRegistry(self, callbacks)
+        self._converters = {}
+
 
     def IsEmpty(self):
         return self.structure=={}
@@ -328,52 +413,146 @@ class PoolStructure(object):
     
     def serialize(self, table, field, value):
         # if field==None and value is a dictionary multiple values are serialized
+        converters = self._Converters(table, 0)
         if field is None and isinstance(value, dict):
             newdict = {}
-            for field, v in list(value.items()):
-                try:        t = self.fieldtypes[table][field]
-                except:     t = None
-                newdict[field] = self._se(v, t, field)
+            for field, v in value.items():
+                try:
+                    fnc = converters[field]
+                except KeyError:
+                    newdict[field] = self._se(v, None, field)
+                    continue
+                newdict[field] = fnc(v) if fnc is not None else v
             return newdict
-        else:
-            try:        t = self.fieldtypes[table][field]
-            except:     t = None
-            value = self._se(value, t, field)
-        return value
+        try:
+            fnc = converters[field]
+        except (KeyError, TypeError):
+            return self._se(value, None, field)
+        return fnc(value) if fnc is not None else value
         
 
     def deserialize(self, table, field, value):
         # if field==None and value is a dictionary multiple values are deserialized
+        converters = self._Converters(table, 1)
         if field is None and isinstance(value, dict):
             newdict = {}
-            for field, v in list(value.items()):
-                try:        t = self.fieldtypes[table][field]
-                except:     t = None
-                newdict[field] = self._de(v, t, field)
+            for field, v in value.items():
+                try:
+                    fnc = converters[field]
+                except KeyError:
+                    newdict[field] = self._de(v, None, field)
+                    continue
+                newdict[field] = fnc(v) if fnc is not None else v
             return newdict
-        else:
-            try:        t = self.fieldtypes[table][field]
-            except:     t = None
-            value = self._de(value, t, field)
-        return value
+        try:
+            fnc = converters[field]
+        except (KeyError, TypeError):
+            return self._de(value, None, field)
+        return fnc(value) if fnc is not None else value
+
+
+    def serialize_rows(self, table, fields, rows):
+        """
+        Serializes multiple records. `rows` is a list of value sequences ordered like `fields`.
+        returns a list of value lists
+        """
+        fncs = self._RowConverters(table, fields, 0)
+        return [[v if fnc is None else fnc(v) for fnc, v in zip(fncs, row)] for row in rows]
+
+
+    def deserialize_rows(self, table, fields, rows):
+        """
+        Deserializes multiple records. `rows` is a list of value sequences ordered like `fields`.
+        returns a list of dictionaries
+        """
+        fields = tuple(fields)
+        fncs = self._RowConverters(table, fields, 1)
+        return [dict(zip(fields, [v if fnc is None else fnc(v) for fnc, v in zip(fncs, row)])) for row in rows]
+
+
+    def _RowConverters(self, table, fields, mode):
+        # converter functions for the fields. unknown fields are converted without datatype.
+        converters = self._Converters(table, mode)
+        fncs = []
+        for field in fields:
+            if field in converters:
+                fncs.append(converters[field])
+            else:
+                fncs.append(self._CompileConverter(None, field, mode))
+        return fncs
+
+
+    def _Converters(self, table, mode):
+        # returns the compiled converters {field: function or None} of the table. 
+        # mode 0 = serialize, 1 = deserialize
+        key = (table, mode)
+        try:
+            return self._converters[key]
+        except KeyError:
+            pass
+        converters = {}
+        for field, fieldtype in (self.fieldtypes.get(table) or {}).items():
+            converters[field] = self._CompileConverter(fieldtype, field, mode)
+        self._converters[key] = converters
+        return converters
+
+
+    def _CompileConverter(self, fieldtype, field, mode):
+        # returns the type specific conversion function or None
+        if mode == 1:
+            return self.GetDeserializer(fieldtype, field)
+        if isinstance(fieldtype, dict):
+            fieldtype = fieldtype["datatype"]
+        if fieldtype in self.serializeCallbacks:
+            callback = self.serializeCallbacks[fieldtype]
+            return lambda value: callback(value, field)
+        if not fieldtype:
+            return self._se_untyped
+        if fieldtype in ("file", "binary"):
+            return None
+        name = self._Serializers.get(fieldtype)
+        if name is None:
+            return self._se_string
+        return getattr(self, name)
+
+    # serializer functions by datatype
+    _Serializers = {"number": "_se_number", "float": "_se_float", "date": "_se_datetime", 
+                    "datetime": "_se_datetime", "time": "_se_time", "timestamp": "_se_timestamp", 
+                    "list": "_se_list", "radio": "_se_list", "multilist": "_se_multilist", 
+                    "checkbox": "_se_multilist", "mselection": "_se_multilist", 
+                    "mcheckboxes": "_se_multilist", "urllist": "_se_multilist", 
+                    "unitlist": "_se_multilist", "bool": "_se_bool", "json": "_se_json"}
+
+
+    def GetDeserializer(self, fieldtype, field=None):
+        """
+        Returns a function converting database values of the datatype ``fnc(value)`` or None
+        if values are returned unchanged. Use for many values of the same field.
+        """
+        if isinstance(fieldtype, dict):
+            fieldtype = fieldtype["datatype"]
+        if fieldtype in self.deserializeCallbacks:
+            callback = self.deserializeCallbacks[fieldtype]
+            return lambda value: callback(value, field)
+        if not fieldtype:
+            return self._de_untyped
+        name = self._Deserializers.get(fieldtype)
+        if name is None:
+            return None
+        return getattr(self, name)
+
+    # deserializer functions by datatype
+    _Deserializers = {"datetime": "_de_datetime", "date": "_de_date", "time": "_de_time", 
+                      "timestamp": "_de_timestamp", "multilist": "_de_multilist", 
+                      "checkbox": "_de_multilist", "mselection": "_de_multilist", 
+                      "mcheckboxes": "_de_multilist", "urllist": "_de_multilist", 
+                      "unitlist": "_de_unitlist", "json": "_de_json"}
 
 
     def _se(self, value, fieldtype, field):
         if not fieldtype:
             # no datatype information set
-            if isinstance(value, datetime):
-                return value.strftime("%Y-%m-%d %H:%M:%S")
-            elif isinstance(value, timedelta):  # treat as time. py3 mysql bug?
-                n = datetime(year=2000, month=1, day=1, hour=0, minute=0, second=0) + value
-                return n.strftime("%H:%M:%S")
-            elif isinstance(value, (list, tuple)):
-                if isinstance(value[0], bytes):
-                    # list of strings:
-                    value = [str(v, self.codepage) for v in value]
-                value = "_json_"+json.dumps(value)
-            elif isinstance(value, bytes):
-                value = str(value, self.codepage)
-            return value
+            return self._se_untyped(value)
         
         if isinstance(fieldtype, dict):
             fieldtype = fieldtype["datatype"]
@@ -381,98 +560,132 @@ class PoolStructure(object):
         # call serialize callback function
         if fieldtype in self.serializeCallbacks:
             return self.serializeCallbacks[fieldtype](value, field)
-            
-        if fieldtype == "number":
-            if isinstance(value, str):
-                value = int(value)
-            elif isinstance(value, float):
-                value = int(value)
-        
-        elif fieldtype == "float":
-            if isinstance(value, str):
-                value = float(value)
-
-        elif fieldtype in ("date", "datetime"):
-            if isinstance(value, (float,int)):
-                value = str(datetime.fromtimestamp(value))
-            if isinstance(value, datetime):
-                value = value.astimezone(self.pytimezone).strftime("%Y-%m-%d %H:%M:%S")
-            elif not isinstance(value, str) and not value is None:
-                value = str(value)
-        
-        elif fieldtype == "time":
-            if isinstance(value, (float,int)):
-                value = str(datetime.fromtimestamp(value).strftime("HH:MM:SS.%f"))
-            elif isinstance(value, timedelta):  # treat as time. py3 mysql bug?
-                n = datetime(year=2000, month=1, day=1, hour=0, minute=0, second=0) + value
-                value = n.strftime("HH:MM:SS.%f")
-            elif value is None:
-                pass
-            elif not isinstance(value, str):
-                value = str(value)
-
-        elif fieldtype == "timestamp":
-            if value is None:
-                pass
-            elif isinstance(value, Decimal):
-                value = float(value)
-        
-        elif fieldtype in ("list","radio"):
-            # to single item string
-            if isinstance(value, (list, tuple)):
-                if value:
-                    value = value[0]
-                else:
-                    value = ""
-
-        elif fieldtype in ("multilist", "checkbox", "mselection", "mcheckboxes", "urllist", "unitlist"):
-            # to json formatted list
-            if not value:
-                value = ""
-            elif isinstance(value, str):
-                value = [value]
-            if isinstance(value, (list, tuple)):
-                if isinstance(value[0], bytes):
-                    # list of strings:
-                    value = [str(v, self.codepage) for v in value]
-                value = json.dumps(value)
-
-        elif fieldtype in ("bool",):
-            if isinstance(value, str):
-                if value.lower()=="true":
-                    value = 1
-                elif value.lower()=="false":
-                    value = 0
-            else:
-                try:
-                    value = int(value)
-                except:
-                    value = 0
 
-        elif fieldtype == "json":
-            if not value:
-                value = ""
-            elif not isinstance(value, str):
-                value = json.dumps(value)
-            
+        name = self._Serializers.get(fieldtype)
+        if name is not None:
+            return getattr(self, name)(value)
+        if fieldtype in ("file", "binary"):
+            return value
+        return self._se_string(value)
+
+    def _se_untyped(self, value):
+        if isinstance(value, datetime):
+            return value.strftime("%Y-%m-%d %H:%M:%S")
+        elif isinstance(value, timedelta):  # treat as time. py3 mysql bug?
+            n = datetime(year=2000, month=1, day=1, hour=0, minute=0, second=0) + value
+            return n.strftime("%H:%M:%S")
+        elif isinstance(value, (list, tuple)):
+            if isinstance(value[0], bytes):
+                # list of strings:
+                value = [str(v, self.codepage) for v in value]
+            value = "_json_"+json.dumps(value)
+        elif isinstance(value, bytes):
+            value = str(value, self.codepage)
+        return value
+
+    def _se_string(self, value):
         # assure unicode except filedata
-        if isinstance(value, bytes) and fieldtype not in ("file", "binary"):
+        if isinstance(value, bytes):
+            value = str(value, self.codepage)
+        return value
+
+    def _se_number(self, value):
+        if isinstance(value, str):
+            value = int(value)
+        elif isinstance(value, float):
+            value = int(value)
+        elif isinstance(value, bytes):
+            value = str(value, self.codepage)
+        return value
+
+    def _se_float(self, value):
+        if isinstance(value, str):
+            value = float(value)
+        elif isinstance(value, bytes):
             value = str(value, self.codepage)
+        return value
+
+    def _se_datetime(self, value):
+        if isinstance(value, (float,int)):
+            value = str(datetime.fromtimestamp(value))
+        if isinstance(value, datetime):
+            value = value.astimezone(self.pytimezone).strftime("%Y-%m-%d %H:%M:%S")
+        elif not isinstance(value, str) and not value is None:
+            value = str(value)
+        return value
+
+    def _se_time(self, value):
+        if isinstance(value, (float,int)):
+            value = str(datetime.fromtimestamp(value).strftime("HH:MM:SS.%f"))
+        elif isinstance(value, timedelta):  # treat as time. py3 mysql bug?
+            n = datetime(year=2000, month=1, day=1, hour=0, minute=0, second=0) + value
+            value = n.strftime("HH:MM:SS.%f")
+        elif value is None:
+            pass
+        elif not isinstance(value, str):
+            value = str(value)
+        return value
+
+    def _se_timestamp(self, value):
+        if value is None:
+            pass
+        elif isinstance(value, Decimal):
+            value = float(value)
+        elif isinstance(value, bytes):
+            value = str(value, self.codepage)
+        return value
 
+    def _se_list(self, value):
+        # to single item string
+        if isinstance(value, (list, tuple)):
+            if value:
+                value = value[0]
+            else:
+                value = ""
+        if isinstance(value, bytes):
+            value = str(value, self.codepage)
+        return value
+
+    def _se_multilist(self, value):
+        # to json formatted list
+        if not value:
+            value = ""
+        elif isinstance(value, str):
+            value = [value]
+        if isinstance(value, (list, tuple)):
+            if isinstance(value[0], bytes):
+                # list of strings:
+                value = [str(v, self.codepage) for v in value]
+            value = json.dumps(value)
+        elif isinstance(value, bytes):
+            value = str(value, self.codepage)
+        return value
+
+    def _se_bool(self, value):
+        if isinstance(value, str):
+            if value.lower()=="true":
+                value = 1
+            elif value.lower()=="false":
+                value = 0
+        else:
+            try:
+                value = int(value)
+            except:
+                value = 0
+        return value
+
+    def _se_json(self, value):
+        if not value:
+            value = ""
+        elif not isinstance(value, str):
+            value = json.dumps(value)
         return value
 
 
     def _de(self, value, fieldtype, field):
         if not fieldtype:
             # no datatype information set
-            if isinstance(value, str) and value.startswith("_json_"):
-                value = json.loads(value[len("_json_"):])
-            elif isinstance(value, timedelta):  # treat as time. py3 mysql bug?
-                n = datetime(year=2000, month=1, day=1, hour=0, minute=0, second=0) + value
-                value = datetime_time(hour=n.hour, minute=n.minute, second=n.second, microsecond=n.microsecond)
-            if isinstance(value, bytes):
-                value = str(value, self.codepage)
-            return value
+            return self._de_untyped(value)
 
         if isinstance(fieldtype, dict):
             fieldtype = fieldtype["datatype"]
@@ -481,87 +694,101 @@ class PoolStructure(object):
         if fieldtype in self.deserializeCallbacks:
             return self.deserializeCallbacks[fieldtype](value, field)
 
-        if fieldtype == "datetime":
-            # -> to datetime
-            if isinstance(value, str):
-                value = ConvertToDateTime(value)
-            elif isinstance(value, (float,int)):
-                value = datetime.fromtimestamp(value)
-            if value is not None and self.pytimezone is not None and value.tzinfo is None:
-                value = value.replace(tzinfo=self.pytimezone)
-
-        elif fieldtype == "date":
-            # -> to datetime
-            if isinstance(value, str):
-                value = ConvertToDateTime(value)
-            elif isinstance(value, (float,int)):
-                value = datetime.fromtimestamp(value)
-
-        elif fieldtype == "time":
-            # -> to datetime.time
-            if isinstance(value, str):
-                # misuse datetime parser
-                value2 = ConvertToDateTime("2015-01-01 "+str(value))
-                if value2:
-                    value = datetime_time(value2.hour,value2.minute,value2.second,value2.microsecond)
-            elif isinstance(value, (float,int)):
-                value = datetime.fromtimestamp(value)
-                value = datetime_time(value.hour,value.minute,value.second,value.microsecond)
-            elif isinstance(value, timedelta):  # treat as time. py3 mysql bug?
-                n = datetime(year=2000, month=1, day=1, hour=0, minute=0, second=0) + value
-                value = datetime_time(hour=n.hour, minute=n.minute, second=n.second, microsecond=n.microsecond)
-
-        elif fieldtype == "timestamp":
-            if isinstance(value, str):
-                value = float(value)
-                    
-        elif fieldtype in ("multilist", "checkbox", "mselection", "mcheckboxes", "urllist"):
-            # -> to string tuple
-            # unitlist -> to number tuple
-            if not value:
-                value = ""
-            elif isinstance(value, str):
-                if value.startswith("_json_"):
-                    value = json.loads(value[len("_json_"):])
-                else:
-                    try:
-                        value = tuple(json.loads(value))
-                    except ValueError:
-                        # use as single item text string
-                        value = (value,)
-            elif isinstance(value, list):
-                value = tuple(value)
-            if fieldtype == "unitlist":
-                value = tuple([int(v) for v in value])
-
-        elif fieldtype in ("unitlist",):
-            # -> to string tuple
-            # unitlist -> to number tuple
-            if not value:
-                value = ""
-            elif isinstance(value, str):
-                if value.startswith("_json_"):
-                    value = json.loads(value[len("_json_"):])
-                else:
-                    try:
-                        value = tuple(json.loads(value))
-                    except ValueError:
-                        # use as single item text string
-                        value = (value,)
-                    except TypeError:
-                        # use as single item text string
-                        value = (value,)
-            elif isinstance(value, list):
-                value = [int(v) for v in value]
-                value = tuple(value)
-
-        elif fieldtype == "json":
-            # -> to python type
-            if not value:
-                value = None
-            elif isinstance(value, str):
-                value = json.loads(value)
+        name = self._Deserializers.get(fieldtype)
+        if name is not None:
+            return getattr(self, name)(value)
+        return value
 
+    def _de_untyped(self, value):
+        if isinstance(value, str) and value.startswith("_json_"):
+            value = json.loads(value[len("_json_"):])
+        elif isinstance(value, timedelta):  # treat as time. py3 mysql bug?
+            n = datetime(year=2000, month=1, day=1, hour=0, minute=0, second=0) + value
+            value = datetime_time(hour=n.hour, minute=n.minute, second=n.second, microsecond=n.microsecond)
+        if isinstance(value, bytes):
+            value = str(value, self.codepage)
+        return value
+
+    def _de_datetime(self, value):
+        # -> to datetime
+        if isinstance(value, str):
+            value = ConvertToDateTime(value)
+        elif isinstance(value, (float,int)):
+            value = datetime.fromtimestamp(value)
+        if value is not None and self.pytimezone is not None and value.tzinfo is None:
+            value = value.replace(tzinfo=self.pytimezone)
+        return value
+
+    def _de_date(self, value):
+        # -> to datetime
+        if isinstance(value, str):
+            value = ConvertToDateTime(value)
+        elif isinstance(value, (float,int)):
+            value = datetime.fromtimestamp(value)
+        return value
+
+    def _de_time(self, value):
+        # -> to datetime.time
+        if isinstance(value, str):
+            # misuse datetime parser
+            value2 = ConvertToDateTime("2015-01-01 "+str(value))
+            if value2:
+                value = datetime_time(value2.hour,value2.minute,value2.second,value2.microsecond)
+        elif isinstance(value, (float,int)):
+            value = datetime.fromtimestamp(value)
+            value = datetime_time(value.hour,value.minute,value.second,value.microsecond)
+        elif isinstance(value, timedelta):  # treat as time. py3 mysql bug?
+            n = datetime(year=2000, month=1, day=1, hour=0, minute=0, second=0) + value
+            value = datetime_time(hour=n.hour, minute=n.minute, second=n.second, microsecond=n.microsecond)
+        return value
+
+    def _de_timestamp(self, value):
+        if isinstance(value, str):
+            value = float(value)
+        return value
+
+    def _de_multilist(self, value):
+        # -> to string tuple
+        if not value:
+            value = ""
+        elif isinstance(value, str):
+            if value.startswith("_json_"):
+                value = json.loads(value[len("_json_"):])
+            else:
+                try:
+                    value = tuple(json.loads(value))
+                except ValueError:
+                    # use as single item text string
+                    value = (value,)
+        elif isinstance(value, list):
+            value = tuple(value)
+        return value
+
+    def _de_unitlist(self, value):
+        # -> to number tuple
+        if not value:
+            value = ""
+        elif isinstance(value, str):
+            if value.startswith("_json_"):
+                value = json.loads(value[len("_json_"):])
+            else:
+                try:
+                    value = tuple(json.loads(value))
+                except ValueError:
+                    # use as single item text string
+                    value = (value,)
+                except TypeError:
+                    # use as single item text string
+                    value = (value,)
+        elif isinstance(value, list):
+            value = [int(v) for v in value]
+            value = tuple(value)
+        return value
+
+    def _de_json(self, value):
+        # -> to python type
+        if not value:
+            value = None
+        elif isinstance(value, str):
+            value = json.loads(value)
         return value
-    
-    
\ No newline at end of file
@@ -105,6 +105,38 @@ class BaseTest(unittest.TestCase):
         except ConnectionError:
             pass
             
+    def test_sqlcache(self):
+        base = Base()
+        base.structure.Init(structure=struct, stdMeta=struct["pool_meta"])
+        try:
+            base.SetConnection(Connection())
+        except TypeError:
+            pass
+        flds = list(struct["pool_meta"])+list(struct["data1"])
+        sql1, values1 = base.FmtSQLSelect(flds, parameter={"pool_type":"data1", "title":"a*"}, dataTable="data1",
+                                          operators={"title":"LIKE"}, sort="title")
+        self.assertEqual(len(base.structure.queryCache), 1)
+        sql2, values2 = base.FmtSQLSelect(flds, parameter={"pool_type":"data2", "title":"b"}, dataTable="data1",
+                                          operators={"title":"LIKE"}, sort="title")
+        self.assertEqual(len(base.structure.queryCache), 1)
+        self.assertEqual(sql1, sql2)
+        self.assertEqual(values1, ["data1", "%a%%"])
+        self.assertEqual(values2, ["data2", "%b%"])
+        # empty like values are skipped
+        sql3, values3 = base.FmtSQLSelect(flds, parameter={"pool_type":"data2", "title":""}, dataTable="data1",
+                                          operators={"title":"LIKE"}, sort="title")
+        self.assertNotEqual(sql1, sql3)
+        self.assertEqual(values3, ["data2"])
+        # list shapes
+        sql4, values4 = base.FmtSQLSelect(flds, parameter={"id":[1]}, operators={"id":"IN"})
+        sql5, values5 = base.FmtSQLSelect(flds, parameter={"id":[2]}, operators={"id":"IN"}, extraValues=[3])
+        self.assertEqual(sql4, sql5)
+        self.assertEqual(values5, [2, 3])
+        sql6, values6 = base.FmtSQLSelect(flds, parameter={"id":[1,2]}, operators={"id":"IN"})
+        self.assertNotEqual(sql4, sql6)
+        sql7, values7 = base.FmtSQLSelect(flds, parameter={"title":("a","")}, operators={"title":"LIKE:OR"})
+        self.assertEqual(values7, ["%a%", ""])
+
     def test_sql(self):
         base = Base()
         base.structure.Init(structure=struct, stdMeta=struct["pool_meta"])
@@ -25,5 +25,12 @@ class ConnectionTest(unittest.TestCase):
     def test_connreq(self):
         self.assertTrue(ConnectionRequest(conn))
 
+    def test_connpool(self):
+        pool = ConnectionPool(conn, connectNow=False)
+        self.assertTrue(pool)
+        stats = pool.GetPoolStats()
+        self.assertEqual(stats["size"], 0)
+        self.assertEqual(stats["maxsize"], 10)
+
 
 
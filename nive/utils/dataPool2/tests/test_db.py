@@ -5,6 +5,9 @@ import unittest
 from time import time
 
 from nive.utils.dataPool2.tests.test_Base import stdMeta, struct, data1_1, data2_1, meta1, file1_1, file1_2
+from nive.utils.dataPool2.files import BlobStorage, CopyFileData
+from nive.utils.dataPool2.base import OperationalError, ProgrammingError
+from nive.utils.path import DvPath
 
 
 
@@ -426,6 +429,24 @@ class dbTest(object):
         c.close()
         #print "OK"
 
+        sql, values=self.pool.FmtSQLSelect(["id"], {}, dataTable="pool_meta", sort="id", singleTable=1)
+        self.assertEqual(list(self.pool.QueryIter(sql, values, batchSize=2)), list(self.pool.Query(sql, values)))
+
+        # errors on a separate stream connection do not roll back the pool connection
+        class PrivateConnection(object):
+            def close(self):
+                pass
+        undo = []
+        pool = self.pool
+        pool._OpenStreamCursor = lambda: (pool.connection.cursor(), PrivateConnection())
+        pool.Undo = lambda: undo.append(1)
+        try:
+            self.assertRaises((OperationalError, ProgrammingError), list, pool.QueryIter("select id from no_table"))
+            self.assertFalse(undo)
+        finally:
+            del pool._OpenStreamCursor
+            del pool.Undo
+
         #print "GetFulltextSQL",
         sql, values=self.pool.GetFulltextSQL("is",
                             list(stdMeta)+list(struct["data1"]),
@@ -577,11 +598,325 @@ class dbTest(object):
 
     def test_tree(self):
         base = self.pool
-        #base.GetContainedIDs(base=0, sort="title", parameter="")
-        #base.GetTree(flds=["id"], sort="title", base=0, parameter="")
         base.GetParentPath(1)
         base.GetParentTitles(1)
 
+    def test_tree_deep(self):
+        base = self.pool
+        # build a chain deeper than 10 levels plus a sibling on the first level
+        ids = []
+        ref = 0
+        for i in range(14):
+            e = base.CreateEntry("data1", user="unittest")
+            e.meta.update({"pool_unitref": ref, "title": "t%02d" % i})
+            e.Commit(user="unittest")
+            ref = e.GetID()
+            ids.append(ref)
+        e = base.CreateEntry("data1", user="unittest")
+        e.meta.update({"pool_unitref": ids[0], "title": "t99"})
+        e.Commit(user="unittest")
+        sibling = e.GetID()
+
+        self.assertEqual(base.GetParentPath(ids[-1]), ids[:-1])
+        self.assertEqual(base.GetParentTitles(ids[-1]), ["t%02d" % i for i in range(13)])
+        self.assertEqual(base.GetParentPath(ids[0]), [])
+
+        # depth first on all database systems. not matching entries skip their subtree.
+        self.assertEqual(base.GetContainedIDs(base=ids[0], sort="title"), ids[1:]+[sibling])
+        self.assertEqual(base.GetContainedIDs(base=ids[0], sort="title desc"), [sibling]+ids[1:])
+        self.assertEqual(base.GetContainedIDs(base=ids[0], sort="title", parameter="title <> 't05'"), ids[1:5]+[sibling])
+
+        tree = base.GetTree(flds=["id", "title"], sort="title", base=ids[0])
+        self.assertEqual(len(tree["items"]), 1)
+        node = tree["items"][0]
+        self.assertEqual(node["id"], ids[0])
+        self.assertEqual(node["title"], "t00")
+        self.assertEqual(node["ref1"], 0)
+        self.assertEqual(node["ref2"], None)
+        self.assertEqual([i["id"] for i in node["items"]], [ids[1], sibling])
+        depth = 0
+        while node["items"]:
+            node = node["items"][0]
+            depth += 1
+        self.assertEqual(depth, 13)
+        self.assertEqual(node["id"], ids[-1])
+        self.assertEqual([node["ref%d" % i] for i in range(1, 11)], list(reversed(ids[3:-1])))
+
+        # not matching entries are included without values if contained entries match
+        tree = base.GetTree(flds=["id", "title"], sort="title", base=ids[0], parameter="title <> 't05'")
+        node = tree["items"][0]
+        for i in range(5):
+            node = node["items"][0]
+        self.assertEqual(node["id"], ids[5])
+        self.assertNotIn("title", node)
+        self.assertEqual(node["items"][0]["title"], "t06")
+        tree = base.GetTree(flds=["id", "title"], sort="title", base=ids[0], parameter="title = 't13'")
+        node = tree["items"][0]
+        self.assertNotIn("title", node)
+        self.assertEqual(len(node["items"]), 1)
+        self.assertEqual(base.GetTree(flds=["id"], base=ids[0], parameter="title = 'none'"), {"items": []})
+
+    def test_entrychain(self):
+        base = self.pool
+        ids = []
+        ref = 0
+        for i in range(3):
+            e = base.CreateEntry("data1", user="unittest")
+            e.meta.update({"pool_unitref": ref, "title": "t%d" % i, "pool_state": i})
+            e.Commit(user="unittest")
+            ref = e.GetID()
+            ids.append(ref)
+        try:
+            entries = base.GetEntryChain(ids[-1])
+            self.assertEqual(sorted(entries.keys()), sorted(ids))
+            self.assertEqual(entries[ids[1]].meta["pool_unitref"], ids[0])
+            # data is loaded on access
+            self.assertTrue(entries[ids[1]].data.IsEmpty())
+            self.assertTrue(list(entries[ids[1]].data.keys()))
+            # data is loaded with the chain
+            entries = base.GetEntryChain(ids[-1], loadData=True)
+            self.assertFalse(entries[ids[1]].data.IsEmpty())
+            entries = base.GetEntryChain(ids[-1], {"pool_state": 0}, {"pool_state": ">"})
+            self.assertEqual(sorted(entries.keys()), sorted(ids[1:]))
+            self.assertEqual(base.GetEntryChain(0), {})
+
+            entries = base.SelectEntries({"id": ids[1], "pool_unitref": ids[0]})
+            self.assertEqual(list(entries.keys()), [ids[1]])
+            entries = base.SelectEntries({"id": ids[1], "pool_unitref": ids[1]})
+            self.assertEqual(entries, {})
+            entries = base.SelectEntries({"id": ids[1]}, dataTable="data1")
+            self.assertEqual(entries[ids[1]].meta["title"], "t1")
+            self.assertEqual(base.SelectEntries({"id": ids[1]}, dataTable="data2"), {})
+            entries = base.SelectEntries({"id": ids[1]}, loadData=True)
+            self.assertFalse(entries[ids[1]].data.IsEmpty())
+        finally:
+            for id in ids:
+                base.DeleteEntry(id)
+
+    def test_batch(self):
+        base = self.pool
+        ids = []
+        for i in range(5):
+            ids.append(self.create1() if i % 2 else self.create2())
+        ids.reverse()
+        size = base._MaxBatchSize
+        base._MaxBatchSize = 2
+        try:
+            for preload in ("all", "meta", "skip"):
+                entries = base.GetBatch(ids, preload=preload)
+                self.assertEqual([e.GetID() for e in entries], ids)
+            entries = base.GetBatch(ids+[999999])
+            self.assertEqual([e.GetID() for e in entries], ids)
+            self.assertEqual(entries[0].meta.get("pool_datatbl"), "data2")
+            self.assertFalse(entries[0].data.IsEmpty())
+            self.assertFalse(entries[1].data.IsEmpty())
+            # meta hint
+            meta = [{"id": e.GetID(), "pool_datatbl": e.meta.get("pool_datatbl")} for e in entries]
+            entries = base.GetBatch(ids, meta=meta)
+            self.assertEqual([e.GetID() for e in entries], ids)
+        finally:
+            base._MaxBatchSize = size
+            for id in ids:
+                base.DeleteEntry(id)
+
+
+    def test_createentries(self):
+        base = self.pool
+        size = base._MaxBatchSize
+        base._MaxBatchSize = 2
+        entries = []
+        try:
+            entries = base.CreateEntries("data1", 5, user="unittest")
+            self.assertEqual(len(entries), 5)
+            ids = [e.GetID() for e in entries]
+            self.assertEqual(len(set(ids)), 5)
+            self.assertEqual(len(set([e.GetDataRef() for e in entries])), 5)
+            for i, e in enumerate(entries):
+                e.data.update(data1_1)
+                e.meta.update(meta1)
+                e.meta["title"] = "batch %d" % i
+            base.CommitEntries(entries, user="unittest", dbCommit=True)
+            self.assertFalse(entries[0].meta.HasTemp())
+            for i, id in enumerate(ids):
+                e = base.GetEntry(id)
+                self.assertEqual(e.meta.get("title"), "batch %d" % i)
+                self.assertEqual(e.meta.get("pool_createdby"), "unittest")
+                self.assertEqual(e.data.get("ftext"), data1_1.get("ftext"))
+            base.WriteFulltexts(dict([(id, "text %d" % id) for id in ids]))
+            self.assertEqual(base.GetEntry(ids[0]).GetFulltext(), "text %d" % ids[0])
+            base.WriteFulltexts({ids[0]: "updated"})
+            self.assertEqual(base.GetEntry(ids[0]).GetFulltext(), "updated")
+        finally:
+            base._MaxBatchSize = size
+            for e in entries:
+                base.DeleteEntry(e.GetID())
+
+
+    def test_insertrows(self):
+        base = self.pool
+        ph = base.placeholder
+        # more rows than one statement can hold
+        refs = base._InsertRows("data1", (), 600)
+        rows = [("data1", ref) for ref in refs]
+        ids = base._InsertRows(base.MetaTable, ("pool_datatbl", "pool_dataref"), rows)
+        try:
+            self.assertEqual(len(ids), 600)
+            self.assertEqual(len(set(refs)), 600)
+            cursor = base.connection.cursor()
+            for id, ref in zip(ids[::50], refs[::50]):
+                cursor.execute("SELECT pool_dataref FROM %s WHERE id=%s" % (base.MetaTable, ph), (id,))
+                self.assertEqual(cursor.fetchone()[0], ref)
+            cursor.close()
+        finally:
+            cursor = base.connection.cursor()
+            for id, ref in zip(ids, refs):
+                cursor.execute("DELETE FROM %s WHERE id=%s" % (base.MetaTable, ph), (id,))
+                cursor.execute("DELETE FROM data1 WHERE id=%s" % (ph), (ref,))
+            cursor.close()
+            base.Commit()
+
+
+    def test_blobstorage(self):
+        base = self.pool
+        storage = base.storage
+        base.storage = BlobStorage(base)
+        ids = []
+        try:
+            id1=self.create1()
+            id2=self.create1()
+            ids = [id1, id2]
+            self.setfile1(id1)
+            self.setfile2(id1)
+            self.setfile1(id2)
+            f1 = base.GetEntry(id1).GetFile("file1")
+            f2 = base.GetEntry(id2).GetFile("file1")
+            self.assertEqual(f1.path, f2.path)
+            self.assertTrue(base.storage.IsBlobPath(f1.path))
+            self.assertEqual(base.storage.References(f1.path), 2)
+
+            # duplicate shares the blob
+            id3=self.duplicate(id1)
+            ids.append(id3)
+            self.file1(id3)
+            self.file2(id3)
+            self.assertEqual(base.GetEntry(id3).GetFile("file1").path, f1.path)
+            self.assertEqual(base.storage.References(f1.path), 3)
+
+            # replace and delete keep shared blobs
+            e = base.GetEntry(id2)
+            e.CommitFile("file1", {"file":file1_2, "filename":"file1.txt"})
+            e.Commit(user="unittest")
+            self.assertEqual(base.storage.References(f1.path), 2)
+            self.assertTrue(base.GetEntry(id2).GetFile("file1").read() == file1_2)
+            self.delete(id1)
+            ids.remove(id1)
+            self.file1(id3)
+            self.assertTrue(f2.exists())
+            self.delete(id3)
+            ids.remove(id3)
+            # unreferenced blobs are only removed by the garbage collection
+            self.assertEqual(base.storage.References(f2.path), 0)
+            self.assertTrue(f2.exists())
+
+            # unreferenced blob
+            path = base.root.GetStr()+"blobtest.txt"
+            with open(path, "wb") as f:
+                f.write(b"unreferenced blob "+str(time()).encode("utf-8"))
+            blob = base.storage.Import(path)
+            DvPath(path).Delete()
+            self.assertEqual(base.storage.References(blob), 0)
+            # kept within the grace period
+            base.storage.CollectGarbage()
+            self.assertTrue(DvPath(base.root.GetStr()+blob).Exists())
+            self.assertTrue(base.storage.CollectGarbage(grace=0) >= 2)
+            self.assertFalse(DvPath(base.root.GetStr()+blob).Exists())
+            self.assertFalse(f2.exists())
+        finally:
+            for id in ids:
+                base.DeleteEntry(id)
+            base.Commit()
+            base.storage = storage
+
+
+    def test_deleteentries(self):
+        base = self.pool
+        storage = base.storage
+        base.storage = BlobStorage(base)
+        ids = []
+        try:
+            id1=self.create1()
+            id2=self.create1()
+            ids = [id1, id2]
+            self.setfile1(id1)
+            self.setfile1(id2)
+            f1 = base.GetEntry(id1).GetFile("file1")
+            count, files = base.DeleteEntries([id1])
+            base.Commit()
+            ids.remove(id1)
+            self.assertEqual(count, 1)
+            self.assertEqual([f["id"] for f in files], [id1])
+            self.assertFalse(base.IsIDUsed(id1))
+            base.ReleaseFiles(files)
+            # still referenced by id2
+            self.assertTrue(f1.exists())
+            count, files = base.DeleteEntries([id2])
+            base.Commit()
+            ids.remove(id2)
+            base.ReleaseFiles(files)
+            # unreferenced blobs are removed by the garbage collection
+            self.assertTrue(f1.exists())
+            base.storage.CollectGarbage(grace=0)
+            self.assertFalse(f1.exists())
+        finally:
+            for id in ids:
+                base.DeleteEntry(id)
+            base.Commit()
+            base.storage = storage
+
+
+    def test_duplicateentries(self):
+        base = self.pool
+        ids = []
+        try:
+            id1=self.create1()
+            id2=self.create1()
+            ids = [id1, id2]
+            base.UpdateFields(base.MetaTable, id2, {"pool_unitref": id1})
+            self.setfile1(id2)
+            idmap, files = base.DuplicateEntries([id1, id2], 0, {"pool_wfa": "copied"})
+            base.Commit()
+            ids += list(idmap.values())
+            self.assertEqual(sorted(idmap.keys()), [id1, id2])
+            e1 = base.GetEntry(idmap[id1])
+            e2 = base.GetEntry(idmap[id2])
+            source = base.GetEntry(id2)
+            self.assertEqual(e1.meta["pool_unitref"], 0)
+            self.assertEqual(e1.meta["pool_wfa"], "copied")
+            self.assertEqual(e2.meta["pool_unitref"], idmap[id1])
+            self.assertNotEqual(e2.meta["pool_dataref"], source.meta["pool_dataref"])
+            self.assertEqual(e2.data["ftext"], source.data["ftext"])
+            self.assertEqual([f["id"] for f in files], [idmap[id2]])
+            self.file1(idmap[id2])
+        finally:
+            for id in ids:
+                base.DeleteEntry(id)
+            base.Commit()
+
+
+    def test_copyfiledata(self):
+        import io, tempfile
+        with tempfile.TemporaryFile() as src, tempfile.TemporaryFile() as out:
+            src.write(file1_1 * 100)
+            src.seek(0)
+            self.assertEqual(CopyFileData(src, out), len(file1_1) * 100)
+            out.seek(0)
+            self.assertEqual(out.read(), file1_1 * 100)
+            src.seek(0)
+            self.assertRaises(ValueError, CopyFileData, src, out, 10)
+        out = io.BytesIO()
+        self.assertEqual(CopyFileData(io.BytesIO(file1_1), out), len(file1_1))
+        self.assertEqual(out.getvalue(), file1_1)
+
 
 
 
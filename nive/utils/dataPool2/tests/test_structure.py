@@ -194,6 +194,31 @@ class ConversionTest(unittest.TestCase):
     def test_ds_json(self):
         self.assertTrue(self.structure.deserialize("data2", "fjson", json.dumps(["aaa","bbb"]))[0]=="aaa")
 
+    def test_rows(self):
+        flds = ("fstr", "fmultilist", "fbool", "nofield")
+        rows = self.structure.serialize_rows("data2", flds, [("aaa", ["a","b"], "true", ("x",)), (b"bbb", [], 0, None)])
+        self.assertEqual(rows[0], ["aaa", json.dumps(["a","b"]), 1, "_json_"+json.dumps(["x"])])
+        self.assertEqual(rows[1], ["bbb", "", 0, None])
+        recs = self.structure.deserialize_rows("data2", flds, rows)
+        self.assertEqual(recs[0], {"fstr": "aaa", "fmultilist": ("a","b"), "fbool": 1, "nofield": ["x"]})
+        self.assertEqual(recs[1]["fmultilist"], "")
+        self.assertEqual(self.structure.deserialize("data2", None, dict(zip(flds, rows[0]))), recs[0])
+
+    def test_deserializer(self):
+        self.assertTrue(self.structure.GetDeserializer("string") is None)
+        self.assertTrue(self.structure.GetDeserializer("number") is None)
+        de = self.structure.GetDeserializer("multilist")
+        self.assertEqual(de(json.dumps(["aaa","bbb"])), ("aaa","bbb"))
+        de = self.structure.GetDeserializer({"datatype": "json"})
+        self.assertEqual(de(json.dumps({"a": 1})), {"a": 1})
+        de = self.structure.GetDeserializer(None)
+        self.assertEqual(de("_json_[1]"), [1])
+        # type specific functions are returned directly
+        self.assertEqual(self.structure.GetDeserializer("datetime"), self.structure._de_datetime)
+        converters = self.structure._Converters("pool_meta", 0)
+        self.assertEqual(converters["pool_wfa"], self.structure._se_list)
+        self.assertEqual(converters["title"], self.structure._se_string)
+
 
 
 def seCallback(value, field):
@@ -217,6 +242,14 @@ class CallbackTest(unittest.TestCase):
     def test_serialize_callback(self):
         self.assertTrue(self.structure.serialize("pool_meta", "title", "somevalue")=="SOMEVALUE")
         self.assertTrue(self.structure.deserialize("pool_meta", "title", "somevalue")=="Somevalue")
+        self.assertTrue(self.structure.GetDeserializer("string")("somevalue")=="Somevalue")
+        self.structure.deserializeCallbacks = {}
+        self.assertTrue(self.structure.deserialize("pool_meta", "title", "somevalue")=="somevalue")
+        # changes in place reset the converters
+        self.structure.deserializeCallbacks["string"] = deCallback
+        self.assertTrue(self.structure.deserialize("pool_meta", "title", "somevalue")=="Somevalue")
+        del self.structure.serializeCallbacks["string"]
+        self.assertTrue(self.structure.serialize("pool_meta", "title", "somevalue")=="somevalue")
 
         
     def test_se_multilist(self):
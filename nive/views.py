@@ -19,6 +19,7 @@ except:
     import json
 from datetime import datetime
 from email.utils import formatdate
+from urllib.parse import quote
 
 from pyramid.response import Response
 from pyramid.renderers import render_to_response, get_renderer, render
@@ -34,6 +35,7 @@ from nive import helper
 from nive.utils.utils import ConvertToStr, ConvertListToStr, ConvertToDateTime
 from nive.utils.utils import FmtSeconds, FormatBytesForDisplay, CutText, GetMimeTypeExtension
 from nive import FileNotFound
+from nive.utils.dataPool2.files import FileIterable, FileIterator
 from nive.definitions import ViewConf
 from nive.definitions import IViewModuleConf
 from nive.definitions import ConfigurationError
@@ -523,32 +525,82 @@ class BaseView(object):
 
     def SendFile(self, file, filename=None, headers=None):
         """
-        Creates the response and sends the file back. Uses the FileIterator.
+        Creates the response and sends the file back. Stored files are streamed from disk
+        using the servers `wsgi.file_wrapper` if available. Byte range requests are
+        supported. The ETag is calculated from file id, size and modification time.
+        
+        Settings in the application configuration ::
+        
+            fileChunkSize:   read size in bytes used to stream files. Default 64 KB.
+            fileOffload:     'X-Sendfile' or 'X-Accel-Redirect'. The file is sent by the front
+                             server. The response contains the headers only.
+            fileOffloadRoot: 'X-Accel-Redirect' only. Internal url the file root directory is
+                             mapped to. e.g. '/_files/'
         
         #!date format
         """
         if not file:
             return HTTPNotFound()
-        last_mod = file.mtime
+        conf = self.context.app.configuration
+        chunkSize = conf.get("fileChunkSize") or FileIterator.chunk_size
+        path = file.abspath()
+        size = file.size
+        mtime = None
+        if path:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                raise NotFound
+            size = stat.st_size
+            mtime = stat.st_mtime
+        last_mod = mtime or file.mtime
         if not last_mod:
             last_mod = self.context.meta.pool_change
         r = Response(content_type=str(GetMimeTypeExtension(file.extension)), conditional_response=True, headerlist=headers)
-        iterator = file.iterator()
-        if iterator:
-            r.app_iter = iterator
+        offload = conf.get("fileOffload")
+        if path and offload:
+            if offload.lower() == "x-accel-redirect":
+                root = conf.get("fileOffloadRoot") or "/"
+                r.headers["X-Accel-Redirect"] = quote(root.rstrip("/") + "/" + file.path.lstrip("/"))
+            else:
+                r.headers[str(offload)] = path
+            # the front server sends the file and handles range requests
+            r.content_length = None
         else:
-            try:
-                r.body = file.read()
-            except FileNotFound:
-                raise NotFound
-        r.content_length = file.size
+            if path:
+                wrapper = self.request.environ.get("wsgi.file_wrapper")
+                if wrapper is not None and not self.request.environ.get("HTTP_RANGE"):
+                    r.app_iter = wrapper(open(path, "rb"), chunkSize)
+                else:
+                    r.app_iter = file.iterator(chunkSize=chunkSize)
+            elif hasattr(file.file, "read"):
+                # not yet stored
+                file.file.seek(0)
+                r.app_iter = FileIterable(file.file, chunkSize=chunkSize)
+            else:
+                try:
+                    r.body = file.read()
+                except FileNotFound:
+                    raise NotFound
+                size = len(r.body)
+            r.content_length = size
         r.last_modified = last_mod
-        r.etag = '%s-%s' % (last_mod, hash(file.path))
+        r.etag = self._FileETag(file, size, last_mod)
         r.cache_expires(self.fileExpires)
         if filename:
             r.content_disposition = 'attachment; filename=%s' % (filename)
         return r
 
+    def _FileETag(self, file, size, mtime):
+        # strong etag based on file id, size and modification time
+        if isinstance(mtime, datetime):
+            mtime = time.mktime(mtime.timetuple()) + mtime.microsecond/1e6
+        try:
+            mtime = "%x" % int(float(mtime)*1000)
+        except (TypeError, ValueError):
+            mtime = str(mtime)
+        return '%s-%s-%s' % (file.fileid or 0, size or 0, mtime)
+
 
     # http caching ----------------------------------------------------------------
 
@@ -1231,10 +1283,53 @@ def User(context, request, sessionuser=True):
 
 class FieldRenderer(object):
     
+    # datatypes changed by Render() 
+    renderedTypes = ("bool", "code", "date", "datetime", "timestamp", "unit", "unitlist", "list", "radio",
+                     "multilist", "checkbox", "mselection", "mcheckboxes", "url", "urllist", "password",
+                     "lines", "json")
+    listTypes = ("list", "radio", "multilist", "checkbox", "mselection", "mcheckboxes")
+
     def __init__(self, context, skip=()):
         self.context = context
         self.skipRender = skip
         
+    def Compile(self, fieldConf, useDefault=False, listItems=None, context=None, **kw):
+        """
+        Returns a function rendering values of the field ``fnc(value)``. The result is the same 
+        as calling `Render()` but the datatype and settings are evaluated and list items are 
+        loaded once. Use for many values of the same field.
+        """
+        default = fieldConf["default"] if useDefault else ""
+        if not self.IsRendered(fieldConf):
+            return lambda value: default if value is None else value
+        if fieldConf["datatype"] in self.listTypes and not listItems:
+            if context:
+                listItems = helper.LoadListItems(fieldConf, app=context.app, obj=context,
+                                                 pool_type=context.GetTypeID(), user=kw.get("user"))
+            if not listItems:
+                listItems = fieldConf.get("listItems")
+                if hasattr(listItems, "__call__"):
+                    listItems = listItems(fieldConf, self.context, user=kw.get("user"))
+        render = self.Render
+        return lambda value: render(fieldConf, value, useDefault, listItems=listItems, context=context, **kw)
+
+    def IsRendered(self, fieldConf):
+        """
+        Returns False if `Render()` returns values of the field unchanged. None values 
+        are still rendered as empty string.
+        """
+        if fieldConf["id"] in self.skipRender:
+            return False
+        settings = fieldConf.get("settings") or {}
+        if settings.get("format") in ("bytesize", "image"):
+            return True
+        fType = fieldConf["datatype"]
+        if fType == "string":
+            return settings.get("relation") == "userid"
+        if fType == "text":
+            return settings.get("format") in ("newlineToBr", "markdown")
+        return fType in self.renderedTypes
+
     def Render(self, fieldConf, value, useDefault=False, listItems=None, context=None, **kw):
         """
         fieldConf = FieldConf of field to be rendered
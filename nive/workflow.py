@@ -40,7 +40,7 @@ import weakref
 from zope.interface import implementer
 
 from nive.definitions import baseConf, ConfigurationError, TryResolveName
-from nive.definitions import IWfProcessConf, IWfStateConf, IWfTransitionConf, IProcess, ILocalGroups
+from nive.definitions import IWfProcessConf, IWfStateConf, IWfTransitionConf, IProcess, ILocalGroups, ICache
 from nive.helper import ResolveName, ResolveConfiguration, GetClassRef
 from nive.security import effective_principals 
 
@@ -174,6 +174,7 @@ class ObjectWorkflow(object):
         regardless of transitions or calling any workflow actions.
         """
         self.obj.meta["pool_wfa"] = stateID
+        _RemoveCache(self.obj)
 
     def SetWfProcess(self, processID, user, force=False):
         """
@@ -296,6 +297,7 @@ class RootWorkflow:
         regardless of transitions or calling any workflow actions.
         """
         self.obj.meta["pool_wfa"] = stateID
+        _RemoveCache(self.obj)
 
 
 WfAllRoles = "*"
@@ -372,6 +374,13 @@ class WfProcessConf(baseConf):
         return report
 
 
+def _RemoveCache(context):
+    # workflow state changed: remove cached records of the context
+    parent = getattr(context, "parent", None)
+    if ICache.providedBy(parent):
+        parent.RemoveCache(context.id)
+
+
 @implementer(IWfStateConf)
 class WfStateConf(baseConf):
     """
@@ -844,6 +853,7 @@ class Transition(object):
         """
         nextState = self.configuration.tostate
         context.meta["pool_wfa"] = nextState
+        _RemoveCache(context)
         return nextState
     
 